@@ -0,0 +1,165 @@
+"""
+Renders the progress graphic for many parishes at once. A manifest (CSV or JSON) lists one parish per row with its
+targets, current values, style and output file and, for the trend styles, the history database and the parish its
+entries are recorded under: the row's name unless a parish is given, or that of its config file if it names one. The
+graphics are drawn by DrawingControl.paintGraphic, exactly as the program draws them, across a pool of worker processes
+so that the run scales with the number of cores.
+
+Usage:  python BatchRender.py manifest.csv [--workers N]
+"""
+
+import ConfigStore
+import ExportProfiles
+import NumberFormat
+import Renderer
+import TiledRender
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+
+# manifest columns that are copied into the configuration and the type used to convert them from CSV text
+manifestFields = {'year': ('targets', 'year', str),
+                  'goal': ('targets', 'goal', float),
+                  'target_families': ('targets', 'families', int),
+                  'pledged': ('current', 'pledged', float),
+                  'collected': ('current', 'collected', float),
+                  'families': ('current', 'families', int),
+                  'style': (None, 'style', str),
+                  'border': (None, 'border', str),
+                  'heading_prefix': (None, 'heading_prefix', str),
+                  'heading': (None, 'heading', str),
+                  'history': ('history', 'filename', str),
+                  'parish': ('history', 'parish', str)}
+
+
+def readManifest(path):
+    """
+    Reads the list of parishes to render from a CSV file with a header row or a JSON file holding a list of objects
+    :param path: the manifest's filename
+    :return: a list of dictionaries, one for each parish
+    """
+    with open(path, newline='') as f:
+        if path.lower().endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+    baseDir = os.path.dirname(os.path.abspath(path))
+    for number, entry in enumerate(entries):
+        entry.setdefault('name', 'row ' + str(number + 1))
+        if not os.path.isabs(entry.get('output', '')):
+            entry['output'] = os.path.join(baseDir, entry.get('output', ''))
+        for field in ('config', 'history'):
+            if entry.get(field) and not os.path.isabs(entry[field]):
+                entry[field] = os.path.join(baseDir, entry[field])
+    return entries
+
+
+def manifestConfig(entry):
+    """
+    Creates the configuration for one parish, starting from its config.cfg if the manifest names one or the
+    program's defaults otherwise, then applying the values given in the manifest
+    :param entry: a dictionary from readManifest()
+    :return: a configuration dictionary
+    """
+    if entry.get('config'):
+        config = ConfigStore.load(entry['config'])
+    else:
+        config = Renderer.defaultConfig()
+        config['history']['parish'] = entry['name']     # the parishes of a manifest share a history
+    for field, (section, key, convert) in manifestFields.items():
+        value = entry.get(field)
+        if value is None or value == '':
+            continue
+        if isinstance(value, str) and convert is not str:
+            # manifests are written with US conventions whatever the locale of the machine rendering them
+            value = NumberFormat.usLocale.parse(value, integer=convert is int)
+        if section is None:
+            config[key] = convert(value)
+        else:
+            config[section][key] = convert(value)
+    if entry.get('display_color') not in (None, ''):
+        config['displayColor'] = str(entry['display_color']).lower() in ('1', 'true', 'yes', 'color')
+    if entry.get('width') and entry.get('height'):
+        config['imageSize'] = (int(entry['width']), int(entry['height']))
+    config['targets']['set'] = True
+    return config
+
+
+def renderEntry(entry):
+    """
+    Renders and saves the graphic for one parish. Runs in a worker process.
+    :param entry: a dictionary from readManifest()
+    :return: a tuple (name, output filename, seconds taken, error message or None)
+    """
+    start = time.perf_counter()
+    try:
+        config = manifestConfig(entry)
+        output = entry['output']
+        imageFormat = os.path.splitext(output)[1][1:] or config['imageStorage']['format']
+        width, height = config['imageSize']
+        if imageFormat.lower() == 'png' and width * height > TiledRender.tiledPixels:
+            TiledRender.writePng(ExportProfiles.record(config), output)     # a banner, drawn a band at a time
+        else:
+            data = Renderer.renderGraphic(config, imageFormat)
+            with open(output, 'wb') as f:
+                f.write(data)
+        error = None
+    except Exception as e:
+        error = type(e).__name__ + ': ' + str(e)
+    return entry['name'], entry['output'], time.perf_counter() - start, error
+
+
+def renderManifest(entries, workers=None, report=None):
+    """
+    Renders every parish in entries across a pool of processes. A failure in one parish is reported and the rest of
+    the batch carries on.
+    :param entries: a list of dictionaries from readManifest()
+    :param workers: the number of processes to use, defaults to the number of cores
+    :param report: a function called with each result tuple as it completes
+    :return: a list of the result tuples from renderEntry()
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')     # Qt must not be inherited through fork()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=Renderer.ensureApplication) as pool:
+        futures = [pool.submit(renderEntry, entry) for entry in entries]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if report is not None:
+                report(result)
+    return results
+
+
+def printResult(result):
+    name, output, seconds, error = result
+    if error is None:
+        print('{0:>8.3f}s  {1}  ->  {2}'.format(seconds, name, output))
+    else:
+        print('  FAILED  {0}: {1}'.format(name, error))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the BAA progress graphic for every parish in a manifest.')
+    parser.add_argument('manifest', help='a CSV or JSON file listing the parishes')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: all cores)')
+    args = parser.parse_args(argv)
+
+    entries = readManifest(args.manifest)
+    start = time.perf_counter()
+    results = renderManifest(entries, args.workers, printResult)
+    failures = [result for result in results if result[3] is not None]
+    print('{0} rendered, {1} failed in {2:.2f}s'.format(len(results) - len(failures), len(failures),
+                                                         time.perf_counter() - start))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
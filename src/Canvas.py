@@ -0,0 +1,132 @@
+"""
+The widget the progress graphic is shown in. Rather than painting an image and converting it to a pixmap for a label
+on every change, the canvas keeps the static layer and each indicator as recordings of their drawing commands and
+plays them back in its paint handler, straight onto the window. Only the rectangles of the indicators that changed
+are repainted, and because the recordings are resolution independent the graphic is drawn at the full resolution of
+high-DPI screens with no extra buffers. The exported QImage is only produced when the graphic is saved (see
+DrawingControl.exportImage()).
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+import DrawingControl
+
+
+class Scene():
+    """
+    What the canvas shows for a graphic: the recorded static layer, the style, and each indicator with its recording
+    """
+
+    def __init__(self, layer, style, indicators, pictures):
+        self.layer = layer
+        self.style = style
+        self.indicators = indicators
+        self.pictures = pictures
+
+
+class Canvas(QFrame):
+    """
+    Shows the welcome message, a saved preview image or the graphic for a Renderer.RenderContext
+    """
+
+    def __init__(self, context, parent=None):
+        super(Canvas, self).__init__(parent)
+        self.context = context
+        self.mode = None        # 'welcome', 'image' or 'graphic'
+        self.image = None
+        self.scene = None
+        self.setFrameShape(QFrame.Panel)
+        self.setFrameShadow(QFrame.Sunken)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)      # every pixel is painted, so Qt need not clear it first
+        self.fitToGraphic()
+
+    def fitToGraphic(self):
+        """
+        Makes the canvas exactly big enough for the graphic and its frame
+        :return: None
+        """
+        frameWidth = self.frameWidth()
+        self.setFixedSize(self.context.width() + 2 * frameWidth, self.context.height() + 2 * frameWidth)
+
+    def graphicRect(self, rect):
+        """
+        :param rect: a rectangle in the graphic's coordinates
+        :return: the rectangle of the canvas it is shown in
+        """
+        return QRectF(rect).translated(QPointF(self.contentsRect().topLeft())).toAlignedRect()
+
+    def showWelcome(self):
+        self.mode = 'welcome'
+        self.scene = None
+        self.image = None
+        self.update()
+
+    def showImage(self, image):
+        """
+        Shows an already drawn image of the graphic, such as the preview saved when the program was last closed
+        :return: None
+        """
+        self.mode = 'image'
+        self.scene = None
+        self.image = image
+        self.update()
+
+    def showGraphic(self):
+        """
+        Records the graphic for the context's configuration and schedules a repaint of the parts that changed
+        :raise DrawingControl.StyleError: if the style cannot be drawn
+        :return: the QRect of the graphic that changed
+        """
+        if self.width() != self.context.width() + 2 * self.frameWidth():
+            self.fitToGraphic()
+        layer = DrawingControl.recordedLayer(self.context)
+        module, style = DrawingControl.indicatorStyle(self.context)
+        indicators = module.indicatorLayout(self.context, style, layer.verticalPosition)
+        previous = self.scene if self.mode == 'graphic' else None
+        incremental = previous is not None and previous.layer.key == layer.key and \
+                      previous.style == self.context.config['style'] and len(previous.indicators) == len(indicators)
+
+        pictures = []
+        dirty = QRectF()
+        for number, indicator in enumerate(indicators):
+            if incremental:
+                old = previous.indicators[number]
+                if indicator.percent == old.percent and indicator.caption == old.caption \
+                        and indicator.color == old.color and indicator.region == old.region \
+                        and indicator.geometry == old.geometry:
+                    pictures.append(previous.pictures[number])
+                    continue
+                dirty = dirty.united(indicator.region)
+            pictures.append(DrawingControl.recordIndicator(self.context, module, style, indicator))
+        if not incremental:
+            dirty = QRectF(0, 0, self.context.width(), self.context.height())
+
+        self.mode = 'graphic'
+        self.image = None
+        self.scene = Scene(layer, self.context.config['style'], indicators, pictures)
+        if not dirty.isEmpty():
+            self.update(self.graphicRect(dirty))
+        return dirty.toAlignedRect()
+
+    def paintEvent(self, event):
+        super(Canvas, self).paintEvent(event)      # the frame
+        painter = QPainter(self)
+        try:
+            painter.setClipRect(self.contentsRect())
+            painter.translate(QPointF(self.contentsRect().topLeft()))
+            exposed = QRectF(event.rect()).translated(-QPointF(self.contentsRect().topLeft()))
+            if self.mode == 'graphic':
+                painter.drawPicture(0, 0, self.scene.layer.picture)
+                for indicator, picture in zip(self.scene.indicators, self.scene.pictures):
+                    if indicator.region.intersects(exposed):
+                        painter.drawPicture(0, 0, picture)
+            elif self.mode == 'image':
+                painter.drawImage(exposed, self.image, exposed)
+            else:
+                painter.fillRect(exposed, Qt.white)
+                if self.mode == 'welcome':
+                    DrawingControl.paintWelcome(self.context, painter)
+        finally:
+            painter.end()
@@ -0,0 +1,512 @@
+"""
+Reads and writes the program's configuration as versioned, plain data instead of a pickle of Qt objects. A config
+file is a header line followed by one JSON line per section, e.g.
+
+    {"format": "baa_progress config", "version": 4, "sections": ["imageSize", ...]}
+    {"imageSize": [640, 480]}
+    {"imageBackground": "#ffffffff"}
+    ...
+
+Colors are stored as '#aarrggbb' strings and Qt enumerations as integers. A section is only decoded (and turned back
+into Qt values) the first time it is used, and sections that were never used are written back exactly as they were
+read. Files are written to a temporary file which then replaces the old one, so a crash can never leave a half-written
+configuration. Files from older versions, including the pickled config.cfg files of earlier releases, are migrated
+when they are loaded.
+
+Usage:  python ConfigStore.py migrate config.cfg [directory ...] [--workers N] [--no-backup]
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import Renderer
+import helperFunctions
+
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+
+
+formatName = 'baa_progress config'
+currentVersion = 4          # version 1 is the pickled dictionary written by earlier releases
+
+defaultFilename = 'config.cfg'
+
+
+class ConfigError(Exception): pass
+
+
+def encodeColor(color):
+    return QColor(color).name(QColor.HexArgb)
+
+
+def decodeColor(text):
+    color = QColor(text)
+    if not color.isValid():
+        raise ConfigError("'{0}' is not a color".format(text))
+    return color
+
+
+def encodePens(pens):
+    return {name: {'color': encodeColor(pen['color']), 'width': int(pen['width']), 'style': int(pen['style']),
+                   'cap': int(pen['cap']), 'join': int(pen['join'])} for name, pen in pens.items()}
+
+
+def decodePens(pens):
+    return {name: {'color': decodeColor(pen['color']), 'width': pen['width'], 'style': Qt.PenStyle(pen['style']),
+                   'cap': Qt.PenCapStyle(pen['cap']), 'join': Qt.PenJoinStyle(pen['join'])}
+            for name, pen in pens.items()}
+
+
+def encodeBrushes(brushes):
+    encoded = {}
+    for name, brush in brushes.items():
+        plain = {'style': int(brush['style'])}
+        if 'color' in brush:
+            plain['color'] = encodeColor(brush['color'])
+        if 'colors' in brush:
+            plain['colors'] = [[float(position), encodeColor(color)] for position, color in brush['colors']]
+        encoded[name] = plain
+    return encoded
+
+
+def decodeBrushes(brushes):
+    decoded = {}
+    for name, brush in brushes.items():
+        value = {'style': Qt.BrushStyle(brush['style'])}
+        if 'color' in brush:
+            value['color'] = decodeColor(brush['color'])
+        if 'colors' in brush:
+            value['colors'] = [[position, decodeColor(color)] for position, color in brush['colors']]
+        decoded[name] = value
+    return decoded
+
+
+def encodeFonts(fonts):
+    return {name: {'fontName': font['fontName'], 'size': int(font['size']), 'weight': int(font['weight']),
+                   'italic': bool(font['italic'])} for name, font in fonts.items()}
+
+
+def decodeFonts(fonts):
+    return {name: dict(font) for name, font in fonts.items()}
+
+
+# how each section is converted to (encode) and from (decode) plain data; sections not listed are plain already
+sectionCodecs = {'imageSize': (list, tuple),
+                 'imageBackground': (encodeColor, decodeColor),
+                 'penDefinitions': (encodePens, decodePens),
+                 'brushDefinitions': (encodeBrushes, decodeBrushes),
+                 'fontDefinitions': (encodeFonts, decodeFonts)}
+
+def isNumber(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def isWholeNumber(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def isColor(value):
+    return isinstance(value, str) and QColor(value).isValid()
+
+
+# the kinds of value the schema names: how each is checked and described when a value is not of that kind
+valueKinds = {'number': (isNumber, 'a number'),
+              'whole': (isWholeNumber, 'a whole number'),
+              'bool': (lambda value: isinstance(value, bool), 'true or false'),
+              'text': (lambda value: isinstance(value, str), 'text'),
+              'year': (lambda value: isinstance(value, str) or isWholeNumber(value), 'a year'),
+              'color': (isColor, 'a color'),
+              'dict': (lambda value: isinstance(value, dict), 'a dict'),
+              'list': (lambda value: isinstance(value, list), 'a list')}
+
+# the kind of each section's plain data and, for dictionaries, the kind of value each of the keys it must have holds
+schema = {'imageSize': ('list', {}),
+          'imageBackground': ('color', {}),
+          'imageStorage': ('dict', {'path': 'text', 'basename': 'text', 'format': 'text', 'useDate': 'bool'}),
+          'targets': ('dict', {'set': 'bool', 'year': 'year', 'goal': 'number', 'families': 'number'}),
+          'current': ('dict', {'pledged': 'number', 'collected': 'number', 'families': 'number'}),
+          'type': ('text', {}),
+          'style': ('text', {}),
+          'displayColor': ('bool', {}),
+          'border': ('text', {}),
+          'heading_prefix': ('text', {}),
+          'heading': ('text', {}),
+          'penDefinitions': ('dict', {}),
+          'brushDefinitions': ('dict', {}),
+          'fontDefinitions': ('dict', {}),
+          'exportProfiles': ('list', {}),
+          'history': ('dict', {'filename': 'text', 'parish': 'text'})}
+
+# entries inside these sections must themselves have these keys, holding these kinds of value
+definitionKeys = {'penDefinitions': {'color': 'color', 'width': 'number', 'style': 'whole', 'cap': 'whole',
+                                     'join': 'whole'},
+                  'brushDefinitions': {'style': 'whole'},
+                  'fontDefinitions': {'fontName': 'text', 'size': 'number', 'weight': 'whole', 'italic': 'bool'}}
+
+
+def checkValues(where, data, kinds):
+    """
+    :param where: how the dictionary is named in an error, e.g. "'targets'"
+    :param kinds: the kind of value each key of data must hold
+    :raise ConfigError: if a key is missing or holds the wrong kind of value
+    :return: the keys that are missing
+    """
+    missing = []
+    for key, kind in kinds.items():
+        if key not in data:
+            missing.append(key)
+            continue
+        check, description = valueKinds[kind]
+        if not check(data[key]):
+            raise ConfigError("'{0}' in {1} should be {2}, not {3!r}".format(key, where, description, data[key]))
+    return missing
+
+
+def checkSection(name, data):
+    """
+    Checks a section's plain data against the schema, down to the kind of each value the program reads from it
+    :raise ConfigError: if the data is not of the expected form
+    :return: None
+    """
+    if name not in schema:
+        return
+    kind, keys = schema[name]
+    check, description = valueKinds[kind]
+    if not check(data):
+        raise ConfigError("'{0}' should be {1}, not {2!r}".format(name, description, data))
+    if name == 'imageSize' and (len(data) != 2 or not all(isWholeNumber(value) and value > 0 for value in data)):
+        raise ConfigError("'imageSize' should be a width and a height")
+    missing = checkValues("'" + name + "'", data, keys)
+    for definition, value in data.items() if name in definitionKeys else ():
+        if not isinstance(value, dict):
+            raise ConfigError("'{0}' in '{1}' should be a dict".format(definition, name))
+        missing += [definition + '.' + key
+                    for key in checkValues("'{0}.{1}'".format(name, definition), value, definitionKeys[name])]
+    if missing:
+        raise ConfigError("'{0}' is missing {1}".format(name, ', '.join(missing)))
+
+
+def encodeSection(name, value):
+    """
+    :return: the plain data stored for a configuration section
+    """
+    if name in sectionCodecs:
+        return sectionCodecs[name][0](value)
+    return value
+
+
+def decodeSection(name, data):
+    """
+    Checks a section's plain data and converts it back into the values the program uses
+    :raise ConfigError: if the data does not fit the schema
+    :return: the section's value
+    """
+    checkSection(name, data)
+    if name in sectionCodecs:
+        try:
+            return sectionCodecs[name][1](data)
+        except (KeyError, TypeError, ValueError) as err:
+            raise ConfigError("'{0}' could not be read: {1}".format(name, err))
+    return data
+
+
+class LazyConfig(MutableMapping):
+    """
+    A configuration dictionary read from a file. Each section is kept as the line of JSON it was read from until it
+    is first used. A section that cannot be decoded then raises ConfigError, unless fallback is set: a function that
+    is called with the section's name and the ConfigError, after which the section's default is used instead.
+    """
+
+    def __init__(self, rawSections=None):
+        self._raw = dict(rawSections or {})
+        self._values = {}
+        self._order = list(self._raw)
+        self.fallback = None
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in self._raw:
+                raise KeyError(key)
+            try:
+                try:
+                    data = json.loads(self._raw[key])[key]
+                except (ValueError, KeyError) as err:
+                    raise ConfigError("'{0}' could not be read: {1}".format(key, err))
+                self._values[key] = decodeSection(key, data)
+            except ConfigError as err:
+                defaults = Renderer.defaultConfig()
+                if self.fallback is None or key not in defaults:
+                    raise
+                self._values[key] = defaults[key]
+                self.fallback(key, err)
+            del self._raw[key]
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._values and key not in self._raw:
+            self._order.append(key)
+        self._raw.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._values and key not in self._raw:
+            raise KeyError(key)
+        self._raw.pop(key, None)
+        self._values.pop(key, None)
+        self._order.remove(key)
+
+    def __iter__(self):
+        return iter(list(self._order))
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, key):
+        return key in self._values or key in self._raw
+
+    def sectionLine(self, key):
+        """
+        :return: the line of JSON that stores section key, reusing the line it was read from if it was never used
+        """
+        if key in self._raw:
+            return self._raw[key]
+        return json.dumps({key: encodeSection(key, self._values[key])})
+
+    def __reduce__(self):      # pickles (e.g. to a worker process) as an ordinary dictionary
+        return dict, (dict(self.items()),)
+
+
+def migrateFromVersion1(config):
+    """
+    Migrates an unpickled legacy configuration: any section or definition added since it was written is taken from
+    the defaults, and everything it does have is kept
+    :param config: the dictionary read from a legacy config.cfg
+    :return: the equivalent configuration for the current version, as a dictionary of program values
+    """
+    migrated = Renderer.defaultConfig()
+    for key, value in config.items():
+        if key in ('penDefinitions', 'brushDefinitions', 'fontDefinitions') and isinstance(value, dict):
+            migrated[key].update(value)
+        else:
+            migrated[key] = value
+    return migrated
+
+
+def migrateFromVersion2(config):
+    """
+    Adds the export profiles introduced in version 3
+    :return: the configuration for version 3
+    """
+    if 'exportProfiles' not in config:
+        config['exportProfiles'] = Renderer.defineExportProfiles()
+    return config
+
+
+def migrateFromVersion3(config):
+    """
+    Adds the history section introduced in version 4, naming the history the program has always kept
+    :return: the configuration for version 4
+    """
+    if 'history' not in config:
+        config['history'] = Renderer.defineHistory()
+    return config
+
+
+# migrations[n] converts a version n configuration into a version n + 1 one
+migrations = {1: migrateFromVersion1, 2: migrateFromVersion2, 3: migrateFromVersion3}
+
+
+def isLegacy(data):
+    """
+    :param data: the first bytes of a config file
+    :return: True if they start a pickle written by an earlier release
+    """
+    return data[:1] == b'\x80'
+
+
+def parse(data):
+    """
+    Reads a configuration from the contents of a config file
+    :param data: the file's bytes
+    :raise ConfigError: if the file is not a configuration, was written by a newer version, or does not fit the schema
+    :return: a tuple (config, version) of the configuration, migrated to the current version if it was older, and the
+             version the file was written in
+    """
+    if isLegacy(data):
+        try:
+            config = pickle.loads(data)
+        except Exception as err:
+            raise ConfigError('the legacy configuration could not be read: {0}'.format(err))
+        if not isinstance(config, dict):
+            raise ConfigError('the legacy configuration is not a dictionary')
+        version = 1
+    else:
+        lines = data.decode('utf-8').splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            raise ConfigError('the file is not a configuration file')
+        if not isinstance(header, dict) or header.get('format') != formatName:
+            raise ConfigError('the file is not a configuration file')
+        version = header.get('version')
+        if not isinstance(version, int) or version > currentVersion:
+            raise ConfigError('the configuration was written by a newer version of the program')
+        sections = header.get('sections', [])
+        if len(lines) - 1 < len(sections):
+            raise ConfigError('the configuration is missing ' + ', '.join(sections[len(lines) - 1:]))
+        config = LazyConfig(zip(sections, lines[1:]))      # the lines are in the order the header lists them
+        if version == currentVersion:
+            return config, version
+    fromVersion = version
+    while version < currentVersion:
+        config = migrations[version](config)
+        version += 1
+    lazyConfig = LazyConfig()
+    for key in config:
+        try:
+            checkSection(key, encodeSection(key, config[key]))
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            raise ConfigError("'{0}' could not be migrated: {1}".format(key, err))
+        lazyConfig[key] = config[key]
+    return lazyConfig, fromVersion
+
+
+def load(path=defaultFilename):
+    """
+    Reads a configuration file in the current format or any earlier one
+    :param path: the config file's name
+    :raise FileNotFoundError: if there is no such file
+    :raise ConfigError: if the file cannot be used
+    :return: the configuration, a dictionary-like LazyConfig
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    return parse(data)[0]
+
+
+def dumps(config):
+    """
+    :return: the text of a config file holding config
+    """
+    if not isinstance(config, LazyConfig):
+        lazyConfig = LazyConfig()
+        lazyConfig.update(config)
+        config = lazyConfig
+    header = {'format': formatName, 'version': currentVersion, 'sections': list(config)}
+    lines = [json.dumps(header)] + [config.sectionLine(key) for key in config]
+    return '\n'.join(lines) + '\n'
+
+
+def save(config, path=defaultFilename):
+    """
+    Writes a configuration in the current format, replacing the file atomically
+    :param config: the configuration dictionary
+    :param path: the config file's name
+    :return: None
+    """
+    helperFunctions.writeAtomically(path, dumps(config).encode('utf-8'))
+
+
+def migrateFile(path, backup=True):
+    """
+    Converts one config file to the current version in place
+    :param path: the config file's name
+    :param backup: if True an older file is kept alongside as path + '.bak'
+    :return: a tuple (path, status, error) where status is 'migrated', 'current' or 'failed'
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        config, version = parse(data)
+        if version == currentVersion:
+            return path, 'current', None
+        if backup:
+            helperFunctions.writeAtomically(path + '.bak', data)
+        save(config, path)
+        return path, 'migrated', None
+    except (EnvironmentError, ConfigError) as err:
+        return path, 'failed', str(err)
+
+
+def configFiles(paths):
+    """
+    :param paths: filenames and directories; directories are searched for config.cfg files
+    :return: a list of config filenames
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, filenames in os.walk(path):
+                if defaultFilename in filenames:
+                    files.append(os.path.join(directory, defaultFilename))
+        else:
+            files.append(path)
+    return files
+
+
+def migrateFiles(paths, workers=None, backup=True, report=None):
+    """
+    Converts many config files to the current version using a pool of worker processes
+    :param paths: the config filenames
+    :param workers: the number of processes, one per core if None
+    :param backup: whether to keep a '.bak' copy of each older file
+    :param report: a function called with each result from migrateFile() as it arrives
+    :return: a list of the results from migrateFile()
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = []
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            results.append(migrateFile(path, backup))
+            if report is not None:
+                report(results[-1])
+        return results
+    chunkSize = max(1, min(64, len(paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for result in pool.map(migrateFile, paths, [backup] * len(paths), chunksize=chunkSize):
+            results.append(result)
+            if report is not None:
+                report(result)
+    return results
+
+
+def printResult(result):
+    path, status, error = result
+    if status == 'failed':
+        print('{0}: failed: {1}'.format(path, error), file=sys.stderr)
+    elif status == 'migrated':
+        print('{0}: migrated'.format(path))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Converts config.cfg files to the current configuration format.')
+    subparsers = parser.add_subparsers(dest='command')
+    migrate = subparsers.add_parser('migrate', help='convert config files written by earlier versions')
+    migrate.add_argument('paths', nargs='+', help='config files, or directories to search for config.cfg files')
+    migrate.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per core)')
+    migrate.add_argument('--no-backup', action='store_true', help="don't keep a .bak copy of each converted file")
+    options = parser.parse_args(arguments)
+    if options.command != 'migrate':
+        parser.print_help()
+        return 2
+
+    started = time.perf_counter()
+    results = migrateFiles(configFiles(options.paths), options.workers, not options.no_backup, printResult)
+    counts = {status: sum(1 for result in results if result[1] == status)
+              for status in ('migrated', 'current', 'failed')}
+    print('{0} migrated, {1} already current, {2} failed in {3:.2f}s'.format(
+        counts['migrated'], counts['current'], counts['failed'], time.perf_counter() - started))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
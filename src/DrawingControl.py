@@ -2,22 +2,84 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
-import helperFunctions
-import HIndicators, VIndicators, MIndicators
+import NumberFormat
+import RenderCache
+import StyleRegistry
+import TextLayout
+
+from collections import namedtuple
+
+
+StyleError = StyleRegistry.StyleError
+
+
+# configuration keys that affect the background, border, headings and target line but not the indicators
+staticLayerKeys = ['imageSize', 'imageBackground', 'border', 'heading_prefix', 'heading', 'targets',
+                   'penDefinitions', 'fontDefinitions']
+
+layerCache = RenderCache.RenderCache(maxEntries=8, maxBytes=64 * 1024 * 1024)
+recordingCache = RenderCache.RenderCache(maxEntries=8, maxBytes=8 * 1024 * 1024)
+
+# the last graphic shown, kept so the next start can show it before anything else has been set up
+previewFilename = 'preview.png'
+
+# what was last painted onto a context's image, so that the next paint can redraw only the indicators that changed
+Frame = namedtuple('Frame', ['layerKey', 'style', 'imageKey', 'indicators'])
+
+
+class StaticLayer():
+    """
+    The parts of the graphic that only change with the settings or targets, already painted, along with the vertical
+    position at which the indicators start
+    """
+
+    def __init__(self, key, image, verticalPosition):
+        self.key = key
+        self.image = image
+        self.verticalPosition = verticalPosition
+
+    def sizeInBytes(self):
+        return self.image.sizeInBytes()
+
+
+class RecordedLayer():
+    """
+    The static layer as a QPicture of its drawing commands rather than pixels, so it can be played back onto a
+    widget at whatever resolution the screen has
+    """
+
+    def __init__(self, key, picture, verticalPosition):
+        self.key = key
+        self.picture = picture
+        self.verticalPosition = verticalPosition
+
+    def sizeInBytes(self):
+        return self.picture.size()
+
 
 def drawWelcome(main):
     """
-    Draws and displays the welcome image the first time the program is used
+    Displays the welcome message the first time the program is used
     :return: None
     """
-    painter = QPainter(main.image)
+    main.drawingBoard.showWelcome()
+
+def paintWelcome(context, painter=None):
+    """
+    Paints the welcome image without touching any widgets
+    :param painter: an active QPainter to draw with, otherwise one is opened on context.image
+    :return: None
+    """
+    ownPainter = painter is None
+    if ownPainter:
+        painter = QPainter(context.image)
     linePen = QPen()  # default black pen 1 pixel wide
     whiteBrush = QBrush(Qt.white)  # white brush for background of rectangle
     infoFont = QFont('Arial', 12)
     painter.setPen(linePen)
     painter.setBrush(whiteBrush)
     painter.setFont(infoFont)
-    painter.drawRect(0, 0, main.image.width() - 1, main.image.height() - 1)
+    painter.drawRect(QRectF(0, 0, context.width() - 1, context.height() - 1))
     text = "Welcome to the Bishop's Annual Appeal "
     text += "Progress program!  It will draw a "
     text += "graphic indicating the parish's"
@@ -26,101 +88,289 @@ def drawWelcome(main):
     text += "above to set your goal information, "
     text += "then click the hand icon to enter "
     text += "the current data."
-    textRect = painter.boundingRect(QRectF(0, 0, main.image.width() / 2, main.image.height() / 2),
+    textRect = painter.boundingRect(QRectF(0, 0, context.width() / 2, context.height() / 2),
                                     Qt.AlignLeft | Qt.TextWordWrap,
                                     text)
-    textRect.moveCenter(QPointF(main.image.width() / 2, main.image.height() / 2))
+    textRect.moveCenter(QPointF(context.width() / 2, context.height() / 2))
     borderRect = textRect.adjusted(-5, -5, 5, 5)
     painter.drawRect(borderRect)
     painter.drawText(textRect, text)
-    main.drawingBoard.setPixmap(QPixmap.fromImage(main.image))
+    if ownPainter:
+        painter.end()
 
 def drawGraphic(main):
     """
-    Draws the graphic according to the current data and current settings.
+    Draws the graphic according to the current data and current settings and displays it in the main window. Only
+    the parts of the window that changed are repainted.
+    :return: None
+    """
+    try:
+        main.drawingBoard.showGraphic()
+    except StyleError as e:
+        QMessageBox.critical(main, "Style Error", str(e))
+
+def drawPreview(main, filename=previewFilename):
+    """
+    Displays the previewImage() saved when the program was last closed, if it was drawn from the same settings and
+    data as main.config, so the window can show its first frame before the theme is compiled or any indicator module
+    is imported
+    :return: True if the preview was shown, otherwise False
+    """
+    reader = QImageReader(filename)
+    if reader.text('fingerprint') != graphicFingerprint(main.context.config):
+        return False
+    image = reader.read()
+    if image.isNull() or image.width() != main.context.width() or image.height() != main.context.height():
+        return False
+    main.drawingBoard.showImage(image)
+    return True
+
+def exportImage(context):
+    """
+    Produces the graphic as a QImage, e.g. for saving. The window paints straight onto the screen, so the image is
+    only allocated and painted the first time it is asked for after the graphic changes.
+    :raise StyleError: if the style cannot be drawn
+    :return: context.image holding the graphic for context.config
+    """
+    if context.image.isNull() or context.image.width() != context.width() or \
+            context.image.height() != context.height():
+        context.image = QImage(context.width(), context.height(), QImage.Format_RGB32)
+        context.lastFrame = None
+    cachedGraphic(context)
+    return context.image
+
+def previewImage(context):
+    """
+    :return: a copy of the graphic tagged with the fingerprint of the configuration it was drawn from, to be saved
+             as a PNG file for drawPreview()
+    """
+    image = QImage(exportImage(context))
+    image.setText('fingerprint', graphicFingerprint(context.config))
+    return image
+
+def cachedGraphic(context, cache=None):
+    """
+    Makes context.image hold the graphic for context.config, reusing an identical graphic from the cache rather than
+    painting it again when there is one
+    :param cache: a RenderCache.RenderCache, RenderCache.defaultCache if None
+    :return: the QRect of context.image that changed
+    """
+    if cache is None:
+        cache = RenderCache.defaultCache
+    key = graphicFingerprint(context.config)
+    image = cache.get(key)
+    if image is not None:
+        context.image = QImage(image)
+        return context.image.rect()
+    dirty = paintGraphic(context)
+    cache.put(key, QImage(context.image))      # a shallow copy, so later painting on context.image leaves it alone
+    return dirty
+
+def paintGraphic(context, painter=None):
+    """
+    Paints the graphic according to the data and settings in context.config.
     This method only creates the painter and draws the border, if any, the
     heading and sub-heading then farms out the rest of the work to the 
-    methods for drawing the chosen style of indicator.
-    :return: None
+    methods for drawing the chosen style of indicator. No widgets are used so
+    it can be called from a script or a batch job.
+    When painting onto context.image the static background layer is taken from
+    a cache, so new current values only cost the repaint of the indicators, and
+    if context.image still holds the previous frame only the indicators whose
+    percent or caption changed are repainted.
+    :param context: a Renderer.RenderContext (or anything with the same attributes)
+    :param painter: an active QPainter to draw everything with, otherwise one is opened on context.image
+    :return: the QRect of context.image that changed, or None when painting with the given painter
+    """
+    if painter is not None:
+        verticalPosition = paintBackground(context, painter)
+        paintIndicators(context, painter, verticalPosition)
+        return None
+
+    layer = staticLayer(context)
+    module, style = indicatorStyle(context)
+    indicators = module.indicatorLayout(context, style, layer.verticalPosition)
+    previous = context.lastFrame
+    incremental = previous is not None and previous.layerKey == layer.key and \
+                  previous.style == context.config['style'] and previous.imageKey == context.image.cacheKey() and \
+                  len(previous.indicators) == len(indicators)
+
+    context.lastFrame = None
+    painter = QPainter(context.image)
+    try:
+        if incremental:
+            dirty = QRectF()
+            for indicator, old in zip(indicators, previous.indicators):
+                if indicator.percent == old.percent and indicator.caption == old.caption \
+                        and indicator.color == old.color and indicator.region == old.region \
+                        and indicator.geometry == old.geometry:
+                    continue
+                painter.setClipRect(indicator.region)
+                painter.setCompositionMode(QPainter.CompositionMode_Source)
+                painter.drawImage(indicator.region, layer.image, indicator.region)
+                painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+                module.drawIndicator(context, painter, style, indicator)
+                dirty = dirty.united(indicator.region)
+            dirty = dirty.toAlignedRect()
+        else:
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.drawImage(0, 0, layer.image)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            for indicator in indicators:
+                module.drawIndicator(context, painter, style, indicator)
+            dirty = QRect(0, 0, context.image.width(), context.image.height())
+    finally:
+        painter.end()
+    context.lastFrame = Frame(layer.key, context.config['style'], context.image.cacheKey(), indicators)
+    return dirty
+
+def staticLayer(context, cache=None):
+    """
+    Gets the static layer for context.config from the cache, painting it if the settings or targets have changed
+    :param cache: a RenderCache.RenderCache, layerCache if None
+    :return: a StaticLayer
+    """
+    if cache is None:
+        cache = layerCache
+    key = RenderCache.configFingerprint(context.config, staticLayerKeys)
+    layer = cache.get(key)
+    if layer is None:
+        image = QImage(context.width(), context.height(), QImage.Format_RGB32)
+        painter = QPainter(image)
+        try:
+            verticalPosition = paintBackground(context, painter)
+        finally:
+            painter.end()
+        layer = StaticLayer(key, image, verticalPosition)
+        cache.put(key, layer)
+    return layer
+
+def recordedLayer(context, cache=None):
+    """
+    Gets the static layer for context.config as a recording, recording it if the settings or targets have changed
+    :param cache: a RenderCache.RenderCache, recordingCache if None
+    :return: a RecordedLayer
+    """
+    if cache is None:
+        cache = recordingCache
+    key = RenderCache.configFingerprint(context.config, staticLayerKeys)
+    layer = cache.get(key)
+    if layer is None:
+        picture = QPicture()
+        painter = QPainter(picture)
+        try:
+            verticalPosition = paintBackground(context, painter)
+        finally:
+            painter.end()
+        layer = RecordedLayer(key, picture, verticalPosition)
+        cache.put(key, layer)
+    return layer
+
+def recordIndicator(context, module, style, indicator):
     """
-    painter = QPainter(main.image)
-    imageWidth = main.image.width()
-    imageHeight = main.image.height()
+    Records one indicator from an indicator module's indicatorLayout()
+    :return: a QPicture
+    """
+    picture = QPicture()
+    painter = QPainter(picture)
+    try:
+        module.drawIndicator(context, painter, style, indicator)
+    finally:
+        painter.end()
+    return picture
+
+def paintBackground(context, painter):
+    """
+    Draws the background, the border, if any, the heading prefix, the heading and the target goal
+    :return: the vertical position just below the target goal, where the indicators begin
+    """
+    imageWidth = context.width()
+    imageHeight = context.height()
     # gap = 35        # used to set the vertical spacing between elements
 
     # draw background
-    painter.setPen(main.pens['no_pen'])
-    painter.setBrush(main.config['imageBackground'])
-    painter.drawRect(0, 0, imageWidth, imageHeight)
-    painter.setPen(main.pens['border_pen'])
-    borderStyle = main.config['border']
+    painter.setPen(context.pens['no_pen'])
+    painter.setBrush(context.config['imageBackground'])
+    painter.drawRect(QRectF(0, 0, imageWidth, imageHeight))
+    painter.setPen(context.pens['border_pen'])
+    borderStyle = context.config['border']
     if borderStyle == 'single' or borderStyle == 'double':
-        painter.setPen(main.pens['border_pen'])
+        painter.setPen(context.pens['border_pen'])
         painter.pen().setWidth(10)
         penWidth = painter.pen().width()
-        painter.drawRect(1, 1, imageWidth-penWidth-2, imageHeight-penWidth-2)
+        painter.drawRect(QRectF(1, 1, imageWidth-penWidth-2, imageHeight-penWidth-2))
     if borderStyle == 'double':
-        painter.drawRect(4, 4, imageWidth-penWidth - 8, imageHeight - penWidth - 8)
+        painter.drawRect(QRectF(4, 4, imageWidth-penWidth - 8, imageHeight - penWidth - 8))
 
     # draw heading prefix
-    painter.setFont(main.fonts['prefixFont'])
-    textRect = painter.fontMetrics().boundingRect(main.config['heading_prefix'])
+    painter.setFont(context.fonts['prefixFont'])
+    textRect = TextLayout.textRect(painter.font(), context.config['heading_prefix'], painter.device())
     textWidth = textRect.width()
     textHeight = textRect.height()
     verticalPosition = imageHeight * (textHeight/imageHeight) - textHeight + 2
-    drawRect = painter.boundingRect((imageWidth - textWidth)/2, verticalPosition, textWidth, textHeight,
-                                    Qt.AlignCenter, main.config['heading_prefix'])
-    painter.drawText(drawRect, Qt.AlignCenter, main.config['heading_prefix'])
+    TextLayout.drawText(painter, QRectF((imageWidth - textWidth)/2, verticalPosition, textWidth, textHeight),
+                        Qt.AlignCenter, context.config['heading_prefix'])
     verticalPosition += textHeight
 
     # draw heading
-    painter.setFont(main.fonts['headingFont'])
-    textRect = painter.fontMetrics().boundingRect(main.config['heading'])
-    drawRect = painter.boundingRect((imageWidth - textRect.width())/2, verticalPosition,
-                                    textRect.width(), textRect.height(),
-                                    Qt.AlignCenter, main.config['heading'])
-    painter.drawText(drawRect, Qt.AlignCenter, main.config['heading'])
+    painter.setFont(context.fonts['headingFont'])
+    textRect = TextLayout.textRect(painter.font(), context.config['heading'], painter.device())
+    TextLayout.drawText(painter, QRectF((imageWidth - textRect.width())/2, verticalPosition,
+                                        textRect.width(), textRect.height()),
+                        Qt.AlignCenter, context.config['heading'])
     verticalPosition += textRect.height()
 
     # draw target goal text
-    painter.setFont(main.fonts['captionFont'])
-    text = 'Target Goal: ' + helperFunctions.decimalFormat(main.config['targets']['goal'], 'dollars')
-    textRect = painter.fontMetrics().boundingRect(text)
-    drawRect = painter.boundingRect((imageWidth - textRect.width())/2, verticalPosition,
-                                    textRect.width(), textRect.height(),
-                                    Qt.AlignCenter, text)
-    painter.drawText(drawRect, Qt.AlignCenter, text)
+    painter.setFont(context.fonts['captionFont'])
+    text = 'Target Goal: ' + NumberFormat.formatMoney(context.config['targets']['goal'])
+    textRect = TextLayout.textRect(painter.font(), text, painter.device())
+    TextLayout.drawText(painter, QRectF((imageWidth - textRect.width())/2, verticalPosition,
+                                        textRect.width(), textRect.height()),
+                        Qt.AlignCenter, text)
     verticalPosition += textRect.height()       # set to bottom of textRect, extra spacing added according to style
+    return verticalPosition
 
-    # draw current style of indicators
-    currentStyle = main.config['style']
-    if currentStyle == '2DHorizontal':
-        HIndicators.horizontalIndicators(main, painter, '2D', verticalPosition)
-    elif currentStyle == '3DHorizontal':
-        HIndicators.horizontalIndicators(main, painter, '3D', verticalPosition)
-    elif currentStyle == '2DVertical':
-        VIndicators.verticalIndicators(main, painter, '2D', verticalPosition)
-    elif currentStyle == '3DVertical':
-        VIndicators.verticalIndicators(main, painter, '3D', verticalPosition)
-    elif currentStyle == '2DMeters':
-        MIndicators.meterIndicators(main, painter, '2D', verticalPosition)
-    elif currentStyle == '3DMeters':
-        MIndicators.meterIndicators(main, painter, '3D', verticalPosition)
-    elif currentStyle == '2DGuages':
-        main.guageIndicators(painter, verticalPosition)
-    elif currentStyle == '3DGuages':
-        main.guageIndicators(painter, verticalPosition)
-    elif currentStyle == '2DPies':
-        main.pieIndicators(painter, verticalPosition)
-    elif currentStyle == '3DPies':
-        main.pieIndicators(painter, verticalPosition)
-    else:
-        msg = "Hmm... The program is calling for a style of display that it does not know how to draw."
-        msg += "That shouldn't have happened! Try renaming your config.cfg file, which is in the same directory"
-        msg += "as the program and then restart the program. You will have to re-enter the target information and"
-        msg += "current data and re-adjust the settings to your liking."
-        QMessageBox.critical(main, "Style Error", msg)
-
-    main.drawingBoard.setPixmap(QPixmap.fromImage(main.image))
+def indicatorStyle(context):
+    """
+    Finds the module that draws the indicators for the current style, importing it if this is its first use
+    :raise StyleError: if the style is not registered or its module cannot be loaded
+    :return: a tuple (module, '2D' or '3D')
+    """
+    renderer = StyleRegistry.lookup(context.config['style'])
+    return renderer.module, renderer.dimension
 
+def graphicKeys(config):
+    """
+    :return: the configuration keys the whole graphic depends on: those of the static layer and those the style's
+             indicators declare
+    """
+    try:
+        renderer = StyleRegistry.lookup(config['style'])
+    except StyleError:
+        return RenderCache.renderKeys
+    return staticLayerKeys + [key for key in renderer.configKeys if key not in staticLayerKeys]
 
+def graphicState(config):
+    """
+    :return: a tuple holding whatever the style's indicators depend on beyond config, e.g. the version of the history
+             the trend charts are read from, or () for a style that depends on config alone
+    """
+    try:
+        renderer = StyleRegistry.lookup(config['style'])
+    except StyleError:
+        return ()
+    return () if renderer.state is None else (renderer.state(config),)
+
+def graphicFingerprint(config, extra=()):
+    """
+    :return: a hash of everything in config and outside it that the graphic depends on, plus extra
+    """
+    return RenderCache.configFingerprint(config, graphicKeys(config), graphicState(config) + tuple(extra))
+
+def paintIndicators(context, painter, verticalPosition):
+    """
+    Draws the indicators for the current style below verticalPosition
+    :return: None
+    """
+    module, style = indicatorStyle(context)
+    for indicator in module.indicatorLayout(context, style, verticalPosition):
+        module.drawIndicator(context, painter, style, indicator)
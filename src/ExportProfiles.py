@@ -0,0 +1,298 @@
+"""
+Exports the progress graphic at several sizes and in several formats at once, e.g. a print-resolution bulletin image,
+a web-sized PNG and a small JPEG for social media. The graphic is painted only once, into a QPicture recording of the
+drawing commands, which is then played back at each output's size and encoded on a pool of threads. Each output has
+its own JPEG quality or PNG compression, and the time and bytes spent on each are reported. PNG outputs too large to
+hold in memory comfortably are drawn in bands by TiledRender.
+
+The profiles are kept in config['exportProfiles'] (see Renderer.defineExportProfiles()) as a list of dictionaries:
+    name          used in the output filename, e.g. 'web'
+    width         the width in pixels
+    height        the height in pixels; if left out it follows from the width and the graphic's proportions
+    format        'png', 'jpg' or 'bmp'
+    quality       the JPEG quality from 0 to 100, or -1 for the encoder's default
+    compression   the PNG compression level from 0 (none) to 9 (smallest)
+    palette       True to write a PNG as an 8 bit palette image (see PaletteImage, which needs NumPy; without it the
+                  PNG is written as RGB)
+
+Usage:  python ExportProfiles.py config.cfg [--output directory] [--workers N] [--report]
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import ConfigStore
+import DrawingControl
+import ImageSaver
+import Renderer
+import TiledRender
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+
+
+class ExportError(Exception): pass
+
+
+# what happened to one output: written is False when the file already held the same image and unoptimized, for a
+# palette image, is the size it would have had without a palette
+ExportResult = namedtuple('ExportResult', ['name', 'filename', 'width', 'height', 'bytes', 'seconds', 'written',
+                                           'error', 'unoptimized'], defaults=(None,))
+
+
+class Recording():
+    """
+    The drawing commands for one graphic, recorded at the size the layout was worked out for
+    """
+
+    def __init__(self, picture, width, height, background):
+        self.picture = picture
+        self.width = width
+        self.height = height
+        self.background = background
+
+
+def record(config):
+    """
+    Paints the graphic described by config into a QPicture
+    :raise DrawingControl.StyleError: if the style cannot be drawn
+    :return: a Recording
+    """
+    Renderer.ensureApplication()
+    context = Renderer.RenderContext(config, QImage())     # the recording is the paint device, so no image is needed
+    picture = QPicture()
+    painter = QPainter(picture)
+    try:
+        DrawingControl.paintGraphic(context, painter)
+    finally:
+        painter.end()
+    return Recording(picture, context.width(), context.height(), QColor(config['imageBackground']))
+
+
+def outputSize(recording, profile):
+    """
+    :return: the (width, height) in pixels of the output for profile
+    """
+    width = int(profile['width'])
+    height = profile.get('height')
+    if height is None:
+        height = int(round(width * recording.height / recording.width))
+    if width <= 0 or int(height) <= 0:
+        raise ExportError("the '{0}' profile has no size".format(profile.get('name', '')))
+    return width, int(height)
+
+
+def rasterize(recording, width, height):
+    """
+    Plays the recording back into an image of the given size. The graphic is scaled to fit and centered, and any
+    space left over because the proportions differ is filled with the background color. Safe to call from any thread.
+    :return: a QImage
+    """
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(recording.background)
+    scale = min(width / recording.width, height / recording.height)
+    painter = QPainter(image)
+    try:
+        painter.translate((width - recording.width * scale) / 2, (height - recording.height * scale) / 2)
+        painter.scale(scale, scale)
+        painter.drawPicture(0, 0, recording.picture)
+    finally:
+        painter.end()
+    return image
+
+
+def encoderQuality(profile):
+    """
+    Converts a profile's settings into the quality passed to Qt's encoder. Qt's PNG writer takes its compression
+    level from the quality, with 100 meaning no compression and 0 the most.
+    :return: an integer from 0 to 100, or -1 for the encoder's default
+    """
+    if profile['format'].lower() == 'png':
+        compression = profile.get('compression')
+        if compression is None:
+            return -1
+        compression = min(max(int(compression), 0), 9)
+        return 100 - math.ceil(compression * 91 / 9)
+    return int(profile.get('quality', -1))
+
+
+def profileFilename(profile, baseFilename):
+    """
+    :param baseFilename: the filename the outputs are named after, without an extension, e.g. './2024-baa_progress'
+    :return: the filename for profile's output, e.g. './2024-baa_progress-web.png'
+    """
+    return baseFilename + '-' + profile['name'] + '.' + profile['format'].lower()
+
+
+def paletteModule():
+    """
+    :return: the PaletteImage module, only imported once a profile asks for a palette image since it loads NumPy, or
+             None if NumPy is not installed
+    """
+    try:
+        import PaletteImage
+    except ImportError:
+        return None
+    return PaletteImage
+
+
+def exportProfile(recording, profile, filename, report=False):
+    """
+    Rasterizes, encodes and writes one output. Safe to call from any thread.
+    :param report: if True a palette image is also encoded without its palette, to report the bytes saved; this takes
+                   as long again as writing it
+    :return: an ExportResult
+    """
+    start = time.perf_counter()
+    width = height = 0
+    unoptimized = None
+    imageFormat = profile['format'].lower()
+    PaletteImage = paletteModule() if profile.get('palette') and imageFormat == 'png' else None
+    palette = PaletteImage is not None
+    try:
+        width, height = outputSize(recording, profile)
+        if imageFormat == 'png' and width * height > TiledRender.tiledPixels:
+            # too big to hold in memory comfortably, so it is drawn and compressed a band at a time
+            compression = profile.get('compression', 6)
+            if palette:
+                colors = TiledRender.choosePalette(recording, width, height)
+                written, size = TiledRender.writePng(recording, filename, width, height, compression, palette=colors)
+                if report:
+                    unoptimized = TiledRender.measurePng(recording, width, height, compression)
+            else:
+                written, size = TiledRender.writePng(recording, filename, width, height, compression)
+        else:
+            image = rasterize(recording, width, height)
+            if palette:
+                data = PaletteImage.encodePalettePng(image, None, encoderQuality(profile))
+                written, size = ImageSaver.writeData(data, filename)
+                if report:
+                    unoptimized = len(Renderer.encodeImage(image, 'png', encoderQuality(profile)))
+            else:
+                written, size = ImageSaver.writeImage(image, filename, imageFormat, encoderQuality(profile))
+        error = None
+    except Exception as err:
+        written, size, error = False, 0, type(err).__name__ + ': ' + str(err)
+    return ExportResult(profile.get('name', ''), filename, width, height, size, time.perf_counter() - start,
+                        written, error, unoptimized)
+
+
+def exportAll(config, baseFilename, profiles=None, workers=None, report=False):
+    """
+    Records the graphic once and writes an output for every profile, the outputs being made in parallel
+    :param config: a configuration dictionary
+    :param baseFilename: the filename the outputs are named after, without an extension
+    :param profiles: a list of profiles, config['exportProfiles'] if None
+    :param workers: the number of threads, one per profile (up to the number of cores) if None
+    :param report: if True the bytes saved by palette images are measured, see exportProfile()
+    :return: a list of ExportResults in the order of the profiles
+    """
+    if profiles is None:
+        profiles = config['exportProfiles']
+    if not profiles:
+        return []
+    recording = record(config)
+    if workers is None:
+        workers = min(len(profiles), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export') as pool:
+        futures = [pool.submit(exportProfile, recording, profile, profileFilename(profile, baseFilename), report)
+                   for profile in profiles]
+        return [future.result() for future in futures]
+
+
+def summary(results, seconds=None):
+    """
+    :param results: a list of ExportResults
+    :param seconds: the time taken by the whole export, if known
+    :return: a report of the outputs as a string
+    """
+    lines = []
+    for result in results:
+        if result.error is not None:
+            lines.append('{0}: FAILED  {1}'.format(result.name, result.error))
+            continue
+        if result.unoptimized is None:
+            size = '{0:,} bytes'.format(result.bytes)
+        else:
+            size = paletteModule().savings(result.bytes, result.unoptimized)
+        lines.append('{0}: {1}x{2}  {3}  {4:.2f}s  {5}{6}'.format(
+            result.name, result.width, result.height, size, result.seconds, result.filename,
+            '' if result.written else '  (unchanged)'))
+    total = sum(result.bytes for result in results)
+    if seconds is None:
+        lines.append('{0:,} bytes in all'.format(total))
+    else:
+        lines.append('{0:,} bytes in all, {1:.2f}s'.format(total, seconds))
+    saved = sum(result.unoptimized - result.bytes for result in results if result.unoptimized is not None)
+    if saved > 0:
+        lines.append('{0:,} bytes saved by palette images'.format(saved))
+    return '\n'.join(lines)
+
+
+class Exporter(QObject):
+    """
+    Runs exportAll() on a background thread so the window stays responsive. finished(results, seconds) is emitted,
+    on the GUI thread, with the list of ExportResults when it is done and failed(message) if nothing could be drawn.
+    """
+
+    finished = pyqtSignal(list, float)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super(Exporter, self).__init__(parent)
+        self._thread = None
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, config, baseFilename, profiles=None):
+        """
+        Starts exporting. config should be a copy the caller will not change while the export runs.
+        :return: False if an export is already running, otherwise True
+        """
+        if self.isRunning():
+            return False
+
+        def work():
+            start = time.perf_counter()
+            try:
+                results = exportAll(config, baseFilename, profiles)
+            except Exception as err:
+                self.failed.emit(str(err))
+                return
+            self.finished.emit(results, time.perf_counter() - start)
+
+        self._thread = threading.Thread(target=work, name='export', daemon=True)
+        self._thread.start()
+        return True
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Export the progress graphic at every size in the export profiles.')
+    parser.add_argument('config', help='the config.cfg file to draw the graphic from')
+    parser.add_argument('--output', default=None, help='the directory to write to (default: the configured path)')
+    parser.add_argument('--workers', type=int, default=None, help='number of threads (default: one per output)')
+    parser.add_argument('--report', action='store_true', help='measure the bytes saved by palette images')
+    options = parser.parse_args(arguments)
+
+    config = ConfigStore.load(options.config)
+    directory = options.output if options.output is not None else config['imageStorage']['path']
+    baseFilename = os.path.join(directory, config['imageStorage']['basename'])
+    start = time.perf_counter()
+    results = exportAll(config, baseFilename, workers=options.workers, report=options.report)
+    print(summary(results, time.perf_counter() - start))
+    return 1 if any(result.error is not None for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
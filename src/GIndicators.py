@@ -0,0 +1,146 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+import IndicatorMetrics
+import helperFunctions
+import Geometry
+import TextLayout
+
+
+def guageIndicators(context, painter, style, verticalPosition):
+    """
+    Draws all three gauge indicators in horizontal order: pledged, collected and families participating from
+    left to right according to the style selected in 'style'
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: None
+    """
+    for indicator in indicatorLayout(context, style, verticalPosition):
+        drawIndicator(context, painter, style, indicator)
+
+
+def indicatorLayout(context, style, verticalPosition):
+    """
+    Works out the caption, percent, color and position of each of the three gauge indicators without drawing
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: a list of helperFunctions.Indicator tuples for the pledged, collected and families indicators
+    """
+    gap = 20  # horizontal and vertical spacing increment
+    verticalPosition += gap  # move down a little from the heading
+    drawingWidth = (context.width() - 4 * gap) / 3  # since total image width = three images and four gaps
+    drawingHeight = (context.height() - verticalPosition) - gap / 2  # saves a little space at the bottom too
+
+    metrics = IndicatorMetrics.contextMetrics(context)
+
+    if context.config['displayColor']:
+        colors = ['red', 'green', 'blue']
+    else:
+        colors = ['gray', 'gray', 'gray']
+
+    indicators = []
+    horizontalPosition = gap
+    for color, caption, percent in zip(colors, metrics.stackedCaptions, metrics.fills):
+        region = QRectF(horizontalPosition - gap / 2, verticalPosition - gap / 2,
+                        drawingWidth + gap, drawingHeight + gap)
+        indicators.append(helperFunctions.Indicator(color, caption, percent, region,
+                                                    (horizontalPosition, verticalPosition,
+                                                     drawingWidth, drawingHeight)))
+        horizontalPosition += drawingWidth + gap
+    return indicators
+
+
+def drawIndicator(context, painter, style, indicator):
+    """
+    Draws one indicator from indicatorLayout()
+    :return: None
+    """
+    drawGuageIndicator(context, painter, style, indicator.color, indicator.caption, indicator.percent,
+                       *indicator.geometry)
+
+
+def drawGuageIndicator(context, painter, style, color, caption, percent, startX, startY, width, height):
+    """
+    Draws a gauge: a track curving round from lower left to lower right, filled up to percent, with a needle
+    pointing at the value
+    :param painter: the painter being used to draw
+    :param style: a string: '2D' or '3D'
+    :param color: currently a string 'red', 'green', 'blue' or 'gray' indicating the color of the indicator
+    :param caption: a string that will appear as the caption under each drawing
+    :param percent: a number indicating how much of the track to fill in
+    :param startY: an integer indicating the top of the drawings
+    :param width: an integer indicating the width of the containing rectangle
+    :param height: an integer indicating the height for the indicator and caption
+    :return: None
+    """
+
+    painter.setFont(context.fonts['smallCaptionFont'])
+    captionHeight = TextLayout.boundedTextRect(painter.font(),
+                                               QRect(0, 0, 640, 480),  # text should fit easily within this QRect
+                                               Qt.AlignHCenter,
+                                               'M\nM\nM', painter.device()).height() + 10  # 4-line caption + 10 px
+    indicatorHeight = height - captionHeight
+    radius = min(width / 2, indicatorHeight / 1.75) - 2  # the scale ends 45 degrees below the center
+    thickness = radius / 4
+    centerX = startX + width / 2
+    centerY = startY + (indicatorHeight - 1.7 * radius) / 2 + radius
+    track, ticks, labelPoints, needle = Geometry.gauge(centerX, centerY, radius, thickness)
+
+    if style == '2D':
+        if color == 'red':
+            valueBrush = context.fills['red_brush']
+        elif color == 'green':
+            valueBrush = context.fills['green_brush']
+        elif color == 'blue':
+            valueBrush = context.fills['blue_brush']
+        else:
+            valueBrush = context.fills['gray_brush']
+    elif style == '3D':
+        if color == 'red':
+            valueGradient = 'red_radial_gradient'
+        elif color == 'green':
+            valueGradient = 'green_radial_gradient'
+        elif color == 'blue':
+            valueGradient = 'blue_radial_gradient'
+        else:
+            valueGradient = 'gray_radial_gradient'
+        valueBrush = context.theme.radialGradient(valueGradient, centerX, centerY, radius,
+                                                  centerX - radius / 3, centerY - radius / 3)
+    trackBrush = context.fills['white_brush']
+
+    # draw the empty track, then the filled part of it clipped to the percent
+    painter.setPen(context.pens['no_pen'])
+    painter.setBrush(trackBrush)
+    painter.drawPath(track)
+    if percent > 0:
+        painter.save()
+        painter.setClipPath(Geometry.wedge(centerX, centerY, radius + 1, Geometry.gaugeStartAngle,
+                                           Geometry.gaugeSpan * percent / 100), Qt.IntersectClip)
+        painter.setBrush(valueBrush)
+        painter.drawPath(track)
+        painter.restore()
+    painter.strokePath(track, context.pens['outline_pen'])
+
+    # draw the scale
+    painter.strokePath(ticks, context.pens['outline_pen'])
+    painter.setPen(context.pens['outline_pen'])
+    for displayPercent in [0, 50, 100]:
+        fontRect = TextLayout.boundedTextRect(painter.font(), QRect(0, 0, 100, 100), Qt.AlignCenter,
+                                              str(displayPercent), painter.device())
+        numRect = QRectF(fontRect)
+        numRect.moveCenter(labelPoints[displayPercent])
+        TextLayout.drawText(painter, numRect, Qt.AlignCenter, str(displayPercent))
+
+    # draw the needle turned to the percent
+    painter.save()
+    painter.translate(centerX, centerY)
+    painter.rotate(-Geometry.gaugeAngle(percent))
+    painter.setPen(context.pens['no_pen'])
+    painter.setBrush(context.fills['black_brush'])
+    painter.drawPath(needle)
+    painter.restore()
+
+    # draw the caption
+    captionTop = startY + indicatorHeight
+    painter.setPen(context.pens['border_pen'])
+    captionRect = QRectF(startX, captionTop, width, captionHeight)
+    TextLayout.drawText(painter, captionRect, Qt.AlignCenter, caption)
@@ -0,0 +1,215 @@
+"""
+Builds the fixed outlines of the indicators (thermometer tubes and bulbs, capsule caps, meter tick marks, gauge tracks
+and needles and pie discs) as QPainterPaths once for each size and position and keeps them, so drawing a frame only
+has to work out the fill level, the clip for the percent and the angle of the needle. The meter tick math can also
+be done for many meters at once with NumPy when it is installed.
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import functools
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+meterTickPercents = (0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
+
+def meterAngle(percent):
+    """
+    :return: the angle in degrees at which a meter's needle points for the given percent
+    """
+    return 135 - 90 * percent / 100
+
+
+def meterTickEndpoints(pivotX, pivotY, innerLength, outerLength):
+    """
+    Computes the inner and outer end of every tick mark for one or many meters. With NumPy installed the arguments
+    may be arrays of the same length and all the meters are done in one pass.
+    :param pivotX: the x coordinate(s) of the needle's pivot
+    :param pivotY: the y coordinate(s) of the needle's pivot
+    :param innerLength: the distance(s) from the pivot to the inner end of the ticks
+    :param outerLength: the distance(s) from the pivot to the outer end of the ticks
+    :return: a pair (inner, outer), each holding [x, y] points indexed [meter][tick] (or just [tick] for one meter)
+    """
+    if numpy is not None:
+        radians = numpy.radians([meterAngle(percent) for percent in meterTickPercents])
+        cosines, sines = numpy.cos(radians), numpy.sin(radians)
+        pivotX = numpy.asarray(pivotX, dtype=float)[..., None]
+        pivotY = numpy.asarray(pivotY, dtype=float)[..., None]
+        innerLength = numpy.asarray(innerLength, dtype=float)[..., None]
+        outerLength = numpy.asarray(outerLength, dtype=float)[..., None]
+        inner = numpy.stack([pivotX + innerLength * cosines, pivotY - innerLength * sines], axis=-1)
+        outer = numpy.stack([pivotX + outerLength * cosines, pivotY - outerLength * sines], axis=-1)
+        return inner, outer
+
+    inner = []
+    outer = []
+    for percent in meterTickPercents:
+        angle = math.radians(meterAngle(percent))
+        inner.append([pivotX + innerLength * math.cos(angle), pivotY - innerLength * math.sin(angle)])
+        outer.append([pivotX + outerLength * math.cos(angle), pivotY - outerLength * math.sin(angle)])
+    return inner, outer
+
+
+@functools.lru_cache(maxsize=64)
+def meterTicks(pivotX, pivotY, needleLength):
+    """
+    :return: a tuple (path, labelPoints): the QPainterPath of a meter's tick marks and a dictionary giving the
+             QPointF at the inner end of the 0, 50 and 100 percent ticks, where their labels are placed
+    """
+    inner, outer = meterTickEndpoints(pivotX, pivotY, needleLength + 2, needleLength + 10)
+    path = QPainterPath()
+    labelPoints = {}
+    for number, percent in enumerate(meterTickPercents):
+        p1 = QPointF(float(inner[number][0]), float(inner[number][1]))
+        p2 = QPointF(float(outer[number][0]), float(outer[number][1]))
+        path.moveTo(p1)
+        path.lineTo(p2)
+        if percent in [0, 50, 100]:
+            labelPoints[percent] = p1
+    return path, labelPoints
+
+
+def chordPath(rect, startAngle, spanAngle):
+    """
+    :return: a closed QPainterPath matching QPainter.drawChord(rect, startAngle * 16, spanAngle * 16)
+    """
+    path = QPainterPath()
+    path.arcMoveTo(rect, startAngle)
+    path.arcTo(rect, startAngle, spanAngle)
+    path.closeSubpath()
+    return path
+
+
+@functools.lru_cache(maxsize=64)
+def thermometer(tubeLeft, tubeTop, tubeBottom, radius, bulbTop):
+    """
+    Builds the fixed parts of a thermometer
+    :return: a tuple (bulb, cap, outline) of QPainterPaths: the filled bulb, the filled cap shown at 100% and the
+             outline of the whole thermometer
+    """
+    tubeRight = tubeLeft + radius
+    bulbRectF = QRectF(tubeLeft - radius / 2, bulbTop, 2 * radius, 2 * radius)
+    capRectF = QRectF(tubeLeft, tubeTop - radius / 2, radius, radius)
+
+    outline = QPainterPath()
+    outline.arcMoveTo(bulbRectF, 60)
+    outline.arcTo(bulbRectF, 60, -300)
+    outline.moveTo(tubeLeft, tubeTop)
+    outline.lineTo(tubeLeft, tubeBottom)
+    outline.moveTo(tubeRight, tubeTop)
+    outline.lineTo(tubeRight, tubeBottom)
+    outline.arcMoveTo(capRectF, 0)
+    outline.arcTo(capRectF, 0, 180)
+
+    return chordPath(bulbRectF, 60, -300), chordPath(capRectF, 0, 180), outline
+
+
+@functools.lru_cache(maxsize=64)
+def capsule(startX, endX, startY, radius):
+    """
+    Builds the fixed parts of a horizontal indicator
+    :return: a tuple (startCap, endCap, outline) of QPainterPaths: the two filled end caps and the outline
+    """
+    startCapRect = QRectF(startX - radius, startY, 2 * radius, 2 * radius)
+    endCapRect = QRectF(endX - radius, startY, 2 * radius, 2 * radius)
+
+    outline = QPainterPath()
+    outline.arcMoveTo(startCapRect, 90)
+    outline.arcTo(startCapRect, 90, 180)
+    outline.moveTo(startX, startY)
+    outline.lineTo(endX, startY)
+    outline.moveTo(startX, startY + 2 * radius)
+    outline.lineTo(endX, startY + 2 * radius)
+    outline.arcMoveTo(endCapRect, 90)
+    outline.arcTo(endCapRect, 90, -180)
+
+    return chordPath(startCapRect, 90, 180), chordPath(endCapRect, 90, -180), outline
+
+
+gaugeStartAngle = 225       # a gauge's scale runs clockwise from 225 degrees (lower left) ...
+gaugeSpan = -270            # ... round to -45 degrees (lower right)
+
+
+def gaugeAngle(percent):
+    """
+    :return: the angle in degrees at which a gauge's needle points for the given percent
+    """
+    return gaugeStartAngle + gaugeSpan * percent / 100
+
+
+def wedge(centerX, centerY, radius, startAngle, spanAngle):
+    """
+    :return: a closed QPainterPath matching QPainter.drawPie() for the circle of the given center and radius
+    """
+    path = QPainterPath()
+    path.moveTo(centerX, centerY)
+    path.arcTo(QRectF(centerX - radius, centerY - radius, 2 * radius, 2 * radius), startAngle, spanAngle)
+    path.closeSubpath()
+    return path
+
+
+@functools.lru_cache(maxsize=64)
+def gauge(centerX, centerY, radius, thickness):
+    """
+    Builds the fixed parts of a gauge. The part of the track showing the value is drawn by clipping the track to
+    wedge(centerX, centerY, radius, gaugeStartAngle, ...) and the needle by rotating it to gaugeAngle(percent).
+    :param radius: the outer radius of the track
+    :param thickness: the width of the track
+    :return: a tuple (track, ticks, labelPoints, needle): the QPainterPath of the whole track, the tick marks inside
+             it, a dictionary giving the QPointF of the 0, 50 and 100 percent labels and the needle pointing along
+             the positive x axis from the origin
+    """
+    outerRect = QRectF(centerX - radius, centerY - radius, 2 * radius, 2 * radius)
+    innerRadius = radius - thickness
+    innerRect = QRectF(centerX - innerRadius, centerY - innerRadius, 2 * innerRadius, 2 * innerRadius)
+    track = QPainterPath()
+    track.arcMoveTo(outerRect, gaugeStartAngle)
+    track.arcTo(outerRect, gaugeStartAngle, gaugeSpan)
+    track.arcTo(innerRect, gaugeStartAngle + gaugeSpan, -gaugeSpan)
+    track.closeSubpath()
+
+    ticks = QPainterPath()
+    labelPoints = {}
+    for percent in meterTickPercents:
+        angle = math.radians(gaugeAngle(percent))
+        tickLength = thickness / 2 if percent % 50 else thickness * 0.8
+        inner = innerRadius - 2 - tickLength
+        ticks.moveTo(centerX + (innerRadius - 2) * math.cos(angle), centerY - (innerRadius - 2) * math.sin(angle))
+        ticks.lineTo(centerX + inner * math.cos(angle), centerY - inner * math.sin(angle))
+        if percent in [0, 50, 100]:
+            labelPoints[percent] = QPointF(centerX + (inner - 8) * math.cos(angle),
+                                           centerY - (inner - 8) * math.sin(angle))
+
+    needleLength = innerRadius - 4
+    needleWidth = max(2.0, thickness / 5)
+    needle = QPainterPath()
+    needle.moveTo(0, -needleWidth)
+    needle.lineTo(needleLength, 0)
+    needle.lineTo(0, needleWidth)
+    needle.closeSubpath()
+    needle.addEllipse(QPointF(0, 0), needleWidth * 1.5, needleWidth * 1.5)
+    return track, ticks, labelPoints, needle.simplified()
+
+
+@functools.lru_cache(maxsize=64)
+def pie(centerX, centerY, radius, depth):
+    """
+    Builds the fixed parts of a pie. The slice showing the value is drawn by clipping the disc (and the rim) to
+    wedge(centerX, centerY, ...) for the percent.
+    :param depth: the thickness of the rim shown below a solid pie, 0 for a flat one
+    :return: a tuple (disc, rim) of QPainterPaths: the top of the pie and its rim, which is empty when depth is 0
+    """
+    disc = QPainterPath()
+    disc.addEllipse(QPointF(centerX, centerY), radius, radius)
+    rim = QPainterPath()
+    if depth > 0:
+        rim.addRect(QRectF(centerX - radius, centerY, 2 * radius, depth))
+        rim = rim.united(disc.translated(0, depth)).subtracted(disc)
+    return disc, rim
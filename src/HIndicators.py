@@ -2,55 +2,60 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import IndicatorMetrics
 import helperFunctions
+import Geometry
+import TextLayout
 
 
-def horizontalIndicators(main, painter, style, verticalPosition):
+def horizontalIndicators(context, painter, style, verticalPosition):
     """
     Draws all three horizontal indicators in vertical order: pledged, collected and families participating from top
     to bottom according to the style selected in 'style'
     :param style: a string, either '2D' or '3D' to control the style of the indicator
     :return: None
     """
+    for indicator in indicatorLayout(context, style, verticalPosition):
+        drawIndicator(context, painter, style, indicator)
+
+
+def indicatorLayout(context, style, verticalPosition):
+    """
+    Works out the caption, percent, color and position of each of the three horizontal indicators without drawing
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: a list of helperFunctions.Indicator tuples for the pledged, collected and families indicators
+    """
     gap = 35  # vertical spacing increment
     verticalPosition += gap
-    drawingWidth = (main.image.width() - 2 * gap)  # gives a margin on each side equal to the gap
-    drawingHeight = (main.image.height() - verticalPosition - 3 * gap) / 3
-
-    values, percents, modifiers = helperFunctions.getIndicatorInfo(main)
-    pledgedString, collectedString, familiesString = values
-    pledgePercent, collectedPercent, familiesPercent = percents
-    pledgeModifier, collectedModifier, familiesModifier = modifiers
-    pledgeCaption = 'Pledged: ' + pledgedString + ' = ' + pledgeModifier + str(pledgePercent) + '%'
-    collectedCaption = 'Collected: ' + collectedString + ' = ' + collectedModifier + str(collectedPercent) + '%'
-    familiesCaption = 'Participating Families: ' + familiesString + ' = ' + \
-                      familiesModifier + str(familiesPercent) + '%'
-
-    if main.config['displayColor']:
-        drawHorizontalIndicator(main, painter, style, 'red', pledgeCaption, pledgePercent,
-                                verticalPosition, drawingWidth, drawingHeight)
-        verticalPosition += drawingHeight + gap
+    drawingWidth = (context.width() - 2 * gap)  # gives a margin on each side equal to the gap
+    drawingHeight = (context.height() - verticalPosition - 3 * gap) / 3
 
-        drawHorizontalIndicator(main, painter, style, 'green', collectedCaption, collectedPercent,
-                                verticalPosition, drawingWidth, drawingHeight)
-        verticalPosition += drawingHeight + gap
+    metrics = IndicatorMetrics.contextMetrics(context)
 
-        drawHorizontalIndicator(main, painter, style, 'blue', familiesCaption, familiesPercent,
-                                verticalPosition, drawingWidth, drawingHeight)
+    if context.config['displayColor']:
+        colors = ['red', 'green', 'blue']
     else:
-        drawHorizontalIndicator(main, painter, style, 'gray', pledgeCaption, pledgePercent,
-                                verticalPosition, drawingWidth, drawingHeight)
-        verticalPosition += drawingHeight + gap
+        colors = ['gray', 'gray', 'gray']
 
-        drawHorizontalIndicator(main, painter, style, 'gray', collectedCaption, collectedPercent,
-                                verticalPosition, drawingWidth, drawingHeight)
+    indicators = []
+    for color, caption, percent in zip(colors, metrics.lineCaptions, metrics.fills):
+        region = QRectF(gap / 2, verticalPosition - gap / 2, drawingWidth + gap, drawingHeight + gap)
+        indicators.append(helperFunctions.Indicator(color, caption, percent, region,
+                                                    (verticalPosition, drawingWidth, drawingHeight)))
         verticalPosition += drawingHeight + gap
+    return indicators
+
 
-        drawHorizontalIndicator(main, painter, style, 'gray', familiesCaption, familiesPercent,
-                                verticalPosition, drawingWidth, drawingHeight)
+def drawIndicator(context, painter, style, indicator):
+    """
+    Draws one indicator from indicatorLayout()
+    :return: None
+    """
+    drawHorizontalIndicator(context, painter, style, indicator.color, indicator.caption, indicator.percent,
+                            *indicator.geometry)
 
 
-def drawHorizontalIndicator(caller, painter, style, color, caption, percent, startY, width, height):
+def drawHorizontalIndicator(context, painter, style, color, caption, percent, startY, width, height):
     """
     Draws the current horizontal indicator with the given parameters
     :param painter: the painter being used to draw
@@ -63,85 +68,70 @@ def drawHorizontalIndicator(caller, painter, style, color, caption, percent, sta
     :param height: an integer indicating the height for the indicator and caption
     :return: None
     """
-    painter.setFont(caller.fonts['captionFont'])
+    painter.setFont(context.fonts['captionFont'])
     fontMetrics = painter.fontMetrics()
     radius = (height - fontMetrics.height()) / 2
-    startX = (caller.image.width() - width) / 2 + radius
-    endX = (caller.image.width() + width) / 2 - radius
-    startCapRect = QRectF(startX - radius, startY, 2 * radius, 2 * radius)
-    endCapRect = QRectF(endX - radius, startY, 2 * radius, 2 * radius)
-    if percent > 100:
-        percent = 100  # assure the indicator bar does not exceed the end of the indicator itself
+    startX = (context.width() - width) / 2 + radius
+    endX = (context.width() + width) / 2 - radius
+    startCap, endCap, outline = Geometry.capsule(startX, endX, startY, radius)
     centralRect = QRectF(startX, startY, percent * (endX - startX) / 100, 2 * radius)
     captionRect = QRectF(startX, startY + 2 * radius + 10, endX - startX, fontMetrics.height())
 
     if style == '2D':
         if color == 'red':
-            brush1 = caller.fills['darkRed_brush']
-            brush2 = caller.fills['darkRed_brush']
-            brush3 = caller.fills['red_brush']
+            brush1 = context.fills['darkRed_brush']
+            brush2 = context.fills['darkRed_brush']
+            brush3 = context.fills['red_brush']
         elif color == 'green':
-            brush1 = caller.fills['darkGreen_brush']
-            brush2 = caller.fills['darkGreen_brush']
-            brush3 = caller.fills['green_brush']
+            brush1 = context.fills['darkGreen_brush']
+            brush2 = context.fills['darkGreen_brush']
+            brush3 = context.fills['green_brush']
         elif color == 'blue':
-            brush1 = caller.fills['darkBlue_brush']
-            brush2 = caller.fills['darkBlue_brush']
-            brush3 = caller.fills['blue_brush']
+            brush1 = context.fills['darkBlue_brush']
+            brush2 = context.fills['darkBlue_brush']
+            brush3 = context.fills['blue_brush']
         else:
-            brush1 = caller.fills['black_brush']
-            brush2 = caller.fills['black_brush']
-            brush3 = caller.fills['gray_brush']
+            brush1 = context.fills['black_brush']
+            brush2 = context.fills['black_brush']
+            brush3 = context.fills['gray_brush']
 
     elif style == '3D':
         if color == 'red':
-            gradient1 = caller.fills['red_radial_gradient']
-            gradient2 = caller.fills['red_linear_gradient']
+            gradient1 = 'red_radial_gradient'
+            gradient2 = 'red_linear_gradient'
         elif color == 'green':
-            gradient1 = caller.fills['green_radial_gradient']
-            gradient2 = caller.fills['green_linear_gradient']
+            gradient1 = 'green_radial_gradient'
+            gradient2 = 'green_linear_gradient'
         elif color == 'blue':
-            gradient1 = caller.fills['blue_radial_gradient']
-            gradient2 = caller.fills['blue_linear_gradient']
+            gradient1 = 'blue_radial_gradient'
+            gradient2 = 'blue_linear_gradient'
         elif color == 'gray':
-            gradient1 = caller.fills['gray_radial_gradient']
-            gradient2 = caller.fills['gray_linear_gradient']
+            gradient1 = 'gray_radial_gradient'
+            gradient2 = 'gray_linear_gradient'
         else:
-            msg = "There has been an unexpected error."
-            QMessageBox.critical(caller, "Color Error", msg)
-
-        # set brushes to gradients
-        brush1 = gradient1
-        brush1.setCenter(startX, startY + radius)
-        brush1.setRadius(radius)
-        brush1.setFocalPoint(startX, startY + radius - 0.33 * radius)
-        brush2 = QRadialGradient(gradient1)
-        brush2.setCenter(endX, startY + radius)
-        brush2.setRadius(radius)
-        brush2.setFocalPoint(endX, startY + radius - 0.33 * radius)
-        brush3 = gradient2
-        brush3.setStart(startX, startY)
-        brush3.setFinalStop(startX, startY + 2 * radius)
+            raise ValueError("There has been an unexpected error: unknown indicator color '" + color + "'.")
+
+        # set brushes to gradients placed for this indicator
+        brush1 = context.theme.radialGradient(gradient1, startX, startY + radius, radius,
+                                              startX, startY + radius - 0.33 * radius)
+        brush2 = context.theme.radialGradient(gradient1, endX, startY + radius, radius,
+                                              endX, startY + radius - 0.33 * radius)
+        brush3 = context.theme.linearGradient(gradient2, startX, startY, startX, startY + 2 * radius)
 
     # draw the indicator
     # first the fill
     painter.setBrush(brush1)
-    painter.setPen(caller.pens['no_pen'])
-    painter.drawChord(startCapRect, 90 * 16, 180 * 16)
+    painter.setPen(context.pens['no_pen'])
+    painter.drawPath(startCap)
     painter.setBrush(brush2)
-    painter.drawChord(endCapRect, 90 * 16, -180 * 16)
+    painter.drawPath(endCap)
     painter.setBrush(brush3)
     painter.drawRect(centralRect)
 
     # then the outline
-    painter.setPen(caller.pens['outline_pen'])
-    painter.drawArc(startCapRect, 90 * 16, 180 * 16)
-    painter.drawLine(startX, startY, endX, startY)
-    painter.drawLine(startX, startY + 2 * radius, endX, startY + 2 * radius)
-    painter.drawArc(endCapRect, 90 * 16, -180 * 16)
+    painter.strokePath(outline, context.pens['outline_pen'])
 
     # draw the caption
     startY += centralRect.height() + 10
-    painter.setPen(caller.pens['border_pen'])
-    drawRect = painter.boundingRect(captionRect, Qt.AlignCenter, caption)
-    painter.drawText(drawRect, Qt.AlignCenter, caption)
+    painter.setPen(context.pens['border_pen'])
+    TextLayout.drawText(painter, captionRect, Qt.AlignCenter, caption)
@@ -0,0 +1,301 @@
+"""
+Keeps every set of current values that has been entered, so the progress of a campaign can be followed over time
+instead of only its latest figures. Entries are appended, never changed, to an SQLite database with one small row per
+entry: the campaign (a parish and campaign year, stored once in its own table), the time in whole seconds and the
+pledged, collected and families figures. The entries are indexed by campaign and time, so a time range or a weekly
+summary is read straight from the index without loading the rest of the history, however many years and parishes it
+holds.
+
+Usage:  python HistoryStore.py history.db entries [--parish P] [--year Y] [--start DATE] [--end DATE]
+        python HistoryStore.py history.db weekly [--parish P] [--year Y] [--start DATE] [--end DATE]
+"""
+
+from collections import namedtuple
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+
+defaultFilename = 'history.db'
+defaultParish = ''              # the program itself keeps the history of one parish
+
+weekSeconds = 7 * 24 * 3600
+weekOrigin = 4 * 24 * 3600      # weeks start on Mondays; the Unix epoch fell on a Thursday
+
+Entry = namedtuple('Entry', 'parish year recorded pledged collected families')
+Week = namedtuple('Week', 'start campaigns entries pledged collected families')
+
+schema = """
+    CREATE TABLE IF NOT EXISTS campaigns (
+        id INTEGER PRIMARY KEY,
+        parish TEXT NOT NULL,
+        year TEXT NOT NULL,
+        UNIQUE (parish, year));
+    CREATE TABLE IF NOT EXISTS entries (
+        campaign INTEGER NOT NULL REFERENCES campaigns (id),
+        recorded INTEGER NOT NULL,
+        pledged REAL NOT NULL,
+        collected REAL NOT NULL,
+        families INTEGER NOT NULL);
+    CREATE INDEX IF NOT EXISTS entriesByTime ON entries (campaign, recorded);
+"""
+
+
+class HistoryError(Exception): pass
+
+
+def timestamp(when):
+    """
+    :param when: seconds since the epoch, a datetime or date, an ISO date string such as '2017-03-05', or None
+    :return: whole seconds since the epoch, or None if when is None
+    """
+    if when is None:
+        return None
+    if isinstance(when, str):
+        try:
+            when = datetime.datetime.fromisoformat(when)
+        except ValueError:
+            raise HistoryError("'{0}' is not a date".format(when))
+    if isinstance(when, datetime.datetime):
+        return int(when.timestamp())
+    if isinstance(when, datetime.date):
+        return int(time.mktime(when.timetuple()))
+    return int(when)
+
+
+def weekNumber(seconds):
+    """
+    :return: the number of the week, counted from weekOrigin, that a time in seconds since the epoch falls in
+    """
+    return (int(seconds) - weekOrigin) // weekSeconds
+
+
+def fileVersion(filename=defaultFilename):
+    """
+    :return: the modification times and sizes of a history database and its write-ahead log, which change whenever
+             an entry is appended, or () if there is no database
+    """
+    # appending changes the write-ahead log first and the database itself when the log is checkpointed
+    return tuple((stat.st_mtime, stat.st_size) for stat in
+                 (os.stat(name) for name in (filename, filename + '-wal') if os.path.exists(name)))
+
+
+class HistoryStore():
+    """
+    An append-only history of current values for any number of parishes and campaign years. Not shared between
+    threads: each thread or process opens its own.
+    """
+
+    def __init__(self, filename=defaultFilename):
+        """
+        :param filename: the database file, which is created if it does not exist
+        :raise HistoryError: if the file cannot be opened as a history
+        """
+        self.filename = filename
+        self._campaigns = {}        # (parish, year) -> campaign id
+        try:
+            self.connection = sqlite3.connect(filename)
+            # the write-ahead log lets readers carry on while an entry is appended and makes appending a single write
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(schema)
+        except sqlite3.DatabaseError as e:
+            raise HistoryError('{0} is not a usable history: {1}'.format(filename, e))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def campaignId(self, parish, year, create=False):
+        """
+        :param create: if True, a campaign that has no entries yet is added
+        :return: the id the entries of the campaign are stored under, or None if there is no such campaign
+        """
+        key = (str(parish), str(year))
+        if key not in self._campaigns:
+            row = self.connection.execute('SELECT id FROM campaigns WHERE parish = ? AND year = ?', key).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                row = (self.connection.execute('INSERT INTO campaigns (parish, year) VALUES (?, ?)', key).lastrowid,)
+            self._campaigns[key] = row[0]
+        return self._campaigns[key]
+
+    def append(self, year, pledged, collected, families, parish=defaultParish, recorded=None):
+        """
+        Adds one entry to the history
+        :param year: the campaign year, as config['targets']['year'] holds it
+        :param recorded: when the values were entered, see timestamp(); now if None
+        :return: None
+        """
+        self.appendMany([(parish, year, recorded, pledged, collected, families)])
+
+    def appendMany(self, entries):
+        """
+        Adds many entries in a single transaction, e.g. when importing the history of earlier campaigns
+        :param entries: an iterable of Entry tuples or (parish, year, recorded, pledged, collected, families) tuples
+        :return: the number of entries added
+        """
+        now = int(time.time())
+        count = 0
+        try:
+            with self.connection:       # one transaction: all of the entries are added or none are
+                rows = []
+                for parish, year, recorded, pledged, collected, families in entries:
+                    recorded = timestamp(recorded)
+                    rows.append((self.campaignId(parish, year, create=True), now if recorded is None else recorded,
+                                 float(pledged), float(collected), int(families)))
+                    if len(rows) >= 10000:
+                        count += len(rows)
+                        self.connection.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?)', rows)
+                        rows = []
+                count += len(rows)
+                self.connection.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?)', rows)
+        except sqlite3.Error as e:
+            self._campaigns.clear()     # campaigns added by the transaction were rolled back with it
+            raise HistoryError('could not add to {0}: {1}'.format(self.filename, e))
+        return count
+
+    def _selection(self, parish, year, start, end):
+        """
+        :return: the WHERE clause and parameters choosing the entries of the given campaigns and time range. The
+                 campaigns are chosen first so the entries are read through the index one campaign at a time.
+        """
+        campaigns = []
+        parameters = []
+        if parish is not None:
+            campaigns.append('parish = ?')
+            parameters.append(str(parish))
+        if year is not None:
+            campaigns.append('year = ?')
+            parameters.append(str(year))
+        conditions = ['entries.campaign IN (SELECT id FROM campaigns{0})'.format(
+            (' WHERE ' + ' AND '.join(campaigns)) if campaigns else '')]
+        if start is not None:
+            conditions.append('entries.recorded >= ?')
+            parameters.append(timestamp(start))
+        if end is not None:
+            conditions.append('entries.recorded < ?')
+            parameters.append(timestamp(end))
+        return 'WHERE ' + ' AND '.join(conditions), parameters
+
+    def entries(self, parish=None, year=None, start=None, end=None):
+        """
+        The entries for a parish and campaign year, or all of them where either is None, from start up to but not
+        including end
+        :param start: the first time to include, see timestamp(); the beginning if None
+        :param end: the time to stop at, see timestamp(); the latest entry if None
+        :return: a generator of Entry tuples in the order they were recorded for each campaign, read from the
+                 database as they are used
+        """
+        where, parameters = self._selection(parish, year, start, end)
+        cursor = self.connection.execute(
+            'SELECT campaigns.parish, campaigns.year, entries.recorded, entries.pledged, entries.collected, '
+            'entries.families FROM entries JOIN campaigns ON campaigns.id = entries.campaign {0} '
+            'ORDER BY entries.campaign, entries.recorded'.format(where), parameters)
+        for row in cursor:
+            yield Entry(*row)
+
+    def latest(self, year, parish=defaultParish):
+        """
+        :return: the last Entry recorded for the campaign, or None if it has none
+        """
+        campaign = self.campaignId(parish, year)
+        if campaign is None:
+            return None
+        row = self.connection.execute('SELECT recorded, pledged, collected, families FROM entries WHERE campaign = ? '
+                                      'ORDER BY recorded DESC, rowid DESC LIMIT 1', (campaign,)).fetchone()
+        return None if row is None else Entry(str(parish), str(year), *row)
+
+    def _weekEnds(self, where):
+        """
+        :return: a query for the last entry of each campaign in each week chosen by where, with the columns campaign,
+                 week (counted from weekOrigin), recorded, count (the entries that week), pledged, collected, families
+        """
+        # SQLite takes the other columns from the row holding the MAX(), i.e. the last entry of each week
+        return ('SELECT entries.campaign, (entries.recorded - ?) / ? AS week, MAX(entries.recorded) AS recorded, '
+                'COUNT(*) AS count, entries.pledged, entries.collected, entries.families FROM entries {0} '
+                'GROUP BY entries.campaign, week'.format(where))
+
+    def weekly(self, parish=None, year=None, start=None, end=None):
+        """
+        Summarizes the entries week by week. The figures are running totals, so each campaign contributes the last
+        values recorded for it in a week and the campaigns entering values that week are added together.
+        :param parish: one parish, or every parish if None
+        :param year: one campaign year, or every year if None
+        :return: a list of Week tuples in time order, with the start of each week in seconds since the epoch
+        """
+        where, parameters = self._selection(parish, year, start, end)
+        rows = self.connection.execute(
+            'SELECT week, COUNT(*), SUM(count), SUM(pledged), SUM(collected), SUM(families) FROM ({0}) '
+            'GROUP BY week ORDER BY week'.format(self._weekEnds(where)), [weekOrigin, weekSeconds] + parameters)
+        return [Week(weekOrigin + week * weekSeconds, *values) for week, *values in rows]
+
+    def campaignWeeks(self, parish=None, year=None, start=None, end=None):
+        """
+        The last values entered in each week for each campaign, the series TrendAnalysis works from
+        :return: a generator of Entry tuples with the start of the week as the recorded time, ordered by campaign
+                 and week
+        """
+        where, parameters = self._selection(parish, year, start, end)
+        cursor = self.connection.execute(
+            'SELECT campaigns.parish, campaigns.year, ? + weeks.week * ?, weeks.pledged, weeks.collected, '
+            'weeks.families FROM ({0}) AS weeks JOIN campaigns ON campaigns.id = weeks.campaign '
+            'ORDER BY weeks.campaign, weeks.week'.format(self._weekEnds(where)),
+            [weekOrigin, weekSeconds, weekOrigin, weekSeconds] + parameters)
+        for row in cursor:
+            yield Entry(*row)
+
+    def campaigns(self):
+        """
+        :return: a list of (parish, year) tuples for every campaign in the history
+        """
+        return self.connection.execute('SELECT parish, year FROM campaigns ORDER BY parish, year').fetchall()
+
+
+def dateText(seconds):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(seconds))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Show the history of the current values entered for a campaign.')
+    parser.add_argument('history', help='the history database')
+    parser.add_argument('command', choices=['entries', 'weekly'], help='list every entry or a summary for each week')
+    parser.add_argument('--parish', default=None, help='only this parish')
+    parser.add_argument('--year', default=None, help='only this campaign year')
+    parser.add_argument('--start', default=None, help='the first date to include, e.g. 2017-02-01')
+    parser.add_argument('--end', default=None, help='the date to stop at')
+    options = parser.parse_args(arguments)
+    if not os.path.exists(options.history):
+        print('{0} does not exist'.format(options.history))
+        return 1
+
+    started = time.perf_counter()
+    count = 0
+    with HistoryStore(options.history) as history:
+        if options.command == 'entries':
+            for entry in history.entries(options.parish, options.year, options.start, options.end):
+                print('{0}  {1:<24} {2:<10} {3:>14,.2f} {4:>14,.2f} {5:>8,}'.format(
+                    dateText(entry.recorded), entry.parish, entry.year, entry.pledged, entry.collected,
+                    entry.families))
+                count += 1
+        else:
+            for week in history.weekly(options.parish, options.year, options.start, options.end):
+                print('{0}  {1:>5} campaigns {2:>7} entries {3:>16,.2f} {4:>16,.2f} {5:>10,}'.format(
+                    dateText(week.start)[:10], week.campaigns, week.entries, week.pledged, week.collected,
+                    week.families))
+                count += 1
+    print('{0} rows in {1:.3f}s'.format(count, time.perf_counter() - started))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
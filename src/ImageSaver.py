@@ -0,0 +1,152 @@
+"""
+Encodes and writes images on a pool of worker threads so that saving a large graphic never freezes the window.
+Each file is written to a temporary file and renamed into place, and a file whose contents would not change is left
+alone. The outcome of each save is reported through Qt signals, which are delivered on the GUI thread.
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import Renderer
+import helperFunctions
+
+from concurrent.futures import ThreadPoolExecutor, wait
+import hashlib
+import os
+import threading
+import time
+
+
+def formatFromFilename(filename):
+    """
+    :return: the image format given by filename's extension, e.g. 'png'
+    """
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension == 'jpeg':
+        return 'jpg'
+    return extension
+
+
+def fileDigest(path):
+    """
+    :return: the sha1 digest of the file at path, or None if there is no such file
+    """
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.digest()
+
+
+def writeImage(image, filename, imageFormat=None, quality=-1):
+    """
+    Encodes image and writes it to filename atomically, unless the file already holds exactly the same bytes. Safe
+    to call from any thread.
+    :param image: the QImage to save, which must not be painted on while it is being encoded
+    :param filename: the file to write
+    :param imageFormat: 'jpg', 'png' or 'bmp', taken from filename's extension if None
+    :param quality: the encoder quality, from 0 to 100, or -1 for the encoder's default
+    :return: a tuple (written, size): False if the file was left as it was, and the size of the encoded image
+    """
+    if imageFormat is None:
+        imageFormat = formatFromFilename(filename)
+    return writeData(Renderer.encodeImage(image, imageFormat, quality), filename)
+
+
+def writeData(data, filename):
+    """
+    Writes an already encoded image to filename atomically, unless the file already holds exactly the same bytes
+    :param data: the encoded image as bytes
+    :return: a tuple (written, size) as writeImage() returns
+    """
+    if fileDigest(filename) == hashlib.sha1(data).digest():
+        return False, len(data)
+    helperFunctions.writeAtomically(filename, data)
+    return True, len(data)
+
+
+class ImageSaver(QObject):
+    """
+    Saves images in the background. Connect to saved(filename, written, seconds) and failed(filename, message) to
+    hear how each save went; written is False when the file already held the same image.
+    """
+
+    saved = pyqtSignal(str, bool, float)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, workers=2, parent=None):
+        super(ImageSaver, self).__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image saver')
+        self._pending = set()
+        self._latest = {}           # filename: the number of the last save queued for it
+        self._fileLocks = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def save(self, image, filename, imageFormat=None, quality=-1, quiet=False):
+        """
+        Queues image to be encoded and written to filename
+        :param image: the QImage; the caller may go on painting on it, since only a shallow copy is kept
+        :param quiet: if True neither saved nor failed is emitted, e.g. for files the user does not know about
+        :return: a concurrent.futures.Future whose result is that of writeImage()
+        """
+        image = QImage(image)       # implicitly shared, so painting on the original detaches it from this copy
+        started = time.perf_counter()
+        key = os.path.abspath(filename)
+        with self._lock:
+            self._count += 1
+            number = self._count
+            self._latest[key] = number
+            fileLock = self._fileLocks.setdefault(key, threading.Lock())
+
+        def work():
+            with fileLock:
+                if self._latest.get(key) != number:
+                    return False, 0         # a newer image for the same file was queued after this one
+                try:
+                    result = writeImage(image, filename, imageFormat, quality)
+                except Exception as err:
+                    if not quiet:
+                        self.failed.emit(filename, str(err))
+                    raise
+            if not quiet:
+                self.saved.emit(filename, result[0], time.perf_counter() - started)
+            return result
+
+        future = self._executor.submit(work)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def pending(self):
+        """
+        :return: the number of saves that have not finished
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until every queued save has finished, e.g. before the program exits
+        :param timeout: the most seconds to wait, or None to wait as long as it takes
+        :return: True if all saves finished
+        """
+        with self._lock:
+            pending = list(self._pending)
+        done, notDone = wait(pending, timeout)
+        return not notDone
+
+    def shutdown(self):
+        """
+        Finishes the queued saves and stops the worker threads
+        :return: None
+        """
+        self._executor.shutdown(wait=True)
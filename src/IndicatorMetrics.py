@@ -0,0 +1,131 @@
+"""
+Works out the figures every style of indicator shows: the percent of the target reached by the pledges, the amount
+collected and the participating families, the fill level drawn for each (the percent clamped to 0-100), the 'almost'
+and 'over' modifiers used when a percent rounds to 100 and the formatted captions. The figures for any number of
+parishes are computed together, with NumPy when it is installed, so a batch or a server drawing many graphics does
+the arithmetic in one pass instead of once for each parish and indicator, and the amounts and percents are written
+in the user's locale by NumberFormat a column at a time. A target of zero (no goal or no families
+entered yet) gives a fill of 0 and a caption saying the target is not set instead of a division by zero.
+"""
+
+from collections import namedtuple
+import functools
+import math
+
+import NumberFormat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+labels = ('Pledged', 'Collected', 'Families')
+lineLabels = ('Pledged', 'Collected', 'Participating Families')
+unsetTexts = ('no goal set', 'no goal set', 'no family count set')
+
+# the figures of one parish; each field holds one value for each of the pledged, collected and families indicators
+Metrics = namedtuple('Metrics', ['values', 'percents', 'fills', 'modifiers', 'percentTexts', 'lineCaptions',
+                                 'stackedCaptions'])
+
+
+def valueTexts(goals, pledged, collected, targetFamilies, families):
+    """
+    :return: a list of (pledged, collected, families) strings for each parish, e.g. ('$1,250.00', '$980.00', '12 of 40')
+    """
+    locale = NumberFormat.localeFor()
+    familyTexts = [f + ' of ' + t for f, t in zip(locale.formatColumn(families, decimals=0),
+                                                   locale.formatColumn(targetFamilies, decimals=0))]
+    return list(zip(locale.formatColumn(pledged, money=True), locale.formatColumn(collected, money=True), familyTexts))
+
+
+def captionTexts(values, percentTexts, unset):
+    """
+    :param unset: a tuple for each parish telling which of its targets are zero
+    :return: a pair (lineCaptions, stackedCaptions) of lists with a tuple of three captions for each parish: one
+             line, e.g. 'Pledged: $1,250.00 = 25.0%', for the horizontal styles, and three lines for the others
+    """
+    lineCaptions = []
+    stackedCaptions = []
+    for parishValues, parishTexts, parishUnset in zip(values, percentTexts, unset):
+        lineCaptions.append(tuple(label + ': ' + value + (' (' + text + ')' if isUnset else ' = ' + text)
+                                  for label, value, text, isUnset in zip(lineLabels, parishValues, parishTexts,
+                                                                         parishUnset)))
+        stackedCaptions.append(tuple(value + '\n' + label + '\n(' + text + ')'
+                                     for label, value, text in zip(labels, parishValues, parishTexts)))
+    return lineCaptions, stackedCaptions
+
+
+def computeMetrics(goals, pledged, collected, targetFamilies, families):
+    """
+    Computes the figures for many parishes at once. Every argument is a sequence with one value for each parish.
+    :return: a list of Metrics, one for each parish
+    """
+    if numpy is not None:
+        targets = numpy.stack([numpy.asarray(goals, dtype=float)] * 2 +
+                              [numpy.asarray(targetFamilies, dtype=float)], axis=1)
+        amounts = numpy.stack([numpy.asarray(pledged, dtype=float), numpy.asarray(collected, dtype=float),
+                               numpy.asarray(families, dtype=float)], axis=1)
+        unset = targets <= 0
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            # percents to one decimal place, rounding halves up as the captions always have
+            percents = numpy.where(unset, 0.0, numpy.floor(amounts * 1000 / numpy.where(unset, 1, targets) + 0.5) / 10)
+        fills = numpy.clip(percents, 0, 100)
+        nearly = percents == 100.0
+        modifiers = numpy.where(nearly & (amounts < targets), 'almost ', numpy.where(nearly & (amounts > targets),
+                                                                                      'over ', ''))
+        percents = percents.tolist()
+        unset = unset.tolist()
+        fills = fills.tolist()
+        modifiers = modifiers.tolist()
+    else:
+        percents, unset, fills, modifiers = [], [], [], []
+        for row in zip(goals, pledged, collected, targetFamilies, families):
+            goal, parishPledged, parishCollected, parishTarget, parishFamilies = [float(value) for value in row]
+            rowPercents, rowModifiers = [], []
+            for amount, target in zip((parishPledged, parishCollected, parishFamilies), (goal, goal, parishTarget)):
+                if target <= 0:
+                    rowPercents.append(0.0)
+                    rowModifiers.append('')
+                    continue
+                percent = math.floor(amount * 1000 / target + 0.5) / 10
+                modifier = ''
+                if percent == 100.0:
+                    if amount < target: modifier = 'almost '
+                    if amount > target: modifier = 'over '
+                rowPercents.append(percent)
+                rowModifiers.append(modifier)
+            percents.append(rowPercents)
+            unset.append([target <= 0 for target in (goal, goal, parishTarget)])
+            fills.append([min(max(percent, 0.0), 100.0) for percent in rowPercents])
+            modifiers.append(rowModifiers)
+
+    numbers = NumberFormat.localeFor().formatColumn([percent for row in percents for percent in row], decimals=1)
+    percentTexts = [[unsetText if isUnset else modifier + number + '%'
+                     for unsetText, isUnset, modifier, number in zip(unsetTexts, rowUnset, rowModifiers,
+                                                                     numbers[3 * index:3 * index + 3])]
+                    for index, (rowUnset, rowModifiers) in enumerate(zip(unset, modifiers))]
+
+    values = valueTexts(goals, pledged, collected, targetFamilies, families)
+    lineCaptions, stackedCaptions = captionTexts(values, percentTexts, unset)
+    return [Metrics(*fields) for fields in zip(values, map(tuple, percents), map(tuple, fills), map(tuple, modifiers),
+                                               map(tuple, percentTexts), lineCaptions, stackedCaptions)]
+
+
+@functools.lru_cache(maxsize=256)
+def parishMetrics(goal, pledged, collected, targetFamilies, families):
+    """
+    :return: the Metrics of one parish, remembered so that drawing the same figures again costs nothing
+    """
+    return computeMetrics([goal], [pledged], [collected], [targetFamilies], [families])[0]
+
+
+def contextMetrics(context):
+    """
+    :param context: a Renderer.RenderContext
+    :return: the Metrics of the figures in the context's configuration
+    """
+    targets = context.config['targets']
+    current = context.config['current']
+    return parishMetrics(float(targets['goal']), float(current['pledged']), float(current['collected']),
+                         targets['families'], current['families'])
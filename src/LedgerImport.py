@@ -0,0 +1,507 @@
+"""
+Totals a donor ledger, the export of individual family pledges and payments kept by the parish office, so the
+current values do not have to be added up by hand. The ledger is read as a stream of rows, a chunk at a time, so its
+size does not matter: only the figures of each family are kept, never the rows. For each parish the pledged total,
+the amount collected and the number of participating families are brought up to date row by row as the chunks go by.
+
+A ledger is a CSV (or tab separated) file, or an .xlsx spreadsheet if openpyxl is installed, whose first row names
+the columns. The columns are found by name, in any order and case:
+    family      the family, e.g. an envelope number or name; also 'family id', 'donor', 'envelope' or 'household'
+    parish      optional, for a ledger covering several parishes
+    pledged     the family's pledge; also 'pledge'. A later pledge of the same family replaces the earlier one, and a
+                blank leaves it as it was, so a ledger repeating the pledge on every payment counts it only once
+    collected   a payment, added to the family's earlier payments; also 'paid', 'payment' or 'amount paid'
+Amounts are read strictly with US conventions (see NumberFormat), and rows that cannot be read are skipped and
+reported rather than guessed at. A family takes part once it has pledged or paid anything.
+
+Where the import got to and the figures of every family are kept next to the ledger, in ledger + '.import'. Importing
+the same CSV ledger again, after the office has added rows to the end of it, reads only the new rows; the rows already
+imported are checked against a digest of their bytes, which takes a fraction of the time reading them would, and if
+any of them has changed the ledger is read again from the beginning. A last row without a line break after it may
+still be being written, so it is counted but read again by the next import. A spreadsheet cannot be checked without
+reading every row of it, so it is always read in full.
+
+Usage:  python LedgerImport.py ledger.csv [--state FILE] [--restart] [--config config.cfg] [--parish P]
+"""
+
+from PyQt5.QtCore import *
+
+import ConfigStore
+import HistoryStore
+import NumberFormat
+import helperFunctions
+
+from collections import namedtuple
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import json
+import operator
+import os
+import sys
+import threading
+import time
+
+
+formatName = 'baa_progress ledger import'
+stateVersion = 2            # 2: the fingerprint covers every byte imported, not only the last 4K
+stateSuffix = '.import'
+chunkRows = 10000
+digestBlock = 1024 * 1024   # the bytes hashed at a time by fingerprint()
+maxErrors = 100             # the skipped rows reported in detail
+
+columnNames = {'family': ('family', 'family id', 'family_id', 'family number', 'donor', 'donor id', 'donor_id',
+                          'envelope', 'envelope number', 'household'),
+               'parish': ('parish', 'parish name'),
+               'pledged': ('pledged', 'pledge', 'pledge amount'),
+               'collected': ('collected', 'paid', 'payment', 'amount paid', 'payment amount')}
+
+ParishTotals = namedtuple('ParishTotals', 'pledged collected families')
+ImportResult = namedtuple('ImportResult', 'totals rows skipped errors resumed seconds')
+
+
+class LedgerError(Exception): pass
+
+
+class LedgerTotals():
+    """
+    The figures of every family in a ledger, in cents so that adding up any number of payments is exact, with the
+    totals of each parish kept up to date as rows are added
+    """
+
+    def __init__(self, families=None):
+        """
+        :param families: the figures of an earlier import, as in families
+        """
+        self.families = {}      # parish -> {family: [pledge, paid]}
+        self.sums = {}          # parish -> [pledged, collected, participating families]
+        for parish, parishFamilies in (families or {}).items():
+            for family, (pledge, paid) in parishFamilies.items():
+                self.add(parish, family, pledge, paid)
+
+    def add(self, parish, family, pledge, paid):
+        """
+        :param pledge: the family's pledge in cents, replacing any earlier one, or None if the row has none
+        :param paid: a payment in cents, added to the family's earlier payments, or None if the row has none
+        :return: None
+        """
+        parishFamilies = self.families.get(parish)
+        if parishFamilies is None:
+            parishFamilies = self.families[parish] = {}
+            self.sums[parish] = [0, 0, 0]
+        sums = self.sums[parish]
+        record = parishFamilies.get(family)
+        if record is None:
+            record = parishFamilies[family] = [0, 0]
+        participating = record[0] > 0 or record[1] > 0
+        if pledge is not None:
+            sums[0] += pledge - record[0]
+            record[0] = pledge
+        if paid is not None:
+            sums[1] += paid
+            record[1] += paid
+        sums[2] += (record[0] > 0 or record[1] > 0) - participating
+
+    def totals(self):
+        """
+        :return: a dictionary of ParishTotals, in dollars, for each parish
+        """
+        return {parish: ParishTotals(pledged / 100, collected / 100, families)
+                for parish, (pledged, collected, families) in self.sums.items()}
+
+
+def familyKey(text):
+    """
+    :return: the family as it is compared, so that 'Smith,  John' and 'smith, john' are the same family
+    """
+    if text.isdigit():
+        return text
+    return ' '.join(text.split()).casefold()
+
+
+def ledgerColumns(header):
+    """
+    :param header: the first row of the ledger
+    :raise LedgerError: if the ledger has no family column, or neither a pledged nor a collected column
+    :return: the indexes of the (family, parish, pledged, collected) columns, None for any the ledger does not have
+    """
+    names = [' '.join(str(name).replace('_', ' ').split()).casefold() for name in header]
+    indexes = []
+    for column in ('family', 'parish', 'pledged', 'collected'):
+        found = [index for index, name in enumerate(names) if name in columnNames[column]]
+        indexes.append(found[0] if found else None)
+    if indexes[0] is None:
+        raise LedgerError('The ledger has no column naming the family (e.g. "Family" or "Envelope")')
+    if indexes[2] is None and indexes[3] is None:
+        raise LedgerError('The ledger has no "Pledged" or "Collected" column')
+    return tuple(indexes)
+
+
+def readHeader(path):
+    """
+    :return: a pair (header, position): the first row of the ledger and where the rows after it start
+    """
+    if isSpreadsheet(path):
+        for position, rows in spreadsheetChunks(path, 0, 1):
+            return rows[0], position
+    else:
+        with open(path, 'rb') as f:
+            line = f.readline()
+        if line.strip():
+            return next(csv.reader([line.decode('utf-8-sig')], delimiter=delimiter(path))), len(line)
+    raise LedgerError('{0} is empty'.format(path))
+
+
+def csvChunks(path, start, size=chunkRows):
+    """
+    Reads the rows of a CSV file from a byte offset on, in chunks
+    :return: a generator of (position, rows) pairs, rows being a list of up to size rows and position, after the last
+             chunk, the offset the file ended at, where a later import carries on from
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        rows = csv.reader(text, delimiter=delimiter(path))
+        while True:
+            chunk = list(itertools.islice(rows, size))
+            if not chunk:
+                break
+            yield f.tell(), chunk
+
+
+def cellText(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def spreadsheetChunks(path, start, size=chunkRows):
+    """
+    Reads the first sheet of an .xlsx file from a row on, in chunks, without loading the whole sheet
+    :param start: the number of rows to pass over
+    :return: a generator of (rows read, rows) pairs, rows being a list of up to size rows
+    """
+    try:
+        import openpyxl
+    except ImportError:
+        raise LedgerError('Reading a spreadsheet needs openpyxl; save the ledger as CSV instead')
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(min_row=start + 1, values_only=True)
+        position = start
+        while True:
+            chunk = [[cellText(value) for value in row] for row in itertools.islice(rows, size)]
+            if not chunk:
+                break
+            position += len(chunk)
+            yield position, chunk
+    finally:
+        workbook.close()
+
+
+def isSpreadsheet(path):
+    return path.lower().endswith('.xlsx')
+
+
+def delimiter(path):
+    return '\t' if path.lower().endswith(('.tsv', '.tab')) else ','
+
+
+def ledgerChunks(path, start, size=chunkRows):
+    """
+    :param start: the position returned with the last chunk of an earlier import, or that of the first row
+    :return: a generator of (position, rows) pairs, see csvChunks()
+    """
+    if isSpreadsheet(path):
+        return spreadsheetChunks(path, start, size)
+    return csvChunks(path, start, size)
+
+
+def amounts(texts, locale):
+    """
+    Reads a column of amounts, leaving blanks out
+    :return: a pair (cents, errors): the amount of each text in cents, None for a blank or bad one, and a list of
+             (index, NumberError) for the bad ones
+    """
+    present = [index for index, text in enumerate(texts) if text and not text.isspace()]
+    values, errors = locale.parseColumn([texts[index] for index in present])
+    cents = [None] * len(texts)
+    for index, value in zip(present, values):
+        if value is not None:
+            cents[index] = round(value * 100)
+    return cents, [(present[index], error) for index, error in errors]
+
+
+def addChunk(totals, rows, columns, locale, firstRow, errors):
+    """
+    Adds a chunk of ledger rows to totals
+    :param firstRow: the row number of the first row, counting the header as row 1
+    :param errors: the list (row number, message) of rows that are skipped is extended
+    :return: the number of rows skipped
+    """
+    familyIndex, parishIndex, pledgedIndex, collectedIndex = columns
+
+    shortest = min(map(len, rows))
+
+    def column(index):
+        if index is None:
+            return [''] * len(rows)
+        if index < shortest:
+            return list(map(operator.itemgetter(index), rows))
+        return [row[index] if index < len(row) else '' for row in rows]
+
+    families = column(familyIndex)
+    parishes = column(parishIndex)
+    pledges, pledgeErrors = amounts(column(pledgedIndex), locale)
+    payments, paymentErrors = amounts(column(collectedIndex), locale)
+    bad = {}
+    for index, error in pledgeErrors:
+        bad[index] = 'pledged: ' + str(error)
+    for index, error in paymentErrors:
+        bad.setdefault(index, 'collected: ' + str(error))
+
+    skipped = 0
+    add = totals.add
+    for index, (family, parish, pledge, paid) in enumerate(zip(families, parishes, pledges, payments)):
+        if index in bad or not family or family.isspace():
+            if not any(rows[index]):
+                continue            # a blank line
+            skipped += 1
+            if len(errors) < maxErrors:
+                errors.append((firstRow + index, bad.get(index, 'no family given')))
+            continue
+        add(parish.strip() or HistoryStore.defaultParish, familyKey(family), pledge, paid)
+    return skipped
+
+
+def unfinishedLine(path):
+    """
+    :return: the offset the last line of a CSV ledger starts at if it has no line break after it, otherwise None
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, io.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(position - digestBlock, 0)
+            f.seek(start)
+            block = f.read(position - start)
+            if position == end and block.endswith((b'\n', b'\r')):
+                return None
+            lineBreak = max(block.rfind(b'\n'), block.rfind(b'\r'))
+            if lineBreak >= 0:
+                return start + lineBreak + 1
+            position = start
+    return None if end == 0 else 0
+
+
+def fingerprint(path, position):
+    """
+    :return: a digest of the first position bytes of a CSV ledger, which changes if any row already imported is
+             changed or the ledger is replaced by another
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while position > 0:
+            block = f.read(min(position, digestBlock))
+            if not block:
+                break
+            digest.update(block)
+            position -= len(block)
+    return digest.hexdigest()
+
+
+def loadState(statePath):
+    """
+    :return: the state saved by an earlier import, or None if there is none or it cannot be used
+    """
+    try:
+        with open(statePath, 'rb') as f:
+            state = json.loads(f.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get('format') != formatName or state.get('version') != stateVersion:
+        return None
+    return state
+
+
+def saveState(statePath, header, position, rows, totals, path):
+    state = {'format': formatName, 'version': stateVersion, 'header': header, 'position': position, 'rows': rows,
+             'fingerprint': None if isSpreadsheet(path) else fingerprint(path, position), 'families': totals.families}
+    helperFunctions.writeAtomically(statePath, json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+
+def importLedger(path, statePath=None, restart=False, locale=NumberFormat.usLocale, chunkSize=chunkRows):
+    """
+    Adds the rows of a ledger that are new since it was last imported to the figures kept from that import. The
+    figures are saved only once the whole ledger has been read, so a failed import leaves them as they were.
+    :param statePath: where the figures are kept, path + stateSuffix if None
+    :param restart: if True the whole ledger is read again, as if it had never been imported
+    :param locale: the NumberLocale the amounts are written in
+    :raise LedgerError: if the ledger cannot be read
+    :return: an ImportResult, whose totals cover the whole ledger and rows counts the rows read this time
+    """
+    started = time.perf_counter()
+    if statePath is None:
+        statePath = path + stateSuffix
+    try:
+        header, headerEnd = readHeader(path)
+        columns = ledgerColumns(header)
+
+        state = None if restart else loadState(statePath)
+        resumed = False
+        if state is not None and state.get('header') == header:
+            position = state.get('position')
+            if not isSpreadsheet(path) and isinstance(position, int) and headerEnd <= position <= \
+                    os.path.getsize(path) and fingerprint(path, position) == state.get('fingerprint'):
+                resumed = True
+        if resumed:
+            totals = LedgerTotals(state['families'])
+            position = state['position']
+            rowCount = state['rows']
+        else:
+            totals = LedgerTotals()
+            position = headerEnd
+            rowCount = 1
+
+        # a last line without a line break is held back from the figures saved, so that an import after the rest of it
+        # is written reads it again, whole, instead of carrying on from the middle of it
+        lastLine = None if isSpreadsheet(path) else unfinishedLine(path)
+        newRows = 0
+        skipped = 0
+        errors = []
+        held = []
+        for position, rows in ledgerChunks(path, position, chunkSize):
+            if lastLine is not None:
+                rows = held + rows
+                held = rows[-1:]
+                del rows[-1:]
+            if rows:
+                skipped += addChunk(totals, rows, columns, locale, rowCount + 1, errors)
+                rowCount += len(rows)
+                newRows += len(rows)
+        if not held:
+            saveState(statePath, header, position, rowCount, totals, path)
+        else:
+            if not any('\n' in field or '\r' in field for field in held[0]):
+                # otherwise the row started before the last line break, and the figures saved earlier still hold
+                saveState(statePath, header, lastLine, rowCount, totals, path)
+            skipped += addChunk(totals, held, columns, locale, rowCount + 1, errors)
+            newRows += 1
+    except UnicodeDecodeError as e:
+        raise LedgerError('{0} is not a UTF-8 text file: {1}'.format(path, e))
+    except (OSError, csv.Error) as e:
+        raise LedgerError('{0} could not be read: {1}'.format(path, e))
+    return ImportResult(totals.totals(), newRows, skipped, errors, resumed, time.perf_counter() - started)
+
+
+def applyTotals(config, totals, parish=None):
+    """
+    Puts the totals of a parish into config['current']
+    :param totals: the totals of an ImportResult
+    :param parish: the parish; may be None if the ledger holds only one
+    :raise LedgerError: if the parish is not in the ledger, or none was given and the ledger holds several
+    :return: the ParishTotals used
+    """
+    if parish is None:
+        if len(totals) != 1:
+            raise LedgerError('The ledger holds {0} parishes; choose one of them'.format(len(totals)) if totals
+                              else 'The ledger has no rows')
+        parish = next(iter(totals))
+    if parish not in totals:
+        raise LedgerError("The ledger has no rows for the parish '{0}'".format(parish))
+    parishTotals = totals[parish]
+    config['current']['pledged'] = parishTotals.pledged
+    config['current']['collected'] = parishTotals.collected
+    config['current']['families'] = parishTotals.families
+    return parishTotals
+
+
+def summary(result):
+    """
+    :return: a few lines of text describing an ImportResult
+    """
+    lines = ['{0:,} new rows read in {1:.2f}s{2}'.format(result.rows, result.seconds,
+                                                          ', carrying on from the last import' if result.resumed
+                                                          else '')]
+    for parish, totals in sorted(result.totals.items()):
+        lines.append('{0}: {1} pledged, {2} collected, {3} families'.format(
+            parish or 'Parish', NumberFormat.formatMoney(totals.pledged), NumberFormat.formatMoney(totals.collected),
+            NumberFormat.formatCount(totals.families)))
+    if result.skipped:
+        lines.append('{0:,} rows skipped:'.format(result.skipped))
+        lines.extend('  row {0}: {1}'.format(row, message) for row, message in result.errors[:10])
+        if result.skipped > 10:
+            lines.append('  ...')
+    return '\n'.join(lines)
+
+
+class LedgerImporter(QObject):
+    """
+    Runs importLedger() on a background thread so the window stays responsive. finished(result) is emitted, on the
+    GUI thread, with the ImportResult when it is done and failed(message) if the ledger could not be read.
+    """
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super(LedgerImporter, self).__init__(parent)
+        self._thread = None
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, path, **options):
+        """
+        Starts importing path; options are passed on to importLedger()
+        :return: False if an import is already running, otherwise True
+        """
+        if self.isRunning():
+            return False
+
+        def work():
+            try:
+                result = importLedger(path, **options)
+            except LedgerError as err:
+                self.failed.emit(str(err))
+                return
+            self.finished.emit(result)
+
+        self._thread = threading.Thread(target=work, name='ledger import', daemon=True)
+        self._thread.start()
+        return True
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Total the pledges and payments in a donor ledger.')
+    parser.add_argument('ledger', help='the ledger, a CSV file or an .xlsx spreadsheet')
+    parser.add_argument('--state', default=None, help='where the import is kept (default: the ledger + .import)')
+    parser.add_argument('--restart', action='store_true', help='read the whole ledger again')
+    parser.add_argument('--config', default=None, help='a config.cfg file to put the totals into')
+    parser.add_argument('--parish', default=None, help='the parish whose totals go into the config file')
+    options = parser.parse_args(arguments)
+
+    try:
+        result = importLedger(options.ledger, options.state, options.restart)
+        print(summary(result))
+        if options.config is not None:
+            config = ConfigStore.load(options.config)
+            applyTotals(config, result.totals, options.parish)
+            ConfigStore.save(config, options.config)
+            print('Current values saved to {0}'.format(options.config))
+    except (LedgerError, ConfigStore.ConfigError, OSError) as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,58 +2,65 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import IndicatorMetrics
 import helperFunctions
+import Geometry
+import TextLayout
+import Resources
 
 
 
-def meterIndicators(main, painter, style, verticalPosition):
+def meterIndicators(context, painter, style, verticalPosition):
     """
     Draws all three meter indicators in horizontal order: pledged, collected and families participating from
     left to right according to the style selected in 'style'
     :param style: a string, either '2D' or '3D' to control the style of the indicator
     :return: None
     """
+    for indicator in indicatorLayout(context, style, verticalPosition):
+        drawIndicator(context, painter, style, indicator)
 
+
+def indicatorLayout(context, style, verticalPosition):
+    """
+    Works out the caption, percent, color and position of each of the three meter indicators without drawing
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: a list of helperFunctions.Indicator tuples for the pledged, collected and families indicators
+    """
     gap = 20  # horizontal and vertical spacing increment
     verticalPosition += gap  # move down a little from the heading
-    drawingWidth = (main.image.width() - 4 * gap) / 3  # since total image width = three images and four gaps
-    drawingHeight = (main.image.height() - verticalPosition) - gap / 2  # saves a little space at the bottom too
-
-    values, percents, modifiers = helperFunctions.getIndicatorInfo(main)
-    pledgedString, collectedString, familiesString = values
-    pledgePercent, collectedPercent, familiesPercent = percents
-    pledgeModifier, collectedModifier, familiesModifier = modifiers
-    pledgeCaption = pledgedString + '\n' + 'Pledged\n' + pledgeModifier + '(' + str(pledgePercent) + '%)'
-    collectedCaption = collectedString + ' \n' + 'Collected\n' + '(' + collectedModifier \
-                       + str(collectedPercent) + '%)'
-    familiesCaption = familiesString + '\n' + 'Families\n' + \
-                      '(' + familiesModifier + str(familiesPercent) + '%)'
+    drawingWidth = (context.width() - 4 * gap) / 3  # since total image width = three images and four gaps
+    drawingHeight = (context.height() - verticalPosition) - gap / 2  # saves a little space at the bottom too
 
-    horizontalPosition = gap
-    if main.config['displayColor']:
-        drawMeterIndicator(main, painter, style, 'red', pledgeCaption, pledgePercent,
-                           horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
-        horizontalPosition += drawingWidth + gap
-
-        drawMeterIndicator(main, painter, style, 'green', collectedCaption, collectedPercent,
-                           horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
-        horizontalPosition += drawingWidth + gap
+    metrics = IndicatorMetrics.contextMetrics(context)
 
-        drawMeterIndicator(main, painter, style, 'blue', familiesCaption, familiesPercent,
-                           horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
+    if context.config['displayColor']:
+        colors = ['red', 'green', 'blue']
     else:
-        drawMeterIndicator(main, painter, style, 'gray', pledgeCaption, pledgePercent,
-                           horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
-        horizontalPosition += drawingWidth + gap
+        colors = ['gray', 'gray', 'gray']
 
-        drawMeterIndicator(main, painter, style, 'gray', collectedCaption, collectedPercent,
-                           horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
+    indicators = []
+    horizontalPosition = gap
+    for color, caption, percent in zip(colors, metrics.stackedCaptions, metrics.fills):
+        region = QRectF(horizontalPosition - gap / 2, verticalPosition - gap / 2,
+                        drawingWidth + gap, drawingHeight + gap)
+        indicators.append(helperFunctions.Indicator(color, caption, percent, region,
+                                                    (horizontalPosition, verticalPosition,
+                                                     drawingWidth, drawingHeight)))
         horizontalPosition += drawingWidth + gap
+    return indicators
+
+
+def drawIndicator(context, painter, style, indicator):
+    """
+    Draws one indicator from indicatorLayout()
+    :return: None
+    """
+    drawMeterIndicator(context, painter, style, indicator.color, indicator.caption, indicator.percent,
+                       *indicator.geometry)
 
-        drawMeterIndicator(main, painter, style, 'gray', familiesCaption, familiesPercent,
-                           horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
 
-def drawMeterIndicator(main, painter, style, color, caption, percent, startX, startY, width, height):
+def drawMeterIndicator(context, painter, style, color, caption, percent, startX, startY, width, height):
     """
     Draws the current horizontal indicator with the given parameters
     :param painter: the painter being used to draw
@@ -68,71 +75,66 @@ def drawMeterIndicator(main, painter, style, color, caption, percent, startX, st
     """
 
     # Calculate drawing parameters
-    painter.setFont(main.fonts['captionFont'])
-    fontMetrics = painter.fontMetrics()
-    captionHeight = fontMetrics.boundingRect(QRect(0, 0, 640, 480),  # text should fit easily within this QRect
-                                              Qt.AlignHCenter,
-                                              'M\nM\nM').height() + 10  # allows for 4-line families caption + 10 px
+    painter.setFont(context.fonts['captionFont'])
+    captionHeight = TextLayout.boundedTextRect(painter.font(),
+                                               QRect(0, 0, 640, 480),  # text should fit easily within this QRect
+                                               Qt.AlignHCenter,
+                                               'M\nM\nM', painter.device()).height() + 10  # 4-line caption + 10 px
     indicatorHeight = height - 2 * captionHeight
     meterTop = startY + captionHeight / 2
-    pivotPoint = QPoint(startX + width / 2, meterTop + indicatorHeight * 0.7 + 10)
+    pivotPoint = QPointF(startX + width / 2, meterTop + indicatorHeight * 0.7 + 10)
     meterBaseTop = pivotPoint.y() - 10
-    if percent > 100:
-        percent = 100
     needleLength = pivotPoint.y() - meterTop - 30
-    needleAngle = 135 - 90 * percent/100
+    needleAngle = Geometry.meterAngle(percent)
     needleEndpoint = helperFunctions.getPointPolar(pivotPoint, needleLength, needleAngle)
 
     if color == 'red':
-        meterPen = main.pens['red_pen']
-        meterBrush = main.fills['red_brush']
+        meterPen = context.pens['red_pen']
+        meterBrush = context.fills['red_brush']
     elif color == 'green':
-        meterPen = main.pens['green_pen']
-        meterBrush = main.fills['green_brush']
+        meterPen = context.pens['green_pen']
+        meterBrush = context.fills['green_brush']
     elif color == 'blue':
-        meterPen = main.pens['blue_pen']
-        meterBrush = main.fills['blue_brush']
+        meterPen = context.pens['blue_pen']
+        meterBrush = context.fills['blue_brush']
     else:
-        bulbBrush = main.fills['darkGray_brush']
-        mercuryBrush = main.fills['gray_brush']
+        meterPen = context.pens['outline_pen']
+        meterBrush = context.fills['gray_brush']
 
     # Draw Meter
-    painter.setPen(main.pens['outline_pen'])
-    for displayPercent in [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]:
-        angle = 135 - 90 * displayPercent/100
-        p1 = helperFunctions.getPointPolar(pivotPoint, needleLength + 2, angle)
-        p2 = helperFunctions.getPointPolar(pivotPoint, needleLength + 10, angle)
-        painter.drawLine(p1, p2)
-        if displayPercent in [0, 50, 100]:
-            painter.setFont(main.fonts['smallCaptionFont'])
-            fontMetrics = painter.fontMetrics()
-            fontRect = fontMetrics.boundingRect(QRect(0, 0, 100, 100), Qt.AlignCenter, str(displayPercent))
-            numWidth = fontRect.width()
-            numHeight = fontRect.height()
-            offset = (50 - displayPercent) / 6
-            numRect = QRect(p1.x() + offset - numWidth/2, p1.y(), numWidth, numHeight)
-            drawRect = painter.boundingRect(numRect, Qt.AlignCenter, str(displayPercent))
-            painter.drawText(drawRect, Qt.AlignCenter, str(displayPercent))
+    painter.setPen(context.pens['outline_pen'])
+    ticks, labelPoints = Geometry.meterTicks(pivotPoint.x(), pivotPoint.y(), needleLength)
+    painter.strokePath(ticks, context.pens['outline_pen'])
+    for displayPercent in [0, 50, 100]:
+        p1 = labelPoints[displayPercent]
+        painter.setFont(context.fonts['smallCaptionFont'])
+        fontRect = TextLayout.boundedTextRect(painter.font(), QRect(0, 0, 100, 100), Qt.AlignCenter,
+                                              str(displayPercent), painter.device())
+        numWidth = fontRect.width()
+        numHeight = fontRect.height()
+        offset = (50 - displayPercent) / 6
+        numRect = QRectF(p1.x() + offset - numWidth/2, p1.y(), numWidth, numHeight)
+        TextLayout.drawText(painter, numRect, Qt.AlignCenter, str(displayPercent))
     painter.drawLine(pivotPoint, needleEndpoint)
     painter.setPen(meterPen)
     painter.setBrush(meterBrush)
-    painter.drawRoundedRect(startX, meterBaseTop + 1, width, indicatorHeight * 0.3, 15.0, 15.0)
-    painter.setPen(main.pens['outline_pen'])
-    painter.drawLine(startX, meterBaseTop, startX + width - 1, meterBaseTop)
-    painter.drawEllipse(pivotPoint.x()-20, pivotPoint.y()-20, 40, 40)
-    painter.setPen(main.pens['no_pen'])
-    painter.drawRect(startX, meterBaseTop + 1, width, indicatorHeight * 0.2)
-    painter.setPen(main.pens['border_pen'])
-    painter.setBrush(main.fills['no_brush'])
-    painter.drawRoundedRect(startX, meterTop, width, indicatorHeight, 15.0, 15.0)
+    painter.drawRoundedRect(QRectF(startX, meterBaseTop + 1, width, indicatorHeight * 0.3), 15.0, 15.0)
+    painter.setPen(context.pens['outline_pen'])
+    painter.drawLine(QPointF(startX, meterBaseTop), QPointF(startX + width - 1, meterBaseTop))
+    painter.drawEllipse(pivotPoint, 20, 20)
+    painter.setPen(context.pens['no_pen'])
+    painter.drawRect(QRectF(startX, meterBaseTop + 1, width, indicatorHeight * 0.2))
+    painter.setPen(context.pens['border_pen'])
+    painter.setBrush(context.fills['no_brush'])
+    painter.drawRoundedRect(QRectF(startX, meterTop, width, indicatorHeight), 15.0, 15.0)
 
     # Draw 3D meters over the rest of it if selected
     if style == '3D':
-        meterImage = QImage('./images/blue_meter.png')
-        painter.drawImage(startX, meterTop, meterImage)
+        meterImage = Resources.image('images/blue_meter.png', QSize(int(width), int(indicatorHeight)))
+        if not meterImage.isNull():
+            painter.drawImage(QPointF(startX, meterTop), meterImage)
 
     # Draw caption
     captionTop = startY + indicatorHeight + captionHeight/2
     captionRect = QRectF(startX, captionTop, width, captionHeight)
-    drawRect = painter.boundingRect(captionRect, Qt.AlignCenter, caption)
-    painter.drawText(drawRect, Qt.AlignCenter, caption)
+    TextLayout.drawText(painter, captionRect, Qt.AlignCenter, caption)
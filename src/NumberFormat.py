@@ -0,0 +1,268 @@
+"""
+Formats and reads the amounts of money and counts of families the program deals with, following the decimal point,
+digit grouping and currency symbol of the user's locale (from QLocale). Formatting is done by Python's own number
+formatting with the separators swapped in afterwards, and reading by a regular expression compiled once for each
+locale, so whole columns of an import can be formatted or read at a time without building strings one character at
+a time. Reading is strict: anything that is not a well formed number, such as a letter, a misplaced separator or a
+second decimal point, is reported with its position in the text rather than quietly dropped, and negative numbers
+keep their sign.
+"""
+
+from PyQt5.QtCore import *
+
+import functools
+import re
+
+
+spaces = ' \xa0\u202f'    # a locale grouping with any kind of space accepts all of them when reading
+
+
+class NumberError(ValueError):
+    """
+    A piece of text that is not a number. position is the index of the first character at fault.
+    """
+
+    def __init__(self, message, text, position):
+        super(NumberError, self).__init__(message)
+        self.message = message
+        self.text = text
+        self.position = position
+
+    def __str__(self):
+        return '{0} (at character {1} of "{2}")'.format(self.message, self.position + 1, self.text)
+
+
+class NumberLocale():
+    """
+    How numbers are written in a locale: the decimal point, the separator between groups of thousands, the sign of a
+    negative number and the text put before and after an amount of money, e.g. '$' and '' or '' and '\xa0€'
+    """
+
+    def __init__(self, decimalPoint='.', groupSeparator=',', currencyPrefix='$', currencySuffix='', negativeSign='-'):
+        self.decimalPoint = decimalPoint
+        self.groupSeparator = groupSeparator
+        self.currencyPrefix = currencyPrefix
+        self.currencySuffix = currencySuffix
+        self.negativeSign = negativeSign
+        self._separators = str.maketrans({',': groupSeparator, '.': decimalPoint})
+        self._groupDeletion = str.maketrans('', '', spaces if groupSeparator in spaces else groupSeparator)
+        groups = re.escape(groupSeparator) if groupSeparator not in spaces else '[' + spaces + ']'
+        signs = '[' + re.escape('-' + negativeSign + '\u2212') + ']'
+        symbols = [symbol.strip(spaces) for symbol in (currencyPrefix, currencySuffix) if symbol.strip(spaces)]
+        symbol = '(?:' + '|'.join(re.escape(symbol) for symbol in symbols) + ')' if symbols else '(?!)'
+        self.groupPattern = groups
+        self.signPattern = signs
+        self.symbolPattern = symbol
+        pattern = (r'\s*(?P<sign>{sign})?\s*(?:{symbol}\s*)?(?P<sign2>{sign})?\s*'
+                   r'(?P<whole>\d{{1,3}}(?:{group}\d{{3}})+|\d+)?{fraction}\s*(?:{symbol}\s*)?')
+        self._patterns = {}
+        for integer in (False, True):
+            fraction = '(?P<fraction>)' if integer else r'(?:{0}(?P<fraction>\d+))?'.format(re.escape(decimalPoint))
+            self._patterns[integer] = re.compile(pattern.format(sign=signs, symbol=symbol, group=groups,
+                                                                fraction=fraction))
+
+    def __repr__(self):
+        return 'NumberLocale({0!r}, {1!r}, {2!r}, {3!r}, {4!r})'.format(
+            self.decimalPoint, self.groupSeparator, self.currencyPrefix, self.currencySuffix, self.negativeSign)
+
+    def formatNumber(self, value, decimals=2):
+        """
+        :return: value with its thousands grouped and the given number of decimals, e.g. '12,345.60'
+        """
+        return '{0:,.{1}f}'.format(value, decimals).translate(self._separators)
+
+    def formatMoney(self, value):
+        """
+        :return: value as an amount of money, e.g. '$12,345.60', '-$5.00' or '12.345,60 €'
+        """
+        text = self.formatNumber(value)
+        if text[0] == '-':
+            return self.negativeSign + self.currencyPrefix + text[1:] + self.currencySuffix
+        return self.currencyPrefix + text + self.currencySuffix
+
+    def formatCount(self, value):
+        """
+        :return: a whole number with its thousands grouped, e.g. '1,204'
+        """
+        return '{0:,d}'.format(int(value)).translate(self._separators)
+
+    def parse(self, text, integer=False):
+        """
+        Reads a number written in this locale, with or without grouping, the currency symbol and a sign
+        :param integer: if True, only a whole number is accepted and an int returned
+        :raise NumberError: if text is not a number
+        :return: the float, or int, text holds
+        """
+        match = self._patterns[integer].fullmatch(text)
+        if match is None:
+            raise self.error(text, integer)
+        sign, sign2, whole, fraction = match.groups()
+        if (whole is None and not fraction) or (sign and sign2):
+            raise self.error(text, integer)
+        if whole is None:
+            whole = '0'
+        elif not whole.isdigit():
+            whole = whole.translate(self._groupDeletion)
+        value = int(whole) if integer else float(whole + '.' + fraction if fraction else whole)
+        return -value if sign or sign2 else value
+
+    def error(self, text, integer=False):
+        """
+        Works out what is wrong with text, which parse() has turned down; only used once parsing has failed, so it
+        need not be quick
+        :return: a NumberError
+        """
+        position = 0
+        length = len(text)
+
+        def skipSpaces(position):
+            while position < length and text[position].isspace():
+                position += 1
+            return position
+
+        def skip(pattern, position):
+            match = re.compile(pattern).match(text, position)
+            return match.end() if match else position
+
+        position = skipSpaces(position)
+        if position == length:
+            return NumberError('A number is needed', text, position)
+        signed = skip(self.signPattern, position)
+        hasSign = signed > position
+        position = skipSpaces(skip(self.symbolPattern, skipSpaces(signed)))
+        if re.match(self.signPattern, text[position:position + 1]):
+            if hasSign:
+                return NumberError('The number has more than one sign', text, position)
+            position = skipSpaces(position + 1)
+
+        start = position
+        lastGroup = None
+        while position < length:
+            character = text[position]
+            if character.isdigit():
+                position += 1
+            elif re.match(self.groupPattern, character):
+                digits = position - (start if lastGroup is None else lastGroup + 1)
+                if digits == 0 or (lastGroup is None and digits > 3) or (lastGroup is not None and digits != 3):
+                    return NumberError('A digit group separator is out of place', text, position)
+                lastGroup = position
+                position += 1
+            else:
+                break
+        if position < length and text[position] != self.decimalPoint and not text[position].isspace() and \
+                re.match(self.symbolPattern, text[position:]) is None:
+            return NumberError("'{0}' is not part of a number".format(text[position]), text, position)
+        if lastGroup is not None and position - lastGroup - 1 != 3:
+            return NumberError('A digit group separator is out of place', text, lastGroup)
+
+        if position < length and text[position] == self.decimalPoint:
+            if integer:
+                return NumberError('A whole number is needed', text, position)
+            position += 1
+            fractionStart = position
+            while position < length and text[position].isdigit():
+                position += 1
+            if position == fractionStart:
+                return NumberError('Digits are needed after the decimal point', text, position)
+            if position < length and (text[position] == self.decimalPoint or
+                                      re.match(self.groupPattern, text[position])):
+                return NumberError('The number has a separator after its decimals', text, position)
+        elif position == start:
+            return NumberError("'{0}' is not part of a number".format(text[position]) if position < length
+                               else 'A number is needed', text, position)
+
+        position = skipSpaces(skip(self.symbolPattern, skipSpaces(position)))
+        if position < length:
+            return NumberError("'{0}' is not part of a number".format(text[position]), text, position)
+        return NumberError('The text is not a number', text, 0)
+
+    def parseColumn(self, texts, integer=False):
+        """
+        Reads a whole column of numbers, e.g. from an import, without stopping at the bad ones
+        :param texts: an iterable of strings
+        :param integer: if True, only whole numbers are accepted
+        :return: a pair (values, errors): the numbers, with None for each text that is not one, and a list of
+                 (index, NumberError) for those
+        """
+        values = []
+        errors = []
+        parse = self.parse
+        known = {}          # a column repeats the same few amounts many times over, so each is read only once
+        for index, text in enumerate(texts):
+            value = known.get(text)
+            if value is None:
+                try:
+                    value = known[text] = parse(text, integer)
+                except NumberError as e:
+                    errors.append((index, e))
+            values.append(value)
+        return values, errors
+
+    def formatColumn(self, values, money=False, decimals=2):
+        """
+        Formats a whole column of numbers at a time
+        :param money: if True, as amounts of money; otherwise as numbers with the given decimals
+        :return: a list of strings
+        """
+        if money:
+            return [self.formatMoney(value) for value in values]
+        pattern = '{0:,.' + str(int(decimals)) + 'f}'
+        separators = self._separators
+        return [pattern.format(value).translate(separators) for value in values]
+
+
+usLocale = NumberLocale('.', ',', '$', '', '-')
+
+
+@functools.lru_cache(maxsize=16)
+def _localeNamed(name):
+    qlocale = QLocale(name)
+    if qlocale.language() == QLocale.C or not qlocale.currencySymbol():
+        # the C locale of a bare system has no currency; the program has always shown dollars
+        return NumberLocale(qlocale.decimalPoint(), qlocale.groupSeparator() or ',', '$', '', qlocale.negativeSign())
+    # the text around the digits of zero is the currency symbol and its spacing
+    sample = qlocale.toCurrencyString(0.0)
+    first = sample.index('0')
+    last = sample.rindex('0')
+    return NumberLocale(qlocale.decimalPoint(), qlocale.groupSeparator(), sample[:first], sample[last + 1:],
+                        qlocale.negativeSign())
+
+
+def localeFor(qlocale=None):
+    """
+    :param qlocale: a QLocale, the program's default locale (normally the system's) if None
+    :return: the NumberLocale of the same conventions, made only once for each locale
+    """
+    return _localeNamed((qlocale if qlocale is not None else QLocale()).name())
+
+
+def formatMoney(value, locale=None):
+    """
+    :param locale: a NumberLocale, the default locale's if None
+    :return: value as an amount of money, e.g. '$12,345.60'
+    """
+    return (locale or localeFor()).formatMoney(value)
+
+
+def formatNumber(value, decimals=2, locale=None):
+    return (locale or localeFor()).formatNumber(value, decimals)
+
+
+def formatCount(value, locale=None):
+    return (locale or localeFor()).formatCount(value)
+
+
+def parseMoney(text, locale=None):
+    """
+    :raise NumberError: if text is not an amount of money or a plain number
+    :return: the amount as a float
+    """
+    return (locale or localeFor()).parse(text)
+
+
+def parseCount(text, locale=None):
+    """
+    :raise NumberError: if text is not a whole number
+    :return: the count as an int
+    """
+    return (locale or localeFor()).parse(text, integer=True)
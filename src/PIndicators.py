@@ -0,0 +1,149 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+import IndicatorMetrics
+import helperFunctions
+import Geometry
+import TextLayout
+
+
+def pieIndicators(context, painter, style, verticalPosition):
+    """
+    Draws all three pie indicators in horizontal order: pledged, collected and families participating from
+    left to right according to the style selected in 'style'
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: None
+    """
+    for indicator in indicatorLayout(context, style, verticalPosition):
+        drawIndicator(context, painter, style, indicator)
+
+
+def indicatorLayout(context, style, verticalPosition):
+    """
+    Works out the caption, percent, color and position of each of the three pie indicators without drawing
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: a list of helperFunctions.Indicator tuples for the pledged, collected and families indicators
+    """
+    gap = 20  # horizontal and vertical spacing increment
+    verticalPosition += gap  # move down a little from the heading
+    drawingWidth = (context.width() - 4 * gap) / 3  # since total image width = three images and four gaps
+    drawingHeight = (context.height() - verticalPosition) - gap / 2  # saves a little space at the bottom too
+
+    metrics = IndicatorMetrics.contextMetrics(context)
+
+    if context.config['displayColor']:
+        colors = ['red', 'green', 'blue']
+    else:
+        colors = ['gray', 'gray', 'gray']
+
+    indicators = []
+    horizontalPosition = gap
+    for color, caption, percent in zip(colors, metrics.stackedCaptions, metrics.fills):
+        region = QRectF(horizontalPosition - gap / 2, verticalPosition - gap / 2,
+                        drawingWidth + gap, drawingHeight + gap)
+        indicators.append(helperFunctions.Indicator(color, caption, percent, region,
+                                                    (horizontalPosition, verticalPosition,
+                                                     drawingWidth, drawingHeight)))
+        horizontalPosition += drawingWidth + gap
+    return indicators
+
+
+def drawIndicator(context, painter, style, indicator):
+    """
+    Draws one indicator from indicatorLayout()
+    :return: None
+    """
+    drawPieIndicator(context, painter, style, indicator.color, indicator.caption, indicator.percent,
+                     *indicator.geometry)
+
+
+def drawPieIndicator(context, painter, style, color, caption, percent, startX, startY, width, height):
+    """
+    Draws a pie with a slice, starting at twelve o'clock and going clockwise, for the percent
+    :param painter: the painter being used to draw
+    :param style: a string: '2D' or '3D'
+    :param color: currently a string 'red', 'green', 'blue' or 'gray' indicating the color of the indicator
+    :param caption: a string that will appear as the caption under each drawing
+    :param percent: a number indicating how much of the pie to fill in
+    :param startY: an integer indicating the top of the drawings
+    :param width: an integer indicating the width of the containing rectangle
+    :param height: an integer indicating the height for the indicator and caption
+    :return: None
+    """
+
+    painter.setFont(context.fonts['smallCaptionFont'])
+    captionHeight = TextLayout.boundedTextRect(painter.font(),
+                                               QRect(0, 0, 640, 480),  # text should fit easily within this QRect
+                                               Qt.AlignHCenter,
+                                               'M\nM\nM', painter.device()).height() + 10  # 4-line caption + 10 px
+    indicatorHeight = height - captionHeight
+    radius = min(width, indicatorHeight) / 2 - 4
+    depth = 0
+    if style == '3D':
+        depth = radius / 6      # the rim shown below a solid pie
+        radius = min(width / 2, (indicatorHeight - depth) / 2) - 4
+        depth = radius / 6
+    centerX = startX + width / 2
+    centerY = startY + (indicatorHeight - depth) / 2
+    disc, rim = Geometry.pie(centerX, centerY, radius, depth)
+
+    if style == '2D':
+        if color == 'red':
+            sliceBrush = context.fills['red_brush']
+        elif color == 'green':
+            sliceBrush = context.fills['green_brush']
+        elif color == 'blue':
+            sliceBrush = context.fills['blue_brush']
+        else:
+            sliceBrush = context.fills['gray_brush']
+    elif style == '3D':
+        if color == 'red':
+            sliceGradient = 'red_radial_gradient'
+            rimBrush = context.fills['darkRed_brush']
+        elif color == 'green':
+            sliceGradient = 'green_radial_gradient'
+            rimBrush = context.fills['darkGreen_brush']
+        elif color == 'blue':
+            sliceGradient = 'blue_radial_gradient'
+            rimBrush = context.fills['darkBlue_brush']
+        else:
+            sliceGradient = 'gray_radial_gradient'
+            rimBrush = context.fills['black_brush']
+        sliceBrush = context.theme.radialGradient(sliceGradient, centerX, centerY, 1.5 * radius,
+                                                  centerX - radius / 2, centerY - radius / 2)
+    pieBrush = context.fills['white_brush']
+
+    # draw the rim of a solid pie, then the whole pie, then the slice clipped to the percent
+    slicePath = Geometry.wedge(centerX, centerY, radius + depth + 1, 90, -360 * percent / 100)
+    painter.setPen(context.pens['no_pen'])
+    if depth > 0:
+        painter.setBrush(context.fills['darkGray_brush'])
+        painter.drawPath(rim)
+        if percent > 0:
+            painter.save()
+            painter.setClipPath(slicePath, Qt.IntersectClip)
+            painter.setBrush(rimBrush)
+            painter.drawPath(rim)
+            painter.restore()
+        painter.strokePath(rim, context.pens['outline_pen'])
+    painter.setBrush(pieBrush)
+    painter.drawPath(disc)
+    if percent > 0:
+        painter.save()
+        painter.setClipPath(slicePath, Qt.IntersectClip)
+        painter.setBrush(sliceBrush)
+        painter.drawPath(disc)
+        painter.restore()
+    painter.strokePath(disc, context.pens['outline_pen'])
+    if 0 < percent < 100:
+        painter.save()
+        painter.setClipPath(disc, Qt.IntersectClip)
+        painter.strokePath(slicePath, context.pens['outline_pen'])
+        painter.restore()
+
+    # draw the caption
+    captionTop = startY + indicatorHeight
+    painter.setPen(context.pens['border_pen'])
+    captionRect = QRectF(startX, captionTop, width, captionHeight)
+    TextLayout.drawText(painter, captionRect, Qt.AlignCenter, caption)
@@ -0,0 +1,283 @@
+"""
+Shrinks PNG files by storing the graphic with a palette of at most 256 colors and one byte per pixel instead of three.
+The flat (2D) styles use only a handful of fill colors plus the shades along the edges of anti-aliased text, so the
+most common colors cover practically every pixel and the palette reproduces the image exactly. The gradients of the
+solid (3D) styles have more colors than a palette can hold; for those the palette is chosen by median cut in the
+OKLab color space, where equal distances look equally different, and the in-between shades are dithered with an
+ordered pattern so the gradients stay smooth. Colors that fill large areas, like the background and the fills, are
+always kept exactly and never dithered.
+
+Usage:  python PaletteImage.py image.png|config.cfg output.png [--colors N] [--dither | --no-dither]
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import ConfigStore
+import Renderer
+import helperFunctions
+
+import argparse
+import numpy
+import os
+import sys
+
+
+maxColors = 256
+flatCoverage = 0.999        # an image whose most common colors cover this fraction of its pixels is treated as flat
+pinnedFraction = 0.002      # colors covering at least this fraction of the pixels are always kept exactly
+lutBits = 5                 # bits per channel of the table mapping colors to their nearest palette entry
+maxDitherStep = 48          # the largest step, in RGB levels, an ordered dither may jump
+
+# the 8x8 Bayer matrix, as thresholds from -0.5 to 0.5
+bayer = numpy.array([[0, 32, 8, 40, 2, 34, 10, 42],
+                     [48, 16, 56, 24, 50, 18, 58, 26],
+                     [12, 44, 4, 36, 14, 46, 6, 38],
+                     [60, 28, 52, 20, 62, 30, 54, 22],
+                     [3, 35, 11, 43, 1, 33, 9, 41],
+                     [51, 19, 59, 27, 49, 17, 57, 25],
+                     [15, 47, 7, 39, 13, 45, 5, 37],
+                     [63, 31, 55, 23, 61, 29, 53, 21]], dtype=numpy.float32) / 64 - 0.5
+
+
+def pixelArray(image):
+    """
+    :param image: a QImage
+    :return: a height x width numpy array of 0xAARRGGBB pixels, which is a copy of the image's data
+    """
+    if image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32):
+        image = image.convertToFormat(QImage.Format_RGB32)
+    data = numpy.frombuffer(image.constBits().asstring(image.sizeInBytes()), dtype=numpy.uint32)
+    return data.reshape(image.height(), image.bytesPerLine() // 4)[:, :image.width()] | numpy.uint32(0xff000000)
+
+
+def channels(pixels):
+    """
+    :param pixels: an array of 0xAARRGGBB pixels
+    :return: an array with a last axis of the red, green and blue values as integers
+    """
+    return numpy.stack([(pixels >> 16) & 0xff, (pixels >> 8) & 0xff, pixels & 0xff], axis=-1).astype(numpy.int32)
+
+
+def oklab(rgb):
+    """
+    Converts sRGB colors to the OKLab color space
+    :param rgb: an array with a last axis of red, green and blue values from 0 to 255
+    :return: a float32 array with a last axis of L, a and b
+    """
+    c = numpy.asarray(rgb, dtype=numpy.float32) / 255
+    c = numpy.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    lms = c @ numpy.array([[0.4122214708, 0.2119034982, 0.0883024619],
+                           [0.5363325363, 0.6806995451, 0.2817188376],
+                           [0.0514459929, 0.1073969566, 0.6299787005]], dtype=numpy.float32)
+    return numpy.cbrt(lms) @ numpy.array([[0.2104542553, 1.9779984951, 0.0259040371],
+                                          [0.7936177850, -2.4285922050, 0.7827717662],
+                                          [-0.0040720468, 0.4505937099, -0.8086757660]], dtype=numpy.float32)
+
+
+def nearest(points, palette, chunk=4096):
+    """
+    :param points: an N x 3 array of colors in OKLab
+    :param palette: an M x 3 array of colors in OKLab
+    :return: for every point the index of the nearest palette color
+    """
+    result = numpy.empty(len(points), dtype=numpy.intp)
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        distances = ((block[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        result[start:start + chunk] = distances.argmin(axis=1)
+    return result
+
+
+def medianCut(rgb, weights, count):
+    """
+    Chooses count colors to represent a weighted set of colors by repeatedly splitting the box of colors whose
+    colors are furthest from their mean, in OKLab, at the weighted median of its widest axis
+    :param rgb: an N x 3 array of distinct colors
+    :param weights: the number of pixels of each color
+    :return: a list of colors as (r, g, b) tuples
+    """
+    lab = oklab(rgb)
+    boxes = [numpy.arange(len(rgb))]
+
+    def spread(box):
+        w = weights[box]
+        mean = (lab[box] * w[:, None]).sum(axis=0) / w.sum()
+        return (((lab[box] - mean) ** 2) * w[:, None]).sum()
+
+    spreads = [spread(boxes[0])]
+    while len(boxes) < count:
+        widest = int(numpy.argmax(spreads))
+        box = boxes[widest]
+        if len(box) < 2 or spreads[widest] <= 0:
+            break
+        axis = int(numpy.argmax(lab[box].max(axis=0) - lab[box].min(axis=0)))
+        box = box[numpy.argsort(lab[box, axis], kind='stable')]
+        cumulative = numpy.cumsum(weights[box])
+        cut = int(numpy.searchsorted(cumulative, cumulative[-1] / 2)) + 1
+        cut = min(max(cut, 1), len(box) - 1)
+        boxes[widest:widest + 1] = [box[:cut], box[cut:]]
+        spreads[widest:widest + 1] = [spread(box[:cut]), spread(box[cut:])]
+    colors = []
+    for box in boxes:
+        w = weights[box].astype(numpy.float64)
+        colors.append(tuple(int(round(value)) for value in (rgb[box] * w[:, None]).sum(axis=0) / w.sum()))
+    return colors
+
+
+class Palette():
+    """
+    A palette of up to 256 colors chosen for an image, which maps any image painted with the same colors to palette
+    indexes. Because the dither pattern depends only on a pixel's position, bands of a large image can be mapped one
+    at a time with exactly the same result as mapping the whole image.
+    """
+
+    def __init__(self, colors, dither):
+        """
+        :param colors: a list of (r, g, b) tuples, the first ones being the colors kept exactly
+        :param dither: True to dither colors that are not in the palette
+        """
+        self.colors = list(colors)
+        self.dither = dither
+        rgb = numpy.array(self.colors, dtype=numpy.int32).reshape(-1, 3)
+        packed = numpy.uint32(0xff000000) | (rgb[:, 0] << 16 | rgb[:, 1] << 8 | rgb[:, 2]).astype(numpy.uint32)
+        self._order = numpy.argsort(packed)
+        self._sorted = packed[self._order]
+
+        # the nearest palette color for every color, at lutBits per channel
+        levels = 1 << lutBits
+        step = 256 // levels
+        grid = numpy.arange(levels) * step + step // 2
+        cells = numpy.stack(numpy.meshgrid(grid, grid, grid, indexing='ij'), axis=-1).reshape(-1, 3)
+        self._lut = nearest(oklab(cells), oklab(rgb)).astype(numpy.uint8)
+
+        # how far apart neighboring palette colors are, which sets how strongly their in-between shades are dithered
+        if len(rgb) > 1:
+            distances = numpy.sqrt(((rgb[:, None, :] - rgb[None, :, :]) ** 2).sum(axis=2).astype(numpy.float32))
+            numpy.fill_diagonal(distances, numpy.inf)
+            self._steps = numpy.minimum(distances.min(axis=1), maxDitherStep).astype(numpy.float32)
+        else:
+            self._steps = numpy.zeros(1, dtype=numpy.float32)
+
+    def colorTable(self):
+        """
+        :return: the palette as a list of 0xAARRGGBB values for QImage.setColorTable()
+        """
+        return [0xff000000 | (r << 16) | (g << 8) | b for r, g, b in self.colors]
+
+    def _lookup(self, rgb):
+        shift = 8 - lutBits
+        return self._lut[((rgb[..., 0] >> shift) << (2 * lutBits)) | ((rgb[..., 1] >> shift) << lutBits) |
+                         (rgb[..., 2] >> shift)]
+
+    def indexes(self, pixels, top=0):
+        """
+        :param pixels: a height x width array of 0xAARRGGBB pixels, e.g. from pixelArray()
+        :param top: the row of the whole image the first row of pixels is, so the dither pattern lines up across bands
+        :return: a height x width uint8 array of palette indexes
+        """
+        pixels = pixels | numpy.uint32(0xff000000)
+        position = numpy.minimum(numpy.searchsorted(self._sorted, pixels), len(self._sorted) - 1)
+        exact = self._sorted[position] == pixels
+        result = self._order[position].astype(numpy.uint8)
+        if exact.all():
+            return result
+        rows, columns = numpy.nonzero(~exact)
+        rgb = channels(pixels[rows, columns])
+        if self.dither:
+            steps = self._steps[self._lookup(rgb)]
+            threshold = bayer[(rows + top) % 8, columns % 8]
+            rgb = numpy.clip(rgb + (threshold * steps)[:, None], 0, 255).astype(numpy.int32)
+        result[rows, columns] = self._lookup(rgb)
+        return result
+
+    def indexedImage(self, image):
+        """
+        :param image: a QImage painted with the colors the palette was chosen for
+        :return: a QImage in Format_Indexed8 using the palette
+        """
+        data = numpy.ascontiguousarray(self.indexes(pixelArray(image)))
+        indexed = QImage(data.tobytes(), image.width(), image.height(), image.width(), QImage.Format_Indexed8).copy()
+        indexed.setColorTable(self.colorTable())
+        return indexed
+
+
+def choosePalette(image, colors=maxColors, dither=None):
+    """
+    Chooses a palette for image. If its most common colors cover flatCoverage of the pixels they are used as they are;
+    otherwise the colors covering large areas are kept and the rest of the palette is chosen by median cut.
+    :param image: a QImage
+    :param colors: the most colors the palette may have, up to 256
+    :param dither: True or False to force dithering on or off, or None to dither only images that are not flat
+    :return: a Palette
+    """
+    colors = min(max(int(colors), 2), maxColors)
+    pixels = pixelArray(image).ravel()
+    unique, counts = numpy.unique(pixels, return_counts=True)
+    order = numpy.argsort(counts, kind='stable')[::-1]
+    unique, counts = unique[order], counts[order]
+    rgb = channels(unique)
+
+    if counts[:colors].sum() >= flatCoverage * pixels.size:
+        palette = [tuple(int(value) for value in color) for color in rgb[:colors]]
+        return Palette(palette, False if dither is None else dither)
+
+    pinned = min(int((counts >= pinnedFraction * pixels.size).sum()), colors // 2)
+    palette = [tuple(int(value) for value in color) for color in rgb[:pinned]]
+    palette += medianCut(rgb[pinned:], counts[pinned:], colors - pinned)
+    return Palette(palette, True if dither is None else dither)
+
+
+def encodePalettePng(image, palette=None, quality=-1):
+    """
+    Encodes image as an 8 bit palette PNG
+    :param palette: a Palette, chosen with choosePalette() if None
+    :param quality: the encoder quality as for Renderer.encodeImage()
+    :return: the PNG file's contents as bytes
+    """
+    if palette is None:
+        palette = choosePalette(image)
+    return Renderer.encodeImage(palette.indexedImage(image), 'png', quality)
+
+
+def savings(optimized, original):
+    """
+    :param optimized: the size of the palette image in bytes
+    :param original: the size of the image saved without a palette
+    :return: a description of the difference, e.g. '12,345 bytes (48% smaller than 23,456)'
+    """
+    if not original:
+        return '{0:,} bytes'.format(optimized)
+    percent = 100 * (original - optimized) / original
+    if percent >= 0:
+        return '{0:,} bytes ({1:.0f}% smaller than {2:,})'.format(optimized, percent, original)
+    return '{0:,} bytes ({1:.0f}% larger than {2:,})'.format(optimized, -percent, original)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Save the progress graphic as a palette PNG and report the savings.')
+    parser.add_argument('source', help='an image, or a config.cfg file to draw the graphic from')
+    parser.add_argument('output', help='the PNG file to write')
+    parser.add_argument('--colors', type=int, default=maxColors, help='the most colors in the palette (default 256)')
+    parser.add_argument('--dither', dest='dither', action='store_true', default=None, help='always dither')
+    parser.add_argument('--no-dither', dest='dither', action='store_false', help='never dither')
+    options = parser.parse_args(arguments)
+
+    Renderer.ensureApplication()
+    if os.path.splitext(options.source)[1].lower() == '.cfg':
+        image = Renderer.renderGraphic(ConfigStore.load(options.source), cache=None)
+    else:
+        image = QImage(options.source)
+        if image.isNull():
+            parser.error('could not read ' + options.source)
+    palette = choosePalette(image, options.colors, options.dither)
+    data = encodePalettePng(image, palette, 0)
+    helperFunctions.writeAtomically(options.output, data)
+    original = len(Renderer.encodeImage(image, 'png', 0))
+    print('{0}: {1} colors{2}, {3}'.format(options.output, len(palette.colors), ', dithered' if palette.dither else '',
+                                            savings(len(data), original)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
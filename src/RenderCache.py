@@ -0,0 +1,122 @@
+"""
+A size-bounded, least-recently-used cache for rendered graphics. Entries are keyed on a stable hash of everything in
+the configuration that affects the pixels, so identical requests can be answered without repainting or re-encoding.
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+
+# configuration keys whose values change the pixels of the graphic
+renderKeys = ['imageSize', 'imageBackground', 'targets', 'current', 'style', 'displayColor', 'border',
+              'heading_prefix', 'heading', 'penDefinitions', 'brushDefinitions', 'fontDefinitions']
+
+
+def plainValue(value):
+    """
+    Converts a configuration value, which may contain Qt objects, into nested tuples of plain Python values whose
+    repr() is the same from one run of the program to the next
+    :param value: any value found in the configuration
+    :return: a plain, hashable equivalent of value
+    """
+    if isinstance(value, QColor):
+        return ('QColor', value.rgba())
+    if isinstance(value, dict):
+        return tuple((key, plainValue(value[key])) for key in sorted(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(plainValue(item) for item in value)
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return int(value)       # Qt enumerations are int subclasses
+    if isinstance(value, float):
+        return float(value)
+    return repr(value)
+
+
+def configFingerprint(config, keys=None, extra=()):
+    """
+    Computes a stable hash of the parts of config that affect the rendered graphic
+    :param config: a configuration dictionary
+    :param keys: the configuration keys to include, all of renderKeys if None
+    :param extra: a tuple of any further values, such as an image format, that should be part of the key
+    :return: a hex digest string
+    """
+    if keys is None:
+        keys = renderKeys
+    values = tuple((key, plainValue(config.get(key))) for key in keys)
+    return hashlib.sha1(repr((values, plainValue(extra))).encode('utf-8')).hexdigest()
+
+
+def entrySize(value):
+    """
+    Estimates the memory used by a cached value
+    :return: the size in bytes
+    """
+    if hasattr(value, 'sizeInBytes'):     # QImage and objects holding one
+        return value.sizeInBytes()
+    return len(value)
+
+
+class RenderCache():
+    """
+    Holds rendered QImages and encoded image files, discarding the least recently used entries once either the
+    number of entries or the total number of bytes goes over its limit. Safe to share between threads.
+    """
+
+    def __init__(self, maxEntries=64, maxBytes=256 * 1024 * 1024):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :return: the cached value for key or None if there is none
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Stores value under key, evicting the least recently used entries if the cache is full
+        :return: None
+        """
+        size = entrySize(value)
+        with self._lock:
+            if key in self._entries:
+                self.totalBytes -= self._entries.pop(key)[1]
+            if size > self.maxBytes:
+                return
+            self._entries[key] = (value, size)
+            self.totalBytes += size
+            while len(self._entries) > self.maxEntries or self.totalBytes > self.maxBytes:
+                oldKey, (oldValue, oldSize) = self._entries.popitem(last=False)
+                self.totalBytes -= oldSize
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.totalBytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+defaultCache = RenderCache()
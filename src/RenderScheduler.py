@@ -0,0 +1,85 @@
+"""
+Coalesces requests to redraw the graphic. Settings handlers and live previews only mark the graphic dirty; all the
+changes made within one pass of the event loop, or within a short debounce window while the user is typing, are
+drawn by a single render. Each frame has a time budget: when rendering takes longer than the budget the next frame is
+held back, so under load intermediate states are skipped rather than queued up and the window keeps responding.
+"""
+
+from PyQt5.QtCore import *
+
+import math
+import time
+
+
+# how long to wait after a keystroke before drawing what has been typed, in seconds
+typingDelay = 0.05
+
+
+class RenderScheduler(QObject):
+    """
+    Calls render() at most once per frame, however many times schedule() is called before it gets the chance.
+    rendered(seconds) is emitted after every frame with the time it took.
+    """
+
+    rendered = pyqtSignal(float)
+
+    def __init__(self, render, frameBudget=1 / 30, parent=None):
+        """
+        :param render: the function drawing the graphic
+        :param frameBudget: the time in seconds a frame should take at most, e.g. 1/30 for 30 frames a second
+        """
+        super(RenderScheduler, self).__init__(parent)
+        self.render = render
+        self.frameBudget = frameBudget
+        self.requests = 0           # calls to schedule()
+        self.frames = 0             # renders actually done
+        self._dirty = False
+        self._readyAt = 0.0         # the time.perf_counter() before which the next frame would go over budget
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def schedule(self, debounce=0.0):
+        """
+        Marks the graphic as needing to be drawn again
+        :param debounce: seconds to wait for further changes before drawing, e.g. typingDelay while the user types;
+                         0 draws on the next pass of the event loop
+        :return: None
+        """
+        self.requests += 1
+        self._dirty = True
+        wait = max(debounce, self._readyAt - time.perf_counter())
+        if debounce > 0 or not self._timer.isActive():
+            self._timer.start(max(0, int(math.ceil(wait * 1000))))
+
+    def isPending(self):
+        return self._dirty
+
+    def skipped(self):
+        """
+        :return: the number of requests that were folded into another frame rather than drawn on their own
+        """
+        return self.requests - self.frames
+
+    def cancel(self):
+        self._timer.stop()
+        self._dirty = False
+
+    def flush(self):
+        """
+        Draws the graphic now if it has been marked dirty
+        :return: True if a frame was drawn
+        """
+        self._timer.stop()
+        if not self._dirty:
+            return False
+        self._dirty = False
+        start = time.perf_counter()
+        self.render()
+        seconds = time.perf_counter() - start
+        self.frames += 1
+        # a frame over budget holds back the next one for as long again, so rendering never takes more than about
+        # half the time and input keeps being handled
+        self._readyAt = start + max(self.frameBudget, 2 * seconds)
+        self.rendered.emit(seconds)
+        return True
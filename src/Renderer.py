@@ -0,0 +1,275 @@
+"""
+Renders the progress graphic without needing the MainWindow. Everything the drawing routines need (the configuration,
+the paint device and the pens, fills and fonts made from the configuration) is gathered into a RenderContext so that a
+graphic can be produced from a script, under the offscreen platform, without creating any widgets.
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import DrawingControl
+import RenderCache
+import Theme
+
+import os
+import sys
+import time
+
+_application = None     # keeps the application started by ensureApplication() from being garbage collected
+
+
+def ensureApplication():
+    """
+    Makes sure a QGuiApplication exists, since QFont and QPainter cannot be used to draw text without one. If no
+    application has been created yet one is started on the offscreen platform so no display is required.
+    :return: the current QCoreApplication instance
+    """
+    global _application
+    app = QCoreApplication.instance()
+    if app is None:
+        if 'QT_QPA_PLATFORM' not in os.environ:
+            os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+        _application = QGuiApplication([sys.argv[0] if sys.argv else 'baa_progress'])
+        app = _application
+    return app
+
+
+def defaultConfig():
+    """
+    Creates the default configuration for the program.
+    :return: a dictionary of configuration values
+    """
+    config = {}
+    config['imageSize'] = (640, 480)
+    config['imageBackground'] = QColor(Qt.white)
+    config['imageStorage'] = {'path': '.', 'basename': 'baa_progress', 'format': 'jpg', 'useDate': True}
+    config['targets'] = {'set':False, 'year':time.strftime('%Y'), 'goal': 0, 'families': 0}
+    config['current'] = {'pledged':0, 'collected':0, 'families':0}
+    config['type'] = ".png"
+    config['style'] = "3DVertical"
+    config['displayColor'] = True
+    config['border'] = 'single'     # could be none, single or double
+    config['heading_prefix'] = "Our Parish Response to the"
+    config['heading'] = "Bishop's Annual Appeal"
+    config['penDefinitions'] = definePens()
+    config['brushDefinitions'] = defineFills()
+    config['fontDefinitions'] = defineFonts()
+    config['exportProfiles'] = defineExportProfiles()
+    config['history'] = defineHistory()
+    return config
+
+
+def defineHistory():
+    """
+    Defines where the current values entered are kept (see HistoryStore) and read back from for the trend charts: the
+    history database and the parish the program's entries are recorded under
+    :return: a dictionary with the filename and parish
+    """
+    return {'filename': 'history.db', 'parish': ''}
+
+
+def definePens():
+    """
+    Defines a dictionary of pens used in the program and to be saved in the config.cfg file. These pens can have
+    their attributes set by the user through the settings panel. They need to be actualized into a QPen after they
+    have been defined.
+    :return: a dictionary with keys for the definitions of the different pens used in the program
+    """
+    penDefinitions = {}
+    penDefinitions['no_pen'] = {'color':QColor(Qt.black), 'width':1, 'style':Qt.NoPen,
+                                'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
+    penDefinitions['border_pen'] = {'color':QColor(Qt.black), 'width':2, 'style':Qt.SolidLine,
+                                    'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
+    penDefinitions['outline_pen'] = {'color':QColor(Qt.black), 'width':1, 'style':Qt.SolidLine,
+                                     'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
+    penDefinitions['red_pen'] = {'color':QColor(Qt.red), 'width':2, 'style':Qt.SolidLine,
+                                 'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
+    penDefinitions['green_pen'] = {'color':QColor(Qt.green), 'width':2, 'style':Qt.SolidLine,
+                                 'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
+    penDefinitions['blue_pen'] = {'color':QColor(Qt.blue), 'width':2, 'style':Qt.SolidLine,
+                                 'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
+    return penDefinitions
+
+
+def defineFills():
+    """
+    Defines a dictionary of brushes used in the program and to be saved in the config.cfg file. These brushes can
+    have their attributes set by the user through the settings panel. They need to be actualized into QBrushes after
+    they have been defined.
+    :return: a dictionary with keys for the definitions of the different brushes used in the program
+    """
+    fillDefinitions = {}
+    fillDefinitions['no_brush'] = {'style': Qt.NoBrush, 'color': QColor(Qt.black)}
+    fillDefinitions['white_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.white)}
+    fillDefinitions['black_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.black)}
+    fillDefinitions['gray_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.gray)}
+    fillDefinitions['darkGray_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkGray)}
+    fillDefinitions['red_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.red)}
+    fillDefinitions['darkRed_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkRed)}
+    fillDefinitions['green_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.green)}
+    fillDefinitions['darkGreen_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkGreen)}
+    fillDefinitions['blue_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.blue)}
+    fillDefinitions['darkBlue_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkBlue)}
+    fillDefinitions['gray_linear_gradient'] = {'style': Qt.LinearGradientPattern,
+                                            'colors': [[0.0, QColor(Qt.gray)],
+                                                       [0.3, QColor(Qt.white)],
+                                                       [1.0, QColor(Qt.black)]]}
+    fillDefinitions['gray_radial_gradient'] = {'style': Qt.RadialGradientPattern,
+                                           'colors': [[0.0, QColor(Qt.white)],
+                                                      [0.3, QColor(Qt.gray)],
+                                                      [1.0, QColor(Qt.black)]]}
+    fillDefinitions['red_linear_gradient'] = {'style': Qt.LinearGradientPattern,
+                                              'colors': [[0.12, QColor(Qt.red)],
+                                                         [0.35, QColor(Qt.white)],
+                                                         [0.55, QColor(Qt.red)],
+                                                         [1.0, QColor(Qt.darkRed)]]}
+    fillDefinitions['red_radial_gradient'] = {'style': Qt.RadialGradientPattern,
+                                              'colors': [[0.0, QColor(Qt.white)],
+                                                         [0.3, QColor(Qt.red)],
+                                                         [1.0, QColor(Qt.darkRed)]]}
+    fillDefinitions['green_linear_gradient'] = {'style': Qt.LinearGradientPattern,
+                                              'colors': [[0.12, QColor(Qt.green)],
+                                                         [0.35, QColor(Qt.white)],
+                                                         [0.55, QColor(Qt.green)],
+                                                         [1.0, QColor(Qt.darkGreen)]]}
+    fillDefinitions['green_radial_gradient'] = {'style': Qt.RadialGradientPattern,
+                                              'colors': [[0.0, QColor(Qt.white)],
+                                                         [0.3, QColor(Qt.green)],
+                                                         [1.0, QColor(Qt.darkGreen)]]}
+    fillDefinitions['blue_linear_gradient'] = {'style': Qt.LinearGradientPattern,
+                                              'colors': [[0.12, QColor(Qt.blue)],
+                                                         [0.35, QColor(Qt.white)],
+                                                         [0.55, QColor(Qt.blue)],
+                                                         [1.0, QColor(Qt.darkBlue)]]}
+    fillDefinitions['blue_radial_gradient'] = {'style': Qt.RadialGradientPattern,
+                                              'colors': [[0.0, QColor(Qt.white)],
+                                                         [0.3, QColor(Qt.blue)],
+                                                         [1.0, QColor(Qt.darkBlue)]]}
+    return fillDefinitions
+
+
+def defineFonts():
+    """
+    Defines a dictionary of QFonts used in the program and to be saved in the config.cfg file. These fonts can have
+    their attributes set by the user through the settings panel. They need to be actualized into a QFont after they
+    have been defined.
+    :return: a dictionary with keys for the definitions of the different fonts used in the program
+    """
+    fontDefinitions = {}
+    fontDefinitions['headingFont'] = {'fontName': 'Arial', 'size': 24, 'weight':QFont.Bold, 'italic':False}
+    fontDefinitions['captionFont'] = {'fontName': 'Arial', 'size': 16, 'weight':QFont.Normal, 'italic':False}
+    fontDefinitions['smallCaptionFont'] = {'fontName': 'Arial', 'size': 12, 'weight':QFont.Normal, 'italic':False}
+    fontDefinitions['prefixFont'] = {'fontName':'Arial', 'size':18, 'weight':QFont.Normal, 'italic':False}
+    fontDefinitions['infoFont'] = {'fontName':'Arial', 'size':12, 'weight':QFont.Normal, 'italic':False}
+
+    return fontDefinitions
+
+
+def defineExportProfiles():
+    """
+    Defines the list of sizes and formats ExportProfiles writes the graphic in: a print-resolution image for the
+    bulletin, a web-sized PNG and a small JPEG for social media. Each entry is plain data and is saved in the
+    config.cfg file.
+    :return: a list of dictionaries, one for each output
+    """
+    return [{'name': 'print', 'width': 3000, 'height': 2250, 'format': 'png', 'compression': 9, 'palette': True},
+            {'name': 'web', 'width': 1280, 'height': 960, 'format': 'png', 'compression': 6, 'palette': True},
+            {'name': 'social', 'width': 600, 'height': 450, 'format': 'jpg', 'quality': 80}]
+
+
+class RenderContext():
+    """
+    Holds everything the drawing routines in DrawingControl and the indicator modules need: the configuration, the
+    image being painted and the Theme holding the pens, fills and fonts made from the configuration's definitions,
+    which is only compiled when it is first needed.
+    """
+
+    def __init__(self, config, image=None):
+        self.config = config
+        if image is None:
+            image = QImage(config['imageSize'][0], config['imageSize'][1], QImage.Format_RGB32)
+        self.image = image
+        self._theme = None          # compiled the first time something is drawn
+        self._picture = None
+        self.lastFrame = None       # set by DrawingControl.paintGraphic() to allow incremental repaints
+
+    @property
+    def theme(self):
+        if self._theme is None:
+            self._theme = Theme.compiledTheme(self.config)
+        return self._theme
+
+    @property
+    def pens(self):
+        return self.theme.pens
+
+    @property
+    def fills(self):
+        return self.theme.fills
+
+    @property
+    def fonts(self):
+        return self.theme.fonts
+
+    def device(self):
+        """
+        :return: the paint device text is measured for when laying out the indicators: the image, or when there is
+                 none because the graphic is only recorded (as the window does), a QPicture like those it is recorded in
+        """
+        if not self.image.isNull():
+            return self.image
+        if self._picture is None:
+            self._picture = QPicture()
+        return self._picture
+
+    def width(self):
+        return self.config['imageSize'][0]
+
+    def height(self):
+        return self.config['imageSize'][1]
+
+
+def encodeImage(image, imageFormat, quality=-1):
+    """
+    Encodes image in memory rather than writing it to a file
+    :param image: the QImage to encode
+    :param imageFormat: a string: 'jpg', 'png' or 'bmp'
+    :param quality: an integer from 0 to 100 or -1 for the encoder's default
+    :return: the encoded image as bytes
+    """
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if not image.save(buffer, imageFormat.upper(), quality):
+        raise IOError('Unable to encode the image as ' + imageFormat)
+    buffer.close()
+    return bytes(data)
+
+
+def renderGraphic(config, imageFormat=None, quality=-1, cache=RenderCache.defaultCache):
+    """
+    Renders the progress graphic described by config without using any widgets. Identical requests are answered
+    from cache without repainting or re-encoding.
+    :param config: a configuration dictionary like the one saved in config.cfg
+    :param imageFormat: None to return the QImage, otherwise 'jpg', 'png' or 'bmp' to return the encoded bytes
+    :param quality: the encoder quality used when imageFormat is given
+    :param cache: a RenderCache.RenderCache or None to always render
+    :return: a QImage or bytes
+    """
+    ensureApplication()
+    if imageFormat is not None and cache is not None:
+        fileKey = DrawingControl.graphicFingerprint(config, extra=(imageFormat.lower(), quality))
+        data = cache.get(fileKey)
+        if data is not None:
+            return data
+    context = RenderContext(config)
+    if cache is None:
+        DrawingControl.paintGraphic(context)
+    else:
+        DrawingControl.cachedGraphic(context, cache)
+    if imageFormat is None:
+        return context.image
+    data = encodeImage(context.image, imageFormat, quality)
+    if cache is not None:
+        cache.put(fileKey, data)
+    return data
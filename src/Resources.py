@@ -0,0 +1,80 @@
+"""
+Loads the program's image resources (the 3D meter overlays and the toolbar icons) once and keeps them in memory.
+Paths are resolved relative to the program's own directory rather than the current working directory, so the
+program and batch jobs can be run from anywhere.
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import RenderCache
+
+import os
+import threading
+
+
+programDirectory = os.path.dirname(os.path.abspath(__file__))
+
+imageCache = RenderCache.RenderCache(maxEntries=64, maxBytes=32 * 1024 * 1024)
+
+_icons = {}
+_iconsLock = threading.Lock()
+
+
+def resourcePath(relativePath):
+    """
+    :param relativePath: a path such as 'images/icons/Save.png', relative to the program's directory
+    :return: the absolute path of the resource
+    """
+    if os.path.isabs(relativePath):
+        return relativePath
+    return os.path.normpath(os.path.join(programDirectory, relativePath))
+
+
+def image(relativePath, size=None):
+    """
+    Gets an image resource, reading and decoding it from disk only the first time it is asked for at a given size.
+    A missing file gives a null QImage, which is cached too so the disk is not searched again.
+    :param relativePath: the image's path relative to the program's directory
+    :param size: a QSize to scale the image to (keeping its aspect ratio), or None for the image as stored
+    :return: a QImage, which must not be painted on
+    """
+    path = resourcePath(relativePath)
+    if size is None:
+        key = (path, None)
+    else:
+        key = (path, size.width(), size.height())
+    cached = imageCache.get(key)
+    if cached is not None:
+        return cached
+    if size is None:
+        loaded = QImage(path)
+    else:
+        loaded = image(relativePath)
+        if not loaded.isNull():
+            loaded = loaded.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    imageCache.put(key, loaded)
+    return loaded
+
+
+def icon(relativePath):
+    """
+    Gets a toolbar or window icon, creating it only once
+    :param relativePath: the icon's path relative to the program's directory
+    :return: a QIcon
+    """
+    with _iconsLock:
+        cached = _icons.get(relativePath)
+        if cached is None:
+            cached = QIcon(resourcePath(relativePath))
+            _icons[relativePath] = cached
+    return cached
+
+
+def preload(relativePaths, size=None):
+    """
+    Loads the given image resources ahead of time, for instance before a batch run
+    :return: None
+    """
+    for relativePath in relativePaths:
+        image(relativePath, size)
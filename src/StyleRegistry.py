@@ -0,0 +1,148 @@
+"""
+Keeps the list of indicator styles the program can draw. Each style is registered with the name of the module that
+draws it and the configuration keys its indicators depend on (and, for a style that also reads something outside the
+configuration, a function telling when that changes); the module is only imported the first time the style is
+drawn (or when prewarm() loads it in the background), so styles that are not in use cost nothing at startup. A new
+style is added by writing a module with indicatorLayout() and drawIndicator() functions and registering it here.
+"""
+
+import importlib
+import threading
+import time
+
+
+class StyleError(Exception): pass
+
+
+# configuration keys every style's indicators depend on
+commonKeys = ['style', 'imageSize', 'targets', 'current', 'displayColor', 'penDefinitions', 'brushDefinitions',
+              'fontDefinitions']
+
+
+class StyleRenderer():
+    """
+    A registered style of indicator: its name in config['style'], e.g. '3DVertical', whether it is flat ('2D') or
+    solid ('3D'), the module drawing it, the configuration keys the indicators depend on and the function, if any,
+    returning whatever else they depend on, and whether prewarm() loads the module ahead of time
+    """
+
+    def __init__(self, name, moduleName, configKeys, state=None, preload=True):
+        self.name = name
+        self.dimension = name[0:2]
+        self.type = name[2:]
+        self.moduleName = moduleName
+        self.configKeys = list(commonKeys) + [key for key in configKeys if key not in commonKeys]
+        self.state = state
+        self.preload = preload
+        self._module = None
+
+    @property
+    def module(self):
+        """
+        The module drawing the style, imported on first use
+        """
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self.moduleName)
+            except ImportError as err:
+                raise StyleError("The " + self.type + " style of indicator could not be loaded: " + str(err))
+        return self._module
+
+    def isLoaded(self):
+        return self._module is not None
+
+
+_styles = {}
+_stylesLock = threading.Lock()
+
+
+def register(name, moduleName, configKeys=(), state=None, preload=True):
+    """
+    Registers a style of indicator, replacing any style already registered under the same name
+    :param name: the value of config['style'] selecting it, e.g. '2DMeters'
+    :param moduleName: the name of the module with its indicatorLayout() and drawIndicator() functions
+    :param configKeys: configuration keys its indicators depend on beyond those in commonKeys
+    :param state: a function of the configuration returning anything else the indicators depend on, such as the
+                  version of a file they read, so that graphics cached from an older version are not reused
+    :param preload: if False, prewarm() leaves the module to be loaded when the style is first drawn, e.g. because
+                    it brings in modules the program otherwise keeps out of a session that does not need them
+    :return: the StyleRenderer
+    """
+    renderer = StyleRenderer(name, moduleName, configKeys, state, preload)
+    with _stylesLock:
+        _styles[name] = renderer
+    return renderer
+
+
+def lookup(name):
+    """
+    :param name: the value of config['style']
+    :raise StyleError: if no such style has been registered
+    :return: the StyleRenderer for the style
+    """
+    renderer = _styles.get(name)
+    if renderer is None:
+        msg = "Hmm... The program is calling for a style of display that it does not know how to draw."
+        msg += "That shouldn't have happened! Try renaming your config.cfg file, which is in the same directory"
+        msg += "as the program and then restart the program. You will have to re-enter the target information and"
+        msg += "current data and re-adjust the settings to your liking."
+        raise StyleError(msg)
+    return renderer
+
+
+def styles():
+    """
+    :return: the names of the registered styles
+    """
+    with _stylesLock:
+        return list(_styles)
+
+
+def prewarm(names=None, background=True):
+    """
+    Imports the modules of the given styles ahead of time so that switching to them does not pause
+    :param names: the style names to load, all registered styles that allow it (see register()) if None
+    :param background: if True the modules are imported on a daemon thread
+    :return: the thread doing the work, or None if background is False
+    """
+    if names is None:
+        with _stylesLock:
+            names = [name for name, renderer in _styles.items() if renderer.preload]
+
+    def load():
+        for name in names:
+            try:
+                lookup(name).module
+            except StyleError:
+                pass        # reported when the style is drawn
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name='style prewarm', daemon=True)
+    thread.start()
+    return thread
+
+
+def historyState(config):
+    """
+    :return: the version of the history the trend charts are read from and the week they end in, either of which
+             changes the charts without any change to the configuration
+    """
+    import HistoryStore         # not needed until a trend style is drawn
+    return HistoryStore.fileVersion(config['history']['filename']), HistoryStore.weekNumber(time.time())
+
+
+register('2DHorizontal', 'HIndicators')
+register('3DHorizontal', 'HIndicators')
+register('2DVertical', 'VIndicators')
+register('3DVertical', 'VIndicators')
+register('2DMeters', 'MIndicators')
+register('3DMeters', 'MIndicators')
+register('2DGuages', 'GIndicators')        # spelled as in the configurations written by earlier releases
+register('3DGuages', 'GIndicators')
+register('2DPies', 'PIndicators')
+register('3DPies', 'PIndicators')
+# the trend charts bring in TrendAnalysis and HistoryStore, and with them SQLite, which wait until a trend is drawn
+register('2DTrends', 'TIndicators', ['history'], historyState, preload=False)
+register('3DTrends', 'TIndicators', ['history'], historyState, preload=False)
@@ -0,0 +1,196 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+import HistoryStore
+import TrendAnalysis
+import TextLayout
+import IndicatorMetrics
+import helperFunctions
+
+import math
+import time
+
+
+def trendIndicators(context, painter, style, verticalPosition):
+    """
+    Draws all three trend charts in vertical order: pledged, collected and families participating from top to bottom
+    according to the style selected in 'style'
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: None
+    """
+    for indicator in indicatorLayout(context, style, verticalPosition):
+        drawIndicator(context, painter, style, indicator)
+
+
+def trendText(trends, measure, target, deadline):
+    """
+    :param trends: the TrendAnalysis.Trends of the campaign
+    :param measure: 0 for pledged, 1 for collected or 2 for families
+    :param target: the goal or number of families the measure is compared with
+    :param deadline: the end of the campaign in seconds since the epoch
+    :return: a line describing where the measure is heading
+    """
+    pace = trends.pace[0, trends.lastWeek[0], measure]
+    projected = trends.projected[0, measure]
+    probability = trends.probability[0, measure]
+    if trends.latest[0, measure] >= target:
+        return 'Reached the week of ' + time.strftime('%b %d', time.localtime(projected))
+    if math.isnan(pace):
+        return 'Enter the figures for another week to see the trend'
+    if math.isnan(projected):
+        return 'No gain in the last {0} weeks'.format(TrendAnalysis.paceWeeks)
+    text = 'On pace for ' + time.strftime('%b %d, %Y', time.localtime(projected))
+    if not math.isnan(probability):
+        text += ', {0:.0%} likely by {1}'.format(probability, time.strftime('%b %d, %Y', time.localtime(deadline)))
+    return text
+
+
+def indicatorLayout(context, style, verticalPosition):
+    """
+    Works out the caption, percent, color and position of each of the three trend charts without drawing. Each
+    chart shows the percent of the target reached week by week from the campaign's history in config['history'] (see
+    TrendAnalysis), with the current pace carried on to the end of the campaign.
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: a list of helperFunctions.Indicator tuples for the pledged, collected and families indicators
+    """
+    gap = 35  # vertical spacing increment
+    verticalPosition += gap / 2
+    drawingWidth = (context.width() - 2 * gap)  # gives a margin on each side equal to the gap
+    captionHeight = QFontMetricsF(context.fonts['captionFont'], context.device()).height()
+    trendHeight = QFontMetricsF(context.fonts['smallCaptionFont'], context.device()).height()
+    # the charts share what is left once the captions under them and half a gap above and below each are taken out
+    chartHeight = max((context.height() - verticalPosition - gap / 2) / 3 - captionHeight - trendHeight - 10 - gap / 2,
+                      1)
+
+    metrics = IndicatorMetrics.contextMetrics(context)
+
+    if context.config['displayColor']:
+        colors = ['red', 'green', 'blue']
+    else:
+        colors = ['gray', 'gray', 'gray']
+
+    history = context.config['history']
+    table, trends = TrendAnalysis.campaignTrend(context.config, history['filename'], history['parish'])
+    goal = float(context.config['targets']['goal'])
+    targets = [goal, goal, float(context.config['targets']['families'])]
+    start = float(table.starts[0])
+    lastWeek = int(trends.lastWeek[0])
+    deadline = start + max(TrendAnalysis.campaignWeeks, lastWeek + 1) * HistoryStore.weekSeconds
+
+    indicators = []
+    for measure, (color, caption, percent) in enumerate(zip(colors, metrics.lineCaptions, metrics.fills)):
+        chartRect = QRectF(gap, verticalPosition, drawingWidth, chartHeight)
+        captionRect = QRectF(gap, chartRect.bottom() + 10, drawingWidth, captionHeight)
+        trendRect = QRectF(gap, captionRect.bottom(), drawingWidth, trendHeight)
+
+        # the history and its projection as (time, percent of the target) points
+        history = []
+        projection = ()
+        if targets[measure] > 0:
+            for week in range(lastWeek + 1):
+                history.append((start + week * HistoryStore.weekSeconds,
+                                100 * float(table.values[0, week, measure]) / targets[measure]))
+            # carried on at the current pace until the target or the end of the campaign, whichever comes first
+            pace = 100 * trends.pace[0, lastWeek, measure] / targets[measure]
+            last = history[-1]
+            if pace > 0 and last[1] < 100:
+                weeks = min((deadline - last[0]) / HistoryStore.weekSeconds, (100 - last[1]) / pace)
+                projection = (last, (last[0] + weeks * HistoryStore.weekSeconds, last[1] + weeks * pace))
+        top = 1.1 * max([100.0] + [point[1] for point in history])
+
+        def chartPoint(point):
+            return (chartRect.left() + chartRect.width() * (point[0] - start) / (deadline - start),
+                    chartRect.bottom() - chartRect.height() * max(point[1], 0) / top)
+
+        if targets[measure] > 0:
+            caption += '\n' + trendText(trends, measure, targets[measure], deadline)
+        else:
+            caption += '\n'
+        drawingHeight = chartHeight + 10 + captionHeight + trendHeight
+        region = QRectF(gap / 2, verticalPosition - gap / 4, drawingWidth + gap, drawingHeight + gap / 2)
+        indicators.append(helperFunctions.Indicator(color, caption, percent, region,
+                                                    (chartRect, captionRect, trendRect, chartRect.bottom() -
+                                                     chartRect.height() * 100 / top,
+                                                     tuple(chartPoint(point) for point in history),
+                                                     tuple(chartPoint(point) for point in projection))))
+        verticalPosition += drawingHeight + gap / 2
+    return indicators
+
+
+def drawIndicator(context, painter, style, indicator):
+    """
+    Draws one indicator from indicatorLayout()
+    :return: None
+    """
+    drawTrendIndicator(context, painter, style, indicator.color, indicator.caption, *indicator.geometry)
+
+
+def drawTrendIndicator(context, painter, style, color, caption, chartRect, captionRect, trendRect, goalY, history,
+                       projection):
+    """
+    Draws one trend chart with the given parameters
+    :param painter: the painter being used to draw
+    :param style: a string: '2D' or '3D'
+    :param color: currently a string 'red', 'green', 'blue' or 'gray' indicating the color of the indicator
+    :param caption: the caption under the chart and, on a second line, the description of the trend
+    :param chartRect: the QRectF of the chart
+    :param captionRect: the QRectF of the caption
+    :param trendRect: the QRectF of the description of the trend
+    :param goalY: the height of the line marking 100%
+    :param history: a tuple of (x, y) points, one for each week of the campaign so far
+    :param projection: a tuple of two (x, y) points continuing the history at its current pace, or ()
+    :return: None
+    """
+    if color not in ('red', 'green', 'blue', 'gray'):
+        raise ValueError("There has been an unexpected error: unknown indicator color '" + color + "'.")
+
+    painter.save()
+    painter.setClipRect(chartRect)
+    if history:
+        area = QPainterPath()
+        area.moveTo(history[0][0], chartRect.bottom())
+        for x, y in history:
+            area.lineTo(x, y)
+        area.lineTo(history[-1][0], chartRect.bottom())
+        area.closeSubpath()
+        if style == '3D':
+            brush = context.theme.linearGradient(color + '_linear_gradient', chartRect.left(), chartRect.top(),
+                                                 chartRect.left(), chartRect.bottom())
+        else:
+            brush = context.fills[color + '_brush']
+        painter.setPen(context.pens['no_pen'])
+        painter.setBrush(brush)
+        painter.drawPath(area)
+
+        line = QPainterPath()
+        line.moveTo(*history[0])
+        for point in history[1:]:
+            line.lineTo(*point)
+        painter.strokePath(line, context.pens['outline_pen'])
+        painter.setPen(context.pens['outline_pen'])
+        painter.drawEllipse(QPointF(*history[-1]), 3, 3)        # this week
+
+    if projection:
+        dashed = QPen(context.pens['outline_pen'])
+        dashed.setStyle(Qt.DashLine)
+        painter.setPen(dashed)
+        painter.drawLine(QPointF(*projection[0]), QPointF(*projection[1]))
+
+    dotted = QPen(context.pens['outline_pen'])
+    dotted.setStyle(Qt.DotLine)
+    painter.setPen(dotted)
+    painter.drawLine(QPointF(chartRect.left(), goalY), QPointF(chartRect.right(), goalY))
+    painter.restore()
+
+    painter.setPen(context.pens['outline_pen'])
+    painter.setBrush(context.fills['no_brush'])
+    painter.drawRect(chartRect)
+
+    # draw the caption and the trend
+    figures, trend = caption.split('\n', 1)
+    painter.setPen(context.pens['border_pen'])
+    painter.setFont(context.fonts['captionFont'])
+    TextLayout.drawText(painter, captionRect, Qt.AlignCenter, figures)
+    painter.setFont(context.fonts['smallCaptionFont'])
+    TextLayout.drawText(painter, trendRect, Qt.AlignCenter, trend)
@@ -0,0 +1,194 @@
+"""
+Caches the measurement and layout of the headings, captions and meter labels. A piece of text is measured and
+prepared as a QStaticText the first time it is drawn with a given font, box and alignment; after that, repeated
+renders (and batch runs sharing the same headings) draw it without shaping the text again.
+
+Usage:  python TextLayout.py [--config config.cfg]     (checks the cache draws captions as QPainter.drawText does)
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from collections import OrderedDict
+import argparse
+import sys
+import threading
+
+
+maxEntries = 512        # per thread
+
+
+class TextBlock():
+    """
+    A measured piece of text: the rectangle it occupies, as QPainter.boundingRect() would give it, and a list of
+    (offset, QStaticText) pairs drawing each of its lines at its offset from the top left of the rectangle
+    """
+
+    def __init__(self, rect, lines):
+        self.rect = rect
+        self.lines = lines
+
+
+_local = threading.local()      # QStaticText is not safe to share between threads, so each has its own cache
+
+
+def _cache():
+    cache = getattr(_local, 'cache', None)
+    if cache is None:
+        cache = OrderedDict()
+        _local.cache = cache
+    return cache
+
+
+def _remember(cache, key, value):
+    cache[key] = value
+    if len(cache) > maxEntries:
+        cache.popitem(last=False)
+    return value
+
+
+def _deviceKey(device):
+    return device.logicalDpiX(), device.logicalDpiY()
+
+
+def textBlock(font, text, rect, flags, device):
+    """
+    Measures and lays out text the way QPainter.boundingRect(rect, flags, text) and QPainter.drawText() would
+    :param font: the QFont to use
+    :param text: the string, which may contain newlines
+    :param rect: the QRectF the text is aligned within
+    :param flags: the Qt alignment flags
+    :param device: the QPaintDevice being drawn on, whose resolution affects the measurements
+    :return: a TextBlock
+    """
+    cache = _cache()
+    key = ('block', font.key(), text, rect.x(), rect.y(), rect.width(), rect.height(), int(flags),
+           _deviceKey(device))
+    block = cache.get(key)
+    if block is not None:
+        cache.move_to_end(key)
+        return block
+    metrics = QFontMetricsF(font, device)
+    boundingRect = metrics.boundingRect(rect, flags, text)
+    # QStaticText ignores newlines, and breaking lines with the Unicode line separator instead rounds the offsets of
+    # centered lines differently from QPainter.drawText(), so each line is a QStaticText of its own, placed where
+    # drawText() puts it: a line spacing below the one before and aligned within the width of the longest line
+    if flags & Qt.AlignRight:
+        alignment = 1.0
+    elif flags & Qt.AlignHCenter:
+        alignment = 0.5
+    else:
+        alignment = 0.0
+    lines = []
+    for number, line in enumerate(text.split('\n')):
+        staticText = QStaticText(line)
+        staticText.setTextFormat(Qt.PlainText)
+        staticText.prepare(QTransform(), font)
+        offset = QPointF((boundingRect.width() - metrics.horizontalAdvance(line)) * alignment,
+                         number * metrics.lineSpacing())
+        lines.append((offset, staticText))
+    return _remember(cache, key, TextBlock(boundingRect, lines))
+
+
+def drawText(painter, rect, flags, text):
+    """
+    Draws text with the painter's current font and pen, aligned within rect according to flags, using the cache
+    :return: the QRectF the text was drawn in
+    """
+    block = textBlock(painter.font(), text, QRectF(rect), flags, painter.device())
+    # like QPainter.drawText(), text that does not fit is clipped to rect unless the flags say otherwise
+    clip = not flags & Qt.TextDontClip and not QRectF(rect).contains(block.rect)
+    if clip:
+        painter.save()
+        painter.setClipRect(QRectF(rect), Qt.IntersectClip)
+    topLeft = block.rect.topLeft()
+    for offset, staticText in block.lines:
+        painter.drawStaticText(topLeft + offset, staticText)
+    if clip:
+        painter.restore()
+    return block.rect
+
+
+def textRect(font, text, device):
+    """
+    :return: the QRect given by QFontMetrics(font, device).boundingRect(text), from the cache when possible
+    """
+    cache = _cache()
+    key = ('line', font.key(), text, _deviceKey(device))
+    rect = cache.get(key)
+    if rect is None:
+        rect = _remember(cache, key, QFontMetrics(font, device).boundingRect(text))
+    return QRect(rect)
+
+
+def boundedTextRect(font, rect, flags, text, device):
+    """
+    :return: the QRect given by QFontMetrics(font, device).boundingRect(rect, flags, text), from the cache when
+             possible
+    """
+    cache = _cache()
+    key = ('bounded', font.key(), text, rect.x(), rect.y(), rect.width(), rect.height(), int(flags),
+           _deviceKey(device))
+    result = cache.get(key)
+    if result is None:
+        result = _remember(cache, key, QFontMetrics(font, device).boundingRect(rect, flags, text))
+    return QRect(result)
+
+
+def matchesDrawText(font, text, rect, flags, size):
+    """
+    Draws text with drawText() and with QPainter.drawText() on two blank images
+    :param size: the QSize of the images
+    :return: True if the two images have the same pixels
+    """
+    images = []
+    for draw in (drawText, QPainter.drawText):
+        image = QImage(size, QImage.Format_RGB32)
+        image.fill(Qt.white)
+        painter = QPainter(image)
+        try:
+            painter.setFont(font)
+            painter.setPen(Qt.black)
+            draw(painter, rect, flags, text)
+        finally:
+            painter.end()
+        images.append(image)
+    return images[0] == images[1]
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Check that cached text draws the same pixels as QPainter.drawText.')
+    parser.add_argument('--config', default=None, help='take the fonts from this config file, not the defaults')
+    options = parser.parse_args(arguments)
+
+    import ConfigStore
+    import IndicatorMetrics
+    import Renderer
+    import Theme
+    Renderer.ensureApplication()
+    config = ConfigStore.load(options.config) if options.config else Renderer.defaultConfig()
+    fonts = Theme.compiledTheme(config).fonts
+    # the one-line and stacked captions, with and without 'almost' and 'over', and the caption-height probe
+    metrics = IndicatorMetrics.computeMetrics([1000, 1000, 0], [995, 1500, 10], [500, 20, 0], [40, 40, 0],
+                                              [12, 41, 0])
+    texts = ['M\nM\nM'] + [caption for figures in metrics
+                             for caption in figures.lineCaptions + figures.stackedCaptions]
+    size = QSize(config['imageSize'][0], 200)
+    # the width of the graphic and of a column of the vertical style, which some captions do not fit
+    rects = [QRectF(10, 10, size.width() - 20, size.height() - 20), QRectF(10, 10, size.width() / 3, 100)]
+    alignments = [Qt.AlignCenter, Qt.AlignLeft | Qt.AlignTop, Qt.AlignHCenter | Qt.AlignBottom]
+    failures = 0
+    for name, font in sorted(fonts.items()):
+        for text in texts:
+            for rect in rects:
+                for flags in alignments:
+                    if not matchesDrawText(font, text, rect, flags, size):
+                        print('{0}: {1!r} differs in {2} with alignment {3}'.format(name, text, rect, int(flags)))
+                        failures += 1
+    print('{0} texts checked in {1} fonts, {2} differ'.format(len(texts) * len(rects) * len(alignments), len(fonts),
+                                                           failures))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Compiles the pen, fill and font definitions kept in the configuration into an immutable, hashable Theme. The drawing
+routines only read from a Theme; gradients positioned for a particular indicator are derived from it and memoized
+rather than set on shared objects, so renders no longer depend on what was drawn before them and can run in parallel.
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import RenderCache
+
+import functools
+import threading
+import types
+
+
+def createPens(defs):
+    """
+    Creates a dictionary of the QPens used in the program from the given definitions (defs).
+    These pens can have their characteristics set by the user through the settings panel.
+    :return: a dictionary with keys for each of the different QPens used in the program
+    """
+    pens = {}
+    for penkey in defs.keys():
+        pendef = defs[penkey]
+        new_pen = QPen()
+        new_pen.setColor(pendef['color'])
+        new_pen.setWidth(pendef['width'])
+        new_pen.setStyle(pendef['style'])
+        new_pen.setCapStyle(pendef['cap'])
+        new_pen.setJoinStyle(pendef['join'])
+        pens[penkey] = new_pen
+
+    return pens
+
+
+def createFills(defs):
+    """
+    Creates a dictionary of the fill colors and styles used in the program from the given definitions (defs).
+    These can either be QBrushes or QGradients depending on their style and can have their characteristics set by
+    the user through the settings panel.
+    :return: a dictionary with keys for each of the different QBrushes and QGradients used in the program
+    """
+    fills = {}
+    for fillKey in defs.keys():
+        fillDef = defs[fillKey]
+        if fillDef['style'] == Qt.SolidPattern:
+            new_fill = QBrush()
+            new_fill.setStyle(Qt.SolidPattern)
+            new_fill.setColor(fillDef['color'])
+
+        elif fillDef['style'] == Qt.LinearGradientPattern:
+            gradient = QLinearGradient()
+            gradient.setStops(fillDef['colors'])
+            new_fill = gradient
+
+        elif fillDef['style'] == Qt.RadialGradientPattern:
+            gradient = QRadialGradient()
+            gradient.setStops(fillDef['colors'])
+            new_fill = gradient
+
+        else:
+            new_fill = QBrush()
+            new_fill.setStyle(Qt.NoBrush)
+            new_fill.setColor(Qt.black)
+
+        fills[fillKey] = new_fill
+
+    return fills
+
+
+def createFonts(defs):
+    """
+    Creates a dictionary of the fonts used in the program from the definitions (defs). These fonts can have their
+    characteristics set by the user through the settings panel.
+    :return: a dictionary with keys for each of the different fonts used in the program
+    """
+    fonts = {}
+    for fontKey in defs:
+        fontDef = defs[fontKey]
+        fonts[fontKey] = QFont(fontDef['fontName'], fontDef['size'], fontDef['weight'], fontDef['italic'])
+    return fonts
+
+
+class Theme():
+    """
+    The pens, fills and fonts made from a set of definitions. pens, fills and fonts are read-only mappings and must
+    not be modified; use radialGradient() and linearGradient() to get a gradient placed for a particular shape.
+    Two Themes made from the same definitions are equal and hash alike.
+    """
+
+    def __init__(self, penDefinitions, brushDefinitions, fontDefinitions):
+        key = RenderCache.plainValue((penDefinitions, brushDefinitions, fontDefinitions))
+        object.__setattr__(self, 'key', key)
+        object.__setattr__(self, 'pens', types.MappingProxyType(createPens(penDefinitions)))
+        object.__setattr__(self, 'fills', types.MappingProxyType(createFills(brushDefinitions)))
+        object.__setattr__(self, 'fonts', types.MappingProxyType(createFonts(fontDefinitions)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Theme objects are immutable')
+
+    def __eq__(self, other):
+        return isinstance(other, Theme) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def radialGradient(self, name, centerX, centerY, radius, focalX, focalY):
+        """
+        :param name: the key of a radial gradient in fills, e.g. 'red_radial_gradient'
+        :return: a QBrush painting that gradient with the given center, radius and focal point
+        """
+        return _radialGradient(self, name, centerX, centerY, radius, focalX, focalY)
+
+    def linearGradient(self, name, startX, startY, stopX, stopY):
+        """
+        :param name: the key of a linear gradient in fills, e.g. 'red_linear_gradient'
+        :return: a QBrush painting that gradient from the start point to the final stop
+        """
+        return _linearGradient(self, name, startX, startY, stopX, stopY)
+
+
+@functools.lru_cache(maxsize=256)
+def _radialGradient(theme, name, centerX, centerY, radius, focalX, focalY):
+    gradient = QRadialGradient(theme.fills[name])
+    gradient.setCenter(centerX, centerY)
+    gradient.setRadius(radius)
+    gradient.setFocalPoint(focalX, focalY)
+    return QBrush(gradient)
+
+
+@functools.lru_cache(maxsize=256)
+def _linearGradient(theme, name, startX, startY, stopX, stopY):
+    gradient = QLinearGradient(theme.fills[name])
+    gradient.setStart(startX, startY)
+    gradient.setFinalStop(stopX, stopY)
+    return QBrush(gradient)
+
+
+_themes = {}
+_themesLock = threading.Lock()
+
+
+def compiledTheme(config):
+    """
+    Gets the Theme for the pen, brush and font definitions in config, compiling it only the first time those
+    definitions are seen
+    :param config: a configuration dictionary
+    :return: a Theme
+    """
+    definitions = (config['penDefinitions'], config['brushDefinitions'], config['fontDefinitions'])
+    key = RenderCache.plainValue(definitions)
+    with _themesLock:
+        theme = _themes.get(key)
+        if theme is None:
+            if len(_themes) >= 16:
+                _themes.clear()
+            theme = Theme(*definitions)
+            _themes[key] = theme
+    return theme
@@ -0,0 +1,314 @@
+"""
+Writes very large PNG images, e.g. a 12000x9000 church-hall banner, without ever holding the whole image in memory.
+The graphic is recorded once and then painted one horizontal band at a time through a painter translated up to the
+band's top; each band's rows are compressed and written to the file straight away by a small PNG encoder, so the
+memory used depends on the width of the image and the band size but not on its height.
+
+Usage:  python TiledRender.py config.cfg output.png [--width W] [--height H] [--band-megabytes M] [--palette]
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+import ConfigStore
+import ExportProfiles
+import ImageSaver
+import helperFunctions
+
+import argparse
+import hashlib
+import struct
+import sys
+import zlib
+
+
+class TiledRenderError(Exception): pass
+
+
+bandBytes = 16 * 1024 * 1024    # the most memory one band of 32 bit pixels may take
+tiledPixels = 4000 * 3000       # outputs with more pixels than this are rendered in bands by the export routines
+bandOverlap = 8                 # rows painted beyond each edge of a band to match a painting of the whole image
+idatBytes = 256 * 1024          # compressed data is written in chunks of about this size
+
+pngSignature = b'\x89PNG\r\n\x1a\n'
+
+
+def bandRows(width, budget=None):
+    """
+    :param width: the width of the image in pixels
+    :param budget: the most bytes a band may take, bandBytes if None
+    :return: the number of rows in each band
+    """
+    if budget is None:
+        budget = bandBytes
+    return max(1, budget // (4 * width))
+
+
+class PngWriter():
+    """
+    A minimal streaming encoder for 8 bit RGB or palette PNG files. Rows are passed to writeRows() or writeIndexes()
+    from top to bottom as they are drawn and the compressed data is written out as it builds up.
+    """
+
+    def __init__(self, f, width, height, compression=6, palette=None):
+        """
+        :param f: a binary file object to write to
+        :param compression: the zlib compression level from 0 (none) to 9 (smallest)
+        :param palette: for a palette PNG, a list of up to 256 (r, g, b) tuples
+        """
+        if width <= 0 or height <= 0:
+            raise TiledRenderError('a PNG image cannot be {0}x{1} pixels'.format(width, height))
+        self.f = f
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self.size = 0
+        self.digest = hashlib.sha1()
+        self._compressor = zlib.compressobj(min(max(int(compression), 0), 9))
+        self._pending = []
+        self._pendingBytes = 0
+        self.palette = palette
+        self.rowBytes = width if palette is not None else 3 * width
+        # masks for subtracting every byte of one row from the byte above it at once, see upFiltered()
+        rowBytes = self.rowBytes
+        self._allBits = (1 << (8 * rowBytes)) - 1
+        self._highBits = int.from_bytes(b'\x80' * rowBytes, 'big')
+        self._lowBits = self._allBits ^ self._highBits
+        self._previous = 0      # the row above the next one, which is taken as all zeros above the first row
+        self._write(pngSignature)
+        if palette is None:
+            self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        else:
+            if not 0 < len(palette) <= 256:
+                raise TiledRenderError('a PNG palette must have from 1 to 256 colors')
+            self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0))
+            self._chunk(b'PLTE', bytes(value for color in palette for value in color))
+
+    def _write(self, data):
+        self.f.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+
+    def _chunk(self, tag, data):
+        self._write(struct.pack('>I', len(data)) + tag + data +
+                    struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff))
+
+    def _compressed(self, data):
+        if data:
+            self._pending.append(data)
+            self._pendingBytes += len(data)
+        if self._pendingBytes >= idatBytes:
+            self._flushPending()
+
+    def _flushPending(self):
+        if self._pending:
+            self._chunk(b'IDAT', b''.join(self._pending))
+            self._pending = []
+            self._pendingBytes = 0
+
+    def writeRows(self, image):
+        """
+        Appends every row of image to an RGB PNG
+        :param image: a QImage as wide as the PNG, in any format
+        :return: None
+        """
+        if self.palette is not None:
+            raise TiledRenderError('a palette PNG is written with writeIndexes()')
+        if image.width() != self.width:
+            raise TiledRenderError('a band is {0} pixels wide, not {1}'.format(image.width(), self.width))
+        if image.format() != QImage.Format_RGB888:
+            image = image.convertToFormat(QImage.Format_RGB888)
+        self._writeScanlines(image.constBits().asstring(image.sizeInBytes()), image.bytesPerLine(), image.height())
+
+    def writeIndexes(self, indexes, count):
+        """
+        Appends rows of palette indexes to a palette PNG
+        :param indexes: bytes holding one index for every pixel of count rows
+        :return: None
+        """
+        if self.palette is None:
+            raise TiledRenderError('an RGB PNG is written with writeRows()')
+        if len(indexes) != count * self.width:
+            raise TiledRenderError('the rows of indexes are not {0} pixels wide'.format(self.width))
+        self._writeScanlines(indexes, self.width, count)
+
+    def _writeScanlines(self, pixels, stride, count):
+        if self.rows + count > self.height:
+            raise TiledRenderError('more rows were drawn than the image has')
+        rowBytes = self.rowBytes
+        scanlines = []
+        for top in range(0, stride * count, stride):
+            row = int.from_bytes(pixels[top:top + rowBytes], 'big')
+            scanlines.append(b'\x02' + self.upFiltered(row).to_bytes(rowBytes, 'big'))
+            self._previous = row
+        self._compressed(self._compressor.compress(b''.join(scanlines)))
+        self.rows += count
+
+    def upFiltered(self, row):
+        """
+        Applies the PNG 'Up' filter, which stores each byte as its difference from the byte above it, so the flat areas
+        of the graphic become runs of zeros that compress far better. The rows are treated as big integers and the
+        bytes are subtracted modulo 256 all at once by keeping the borrow from crossing from one byte to the next.
+        :param row: the row as an integer made from its bytes
+        :return: the filtered row as an integer
+        """
+        return ((row | self._highBits) - (self._previous & self._lowBits)) ^ \
+               ((row ^ self._previous ^ self._allBits) & self._highBits)
+
+    def close(self):
+        """
+        Finishes the compressed data and writes the end of the file
+        :raise TiledRenderError: if fewer rows were written than the image has
+        :return: None
+        """
+        if self.rows != self.height:
+            raise TiledRenderError('only {0} of the {1} rows were drawn'.format(self.rows, self.height))
+        self._compressed(self._compressor.flush())
+        self._flushPending()
+        self._chunk(b'IEND', b'')
+
+
+def renderBands(recording, width, height, rows=None):
+    """
+    Plays recording back one band at a time, scaled to fit width x height and centered as ExportProfiles.rasterize()
+    does, so only one band's pixels exist at any moment
+    :param recording: an ExportProfiles.Recording
+    :param rows: the number of rows in each band, from bandRows() if None
+    :return: a generator of QImages, each a band of the output from top to bottom
+    """
+    if rows is None:
+        rows = bandRows(width)
+    scale = min(width / recording.width, height / recording.height)
+    left = (width - recording.width * scale) / 2
+    top = (height - recording.height * scale) / 2
+    # lines and edges crossing the edge of a band can come out a pixel different from a painting of the whole image,
+    # so each band is painted with a few rows to spare above and below which are then cut off
+    band = QImage(width, min(rows, height) + 2 * bandOverlap, QImage.Format_RGB32)
+    for bandTop in range(0, height, rows):
+        band.fill(recording.background)
+        painter = QPainter(band)
+        try:
+            painter.translate(left, top - bandTop + bandOverlap)
+            painter.scale(scale, scale)
+            painter.drawPicture(0, 0, recording.picture)
+        finally:
+            painter.end()
+        yield band.copy(0, bandOverlap, width, min(rows, height - bandTop))
+
+
+def writePng(recording, filename, width=None, height=None, compression=6, rows=None, palette=None):
+    """
+    Renders recording in bands straight into a PNG file, which is replaced atomically and left alone if it already
+    holds exactly the same image. Safe to call from any thread.
+    :param width: the output width in pixels, the recorded width if None
+    :param height: the output height in pixels; if None it follows from the width and the graphic's proportions
+    :param compression: the zlib compression level from 0 (none) to 9 (smallest)
+    :param rows: the number of rows in each band, from bandRows() if None
+    :param palette: a PaletteImage.Palette to write a palette PNG with, e.g. from choosePalette(), or None for RGB
+    :return: a tuple (written, size) as ImageSaver.writeImage() returns
+    """
+    width, height = fullSize(recording, width, height)
+    existing = ImageSaver.fileDigest(filename)
+    with helperFunctions.AtomicFile(filename) as f:
+        writer = streamPng(recording, f, width, height, compression, rows, palette)
+        if writer.digest.digest() == existing:
+            f.discard()
+            return False, writer.size
+    return True, writer.size
+
+
+def fullSize(recording, width, height):
+    """
+    :return: (width, height), filling in the recorded width and the height following from the width where None
+    """
+    if width is None:
+        width = recording.width
+    if height is None:
+        height = int(round(width * recording.height / recording.width))
+    return width, height
+
+
+def streamPng(recording, f, width, height, compression=6, rows=None, palette=None):
+    """
+    Renders recording in bands and writes them to f as a PNG
+    :return: the finished PngWriter, with the size and sha1 digest of what it wrote
+    """
+    writer = PngWriter(f, width, height, compression, None if palette is None else palette.colors)
+    if palette is not None:
+        import PaletteImage     # loads NumPy, so only imported for a palette image
+    bandTop = 0
+    for band in renderBands(recording, width, height, rows):
+        if palette is None:
+            writer.writeRows(band)
+        else:
+            writer.writeIndexes(palette.indexes(PaletteImage.pixelArray(band), bandTop).tobytes(), band.height())
+        bandTop += band.height()
+    writer.close()
+    return writer
+
+
+class ByteCounter():
+    """
+    A file object that only counts what is written to it, for measuring the size an output would have
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+
+def measurePng(recording, width=None, height=None, compression=6, rows=None, palette=None):
+    """
+    :return: the size in bytes writePng() would write with the same arguments, without writing anything
+    """
+    width, height = fullSize(recording, width, height)
+    return streamPng(recording, ByteCounter(), width, height, compression, rows, palette).size
+
+
+def choosePalette(recording, width, height, previewPixels=1024 * 768):
+    """
+    Chooses the palette for a palette PNG of recording from a render small enough to hold in memory
+    :param previewPixels: the most pixels the render the colors are taken from may have
+    :return: a PaletteImage.Palette
+    """
+    scale = min(1.0, (previewPixels / (width * height)) ** 0.5)
+    import PaletteImage
+    preview = ExportProfiles.rasterize(recording, max(1, int(width * scale)), max(1, int(height * scale)))
+    return PaletteImage.choosePalette(preview)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Write the progress graphic as a PNG of any size, one band at a time.')
+    parser.add_argument('config', help='the config.cfg file to draw the graphic from')
+    parser.add_argument('output', help='the PNG file to write')
+    parser.add_argument('--width', type=int, default=None, help='the width in pixels (default: the configured size)')
+    parser.add_argument('--height', type=int, default=None, help='the height in pixels (default: from the width)')
+    parser.add_argument('--compression', type=int, default=6, help='the compression level from 0 to 9')
+    parser.add_argument('--band-megabytes', type=float, default=None, help='the most memory a band may take')
+    parser.add_argument('--palette', action='store_true', help='write an 8 bit palette PNG and report the savings')
+    options = parser.parse_args(arguments)
+
+    config = ConfigStore.load(options.config)
+    recording = ExportProfiles.record(config)
+    width = options.width if options.width is not None else recording.width
+    rows = None
+    if options.band_megabytes is not None:
+        rows = bandRows(width, int(options.band_megabytes * 1024 * 1024))
+    width, height = fullSize(recording, width, options.height)
+    palette = choosePalette(recording, width, height) if options.palette else None
+    written, size = writePng(recording, options.output, width, height, options.compression, rows, palette)
+    if palette is None:
+        print('{0}: {1:,} bytes{2}'.format(options.output, size, '' if written else ' (unchanged)'))
+    else:
+        import PaletteImage
+        original = measurePng(recording, width, height, options.compression, rows)
+        print('{0}: {1}{2}'.format(options.output, PaletteImage.savings(size, original),
+                                   '' if written else ' (unchanged)'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
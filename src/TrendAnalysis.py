@@ -0,0 +1,332 @@
+"""
+Works out how campaigns are trending from their history (see HistoryStore): the change from week to week, the pace
+over the last few weeks, the date the target will be reached at that pace and the probability of reaching it by the
+end of the campaign. Every campaign in the history, for every parish and year, is laid out as one row of a
+campaigns x weeks x measures array, so the whole diocese is analyzed in a handful of NumPy operations rather than a
+loop per parish.
+
+The three measures are pledged and collected, both measured against the goal, and participating families, measured
+against the number of families in the parish.
+
+Usage:  python TrendAnalysis.py history.db [manifest.csv] [--parish P] [--year Y] [--weeks N]
+"""
+
+import HistoryStore
+
+from collections import OrderedDict, namedtuple
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+
+import numpy
+
+
+measures = ('pledged', 'collected', 'families')
+
+paceWeeks = 4           # the pace is the average weekly change over this many weeks
+campaignWeeks = 52      # a campaign is taken to end this many weeks after its first entry unless a deadline is given
+
+
+class WeeklyTable():
+    """
+    The weekly values of many campaigns, each counted in weeks from its own first entry so that a decade of campaigns
+    takes no more columns than the longest of them. values[campaign, week, measure] holds the last value entered up
+    to that week, carried forward through weeks without entries, and NaN after a campaign's last entry.
+    """
+
+    def __init__(self, campaigns, starts, values):
+        """
+        :param campaigns: a list of (parish, year) tuples, one for each row
+        :param starts: an array of the start of each campaign's first week in seconds since the epoch
+        :param values: a float array of shape (len(campaigns), weeks, len(measures))
+        """
+        self.campaigns = campaigns
+        self.starts = starts
+        self.values = values
+
+    def __len__(self):
+        return len(self.campaigns)
+
+    def weekStarts(self, columns):
+        """
+        :param columns: an array of week columns, one for each campaign or one row of them for each campaign
+        :return: the start of those weeks in seconds since the epoch
+        """
+        columns = numpy.asarray(columns)
+        starts = self.starts if columns.ndim < 2 else self.starts[:, None]
+        return starts + columns * HistoryStore.weekSeconds
+
+    @classmethod
+    def fromEntries(cls, entries):
+        """
+        :param entries: an iterable of HistoryStore.Entry tuples holding the last values of a week, as
+                        HistoryStore.campaignWeeks() yields them
+        :return: a WeeklyTable
+        """
+        campaigns = {}      # (parish, year) -> row
+        rows = []
+        weeks = []
+        figures = []
+        for parish, year, recorded, pledged, collected, families in entries:
+            rows.append(campaigns.setdefault((parish, year), len(campaigns)))
+            weeks.append(recorded)
+            figures.append((pledged, collected, families))
+        if not rows:
+            return cls([], numpy.zeros(0, dtype=numpy.int64), numpy.zeros((0, 0, len(measures))))
+
+        rows = numpy.array(rows)
+        weeks = (numpy.array(weeks, dtype=numpy.int64) - HistoryStore.weekOrigin) // HistoryStore.weekSeconds
+        first = numpy.full(len(campaigns), weeks.max())
+        numpy.minimum.at(first, rows, weeks)
+        columns = weeks - first[rows]
+        values = numpy.full((len(campaigns), int(columns.max()) + 1, len(measures)), numpy.nan)
+        values[rows, columns] = numpy.array(figures, dtype=float)
+        starts = HistoryStore.weekOrigin + first * HistoryStore.weekSeconds
+        return cls(list(campaigns), starts, carriedForward(values))
+
+    @classmethod
+    def load(cls, history, parish=None, year=None, start=None, end=None):
+        """
+        :param history: a HistoryStore
+        :return: the WeeklyTable of the chosen campaigns, see HistoryStore.entries() for the arguments
+        """
+        return cls.fromEntries(history.campaignWeeks(parish, year, start, end))
+
+
+def carriedForward(values):
+    """
+    Fills the weeks between two entries of a campaign with the earlier entry's values
+    :param values: an array indexed [campaign, week, measure] with NaN in the weeks without an entry
+    :return: a new array, still NaN before each campaign's first entry and after its last
+    """
+    entered = ~numpy.isnan(values[..., 0])
+    weeks = numpy.arange(values.shape[1])
+    latest = numpy.maximum.accumulate(numpy.where(entered, weeks, -1), axis=1)
+    filled = numpy.take_along_axis(values, numpy.maximum(latest, 0)[..., None], axis=1)
+    lastEntry = values.shape[1] - 1 - numpy.argmax(entered[:, ::-1], axis=1)
+    filled[(latest < 0) | (weeks > lastEntry[:, None])] = numpy.nan
+    return filled
+
+
+def erf(x):
+    """
+    The error function for an array, accurate to 1.5e-7 (Abramowitz and Stegun 7.1.26); NumPy has none of its own
+    """
+    sign = numpy.sign(x)
+    x = numpy.abs(x)
+    t = 1 / (1 + 0.3275911 * x)
+    polynomial = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1 - polynomial * numpy.exp(-x * x))
+
+
+Trends = namedtuple('Trends', ['deltas', 'pace', 'spread', 'latest', 'lastWeek', 'projected', 'probability'])
+
+
+def analyze(table, targets, deadlines=None, window=paceWeeks):
+    """
+    Analyzes every campaign in table at once. Everything is measured at each campaign's latest entry.
+    :param table: a WeeklyTable
+    :param targets: an array of shape (len(table), 3) with each campaign's goal, goal and number of families, NaN
+                    where not known
+    :param deadlines: an array of the time each campaign ends in seconds since the epoch; campaignWeeks after its
+                      first entry where None or NaN
+    :param window: the number of weeks the pace is averaged over
+    :return: a Trends tuple of arrays:
+             deltas[campaign, week, measure], the change from the week before (0 in the first week);
+             pace[campaign, week, measure], the average weekly change over the window ending that week, NaN until
+             there are two weeks to compare;
+             spread[campaign, measure], the standard deviation of the weekly changes in the latest window;
+             latest[campaign, measure], the latest values;
+             lastWeek[campaign], the column of the latest entry;
+             projected[campaign, measure], when the target was or will be reached at the latest pace, in seconds
+             since the epoch, NaN if it never will;
+             probability[campaign, measure], the chance of reaching the target by the deadline, taking the weekly
+             changes to vary as they have over the window
+    """
+    values = table.values
+    count, weeks = values.shape[:2]
+    if count == 0:
+        none = numpy.zeros((0, len(measures)))
+        return Trends(values, values, none, none, numpy.zeros(0, dtype=int), none, none)
+    targets = numpy.asarray(targets, dtype=float).reshape(count, len(measures))
+    entered = ~numpy.isnan(values[..., 0])
+    columns = numpy.arange(weeks)
+    firstWeek = numpy.argmax(entered, axis=1)
+    lastWeek = weeks - 1 - numpy.argmax(entered[:, ::-1], axis=1)
+    rows = numpy.arange(count)
+
+    previous = numpy.concatenate([numpy.full_like(values[:, :1], numpy.nan), values[:, :-1]], axis=1)
+    changed = entered & ~numpy.isnan(previous[..., 0])      # the weeks with a week before them to change from
+    deltas = numpy.where(changed[..., None], values - previous, 0.0)
+
+    # running sums give the total, and total of squares, of the changes over any window in one subtraction
+    def windowed(array):
+        sums = numpy.concatenate([numpy.zeros_like(array[:, :1]), numpy.cumsum(array, axis=1)], axis=1)
+        shifted = numpy.maximum(columns - window + 1, 0)
+        return sums[:, columns + 1] - sums[:, shifted]
+
+    observed = windowed(changed[..., None].astype(float))
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        pace = windowed(deltas) / observed
+        meanSquares = windowed(deltas * deltas) / observed
+    pace[observed[..., 0] == 0] = numpy.nan
+
+    latest = values[rows, lastWeek]
+    latestPace = pace[rows, lastWeek]
+    spread = numpy.sqrt(numpy.maximum(meanSquares[rows, lastWeek] - latestPace * latestPace, 0.0))
+    lastStart = table.weekStarts(lastWeek).astype(float)
+
+    if deadlines is None:
+        deadlines = numpy.full(count, numpy.nan)
+    deadlines = numpy.asarray(deadlines, dtype=float)
+    deadlines = numpy.where(numpy.isnan(deadlines),
+                            table.weekStarts(firstWeek + campaignWeeks), deadlines)
+
+    remaining = targets - latest
+    reached = remaining <= 0
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        # a target already reached is dated by the first week the values got there
+        atTarget = values >= targets[:, None, :]
+        firstReached = table.weekStarts(numpy.argmax(atTarget, axis=1))
+        projected = numpy.where(reached, firstReached,
+                                numpy.where(latestPace > 0,
+                                            lastStart[:, None] + HistoryStore.weekSeconds * remaining / latestPace,
+                                            numpy.nan))
+
+        weeksLeft = numpy.maximum((deadlines - lastStart) / HistoryStore.weekSeconds, 0.0)[:, None]
+        expected = weeksLeft * latestPace
+        deviation = spread * numpy.sqrt(weeksLeft)
+        certain = numpy.where(expected >= remaining, 1.0, 0.0)
+        probability = numpy.where(deviation > 0,
+                                  0.5 * (1 + erf((expected - remaining) / (deviation * math.sqrt(2)))), certain)
+        probability = numpy.where(reached, 1.0, numpy.where(numpy.isnan(latestPace), numpy.nan, probability))
+    unknown = numpy.isnan(targets) | numpy.isnan(latest)
+    projected[unknown] = numpy.nan
+    probability[unknown] = numpy.nan
+    return Trends(deltas, pace, spread, latest, lastWeek, projected, probability)
+
+
+def campaignTargets(table, targets):
+    """
+    :param targets: a dictionary mapping (parish, year) to a (goal, families) pair
+    :return: the targets array analyze() takes, NaN for the campaigns not in targets
+    """
+    array = numpy.full((len(table), len(measures)), numpy.nan)
+    for row, campaign in enumerate(table.campaigns):
+        if campaign in targets:
+            goal, families = targets[campaign]
+            array[row] = (goal, goal, families)
+    return array
+
+
+maxHistoryTables = 16   # the campaigns whose history is kept loaded, e.g. one for each parish a process draws
+
+# (filename, parish, year) -> (modification times and sizes of the files, WeeklyTable), least recently used first
+_historyTables = OrderedDict()
+_historyTablesLock = threading.Lock()
+
+
+def campaignTrend(config, filename=HistoryStore.defaultFilename, parish=HistoryStore.defaultParish, now=None):
+    """
+    The trends of the campaign config is for: its history, if any has been kept, followed by config['current']
+    :param filename: the history database; the campaign has no history if it does not exist
+    :param parish: the parish the campaign's entries are recorded under
+    :param now: the time of the current values in seconds since the epoch, the present if None
+    :return: a tuple (table, trends) for the one campaign
+    """
+    year = str(config['targets']['year'])
+    table = None
+    if os.path.exists(filename):
+        version = HistoryStore.fileVersion(filename)
+        key = (os.path.abspath(filename), parish, year)
+        with _historyTablesLock:
+            cached = _historyTables.get(key)
+            if cached is not None:
+                _historyTables.move_to_end(key)
+        if cached is not None and cached[0] == version:
+            table = cached[1]
+        else:
+            try:
+                with HistoryStore.HistoryStore(filename) as history:
+                    table = WeeklyTable.load(history, parish, year)
+                with _historyTablesLock:
+                    _historyTables[key] = (version, table)
+                    _historyTables.move_to_end(key)
+                    if len(_historyTables) > maxHistoryTables:
+                        _historyTables.popitem(last=False)
+            except HistoryStore.HistoryError:
+                table = None
+
+    current = config['current']
+    now = time.time() if now is None else now
+    entry = HistoryStore.Entry(parish, year, int(now), current['pledged'], current['collected'], current['families'])
+    week = HistoryStore.weekOrigin + HistoryStore.weekNumber(entry.recorded) * HistoryStore.weekSeconds
+    weekly = [] if table is None or not len(table) else \
+        [HistoryStore.Entry(parish, year, int(start), *row)
+         for start, row in zip(table.weekStarts(numpy.arange(table.values.shape[1])[None])[0], table.values[0])
+         if start < week and not numpy.isnan(row[0])]
+    table = WeeklyTable.fromEntries(weekly + [entry._replace(recorded=week)])
+    targets = config['targets']
+    trends = analyze(table, [[targets['goal'], targets['goal'], targets['families']]])
+    return table, trends
+
+
+def dateText(seconds):
+    if seconds is None or numpy.isnan(seconds):
+        return '-'
+    return time.strftime('%Y-%m-%d', time.localtime(seconds))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Show the pace and projected completion of every campaign.')
+    parser.add_argument('history', help='the history database')
+    parser.add_argument('manifest', nargs='?', default=None,
+                        help="a BatchRender manifest giving each parish's goal and families")
+    parser.add_argument('--parish', default=None, help='only this parish')
+    parser.add_argument('--year', default=None, help='only this campaign year')
+    parser.add_argument('--weeks', type=int, default=paceWeeks, help='the number of weeks the pace is taken over')
+    options = parser.parse_args(arguments)
+    if not os.path.exists(options.history):
+        print('{0} does not exist'.format(options.history))
+        return 1
+
+    targets = {}
+    if options.manifest is not None:
+        import BatchRender
+        import NumberFormat
+        for entry in BatchRender.readManifest(options.manifest):
+            try:
+                # read as BatchRender reads them, with US conventions, so '100,000' is a goal of 100000
+                year = str(entry['year'])
+                goal, families = [NumberFormat.usLocale.parse(value) if isinstance(value, str) else float(value)
+                                  for value in (entry['goal'], entry['target_families'])]
+            except KeyError as e:
+                print('{0}: no {1} given, so its campaign has no target'.format(entry['name'], e.args[0]))
+                continue
+            except (NumberFormat.NumberError, TypeError, ValueError) as e:
+                print('{0}: {1}, so its campaign has no target'.format(entry['name'], e))
+                continue
+            targets[(entry['name'], year)] = (goal, families)
+
+    started = time.perf_counter()
+    with HistoryStore.HistoryStore(options.history) as history:
+        table = WeeklyTable.load(history, options.parish, options.year)
+    loaded = time.perf_counter()
+    trends = analyze(table, campaignTargets(table, targets), window=options.weeks)
+    analyzed = time.perf_counter()
+
+    for row, (parish, year) in enumerate(table.campaigns):
+        pledgedPace = trends.pace[row, trends.lastWeek[row], 0]
+        print('{0:<24} {1:<10} {2:>14,.2f} {3:>12,.2f}/wk  goal by {4:<10} {5:>6}'.format(
+            parish, year, trends.latest[row, 0], pledgedPace, dateText(trends.projected[row, 0]),
+            '-' if numpy.isnan(trends.probability[row, 0]) else '{0:.0%}'.format(trends.probability[row, 0])))
+    print('{0} campaigns of up to {1} weeks: loaded in {2:.3f}s, analyzed in {3:.3f}s'.format(
+        len(table), table.values.shape[1], loaded - started, analyzed - loaded))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
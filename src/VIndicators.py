@@ -2,57 +2,63 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import IndicatorMetrics
 import helperFunctions
+import Geometry
+import TextLayout
 
 
-def verticalIndicators(main, painter, style, verticalPosition):
-    # """
-    # Draws all three vertical indicators in horizontal order: pledged, collected and families participating from
-    # left to right according to the style selected in 'style'
-    # :param style: a string, either '2D' or '3D' to control the style of the indicator
-    # :return: None
-    # """
+def verticalIndicators(context, painter, style, verticalPosition):
+    """
+    Draws all three vertical indicators in horizontal order: pledged, collected and families participating from
+    left to right according to the style selected in 'style'
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: None
+    """
+    for indicator in indicatorLayout(context, style, verticalPosition):
+        drawIndicator(context, painter, style, indicator)
+
+
+def indicatorLayout(context, style, verticalPosition):
+    """
+    Works out the caption, percent, color and position of each of the three vertical indicators without drawing
+    :param style: a string, either '2D' or '3D' to control the style of the indicator
+    :return: a list of helperFunctions.Indicator tuples for the pledged, collected and families indicators
+    """
     gap = 35  # horizontal and vertical spacing increment
     verticalPosition += gap  # move down a little from the heading
-    drawingWidth = (main.image.width() - 4 * gap) / 3  # since total image width = three images and four gaps
-    drawingHeight = (main.image.height() - verticalPosition) - gap / 2  # saves a little space at the bottom too
-
-    values, percents, modifiers = helperFunctions.getIndicatorInfo(main)
-    pledgedString, collectedString, familiesString = values
-    pledgePercent, collectedPercent, familiesPercent = percents
-    pledgeModifier, collectedModifier, familiesModifier = modifiers
-    pledgeCaption = pledgedString + '\n' + 'Pledged\n' + pledgeModifier + '(' + str(pledgePercent) + '%)'
-    collectedCaption = collectedString + ' \n' + 'Collected\n' + '(' + collectedModifier \
-                       + str(collectedPercent) + '%)'
-    familiesCaption = familiesString + '\n' + 'Families\n' + \
-                      '(' + familiesModifier + str(familiesPercent) + '%)'
-
-    horizontalPosition = gap
-    if main.config['displayColor']:
-        drawVerticalIndicator(main, painter, style, 'red', pledgeCaption, pledgePercent,
-                                   horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
-        horizontalPosition += drawingWidth + gap
+    drawingWidth = (context.width() - 4 * gap) / 3  # since total image width = three images and four gaps
+    drawingHeight = (context.height() - verticalPosition) - gap / 2  # saves a little space at the bottom too
 
-        drawVerticalIndicator(main, painter, style, 'green', collectedCaption, collectedPercent,
-                                   horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
-        horizontalPosition += drawingWidth + gap
+    metrics = IndicatorMetrics.contextMetrics(context)
 
-        drawVerticalIndicator(main, painter, style, 'blue', familiesCaption, familiesPercent,
-                                   horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
+    if context.config['displayColor']:
+        colors = ['red', 'green', 'blue']
     else:
-        drawVerticalIndicator(main, painter, style, 'gray', pledgeCaption, pledgePercent,
-                                   horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
-        horizontalPosition += drawingWidth + gap
+        colors = ['gray', 'gray', 'gray']
 
-        drawVerticalIndicator(main, painter, style, 'gray', collectedCaption, collectedPercent,
-                                   horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
+    indicators = []
+    horizontalPosition = gap
+    for color, caption, percent in zip(colors, metrics.stackedCaptions, metrics.fills):
+        region = QRectF(horizontalPosition - gap / 2, verticalPosition - gap / 2,
+                        drawingWidth + gap, drawingHeight + gap)
+        indicators.append(helperFunctions.Indicator(color, caption, percent, region,
+                                                    (horizontalPosition, verticalPosition,
+                                                     drawingWidth, drawingHeight)))
         horizontalPosition += drawingWidth + gap
+    return indicators
 
-        drawVerticalIndicator(main, painter, style, 'gray', familiesCaption, familiesPercent,
-                                   horizontalPosition, verticalPosition, drawingWidth, drawingHeight)
 
+def drawIndicator(context, painter, style, indicator):
+    """
+    Draws one indicator from indicatorLayout()
+    :return: None
+    """
+    drawVerticalIndicator(context, painter, style, indicator.color, indicator.caption, indicator.percent,
+                          *indicator.geometry)
 
-def drawVerticalIndicator(main, painter, style, color, caption, percent, startX, startY, width, height):
+
+def drawVerticalIndicator(context, painter, style, color, caption, percent, startX, startY, width, height):
     """
     Draws the current vertical indicator (a thermometer) with the given parameters
     :param painter: the painter being used to draw
@@ -66,11 +72,11 @@ def drawVerticalIndicator(main, painter, style, color, caption, percent, startX,
     :return: None
     """
 
-    painter.setFont(main.fonts['smallCaptionFont'])
-    fontMetrics = painter.fontMetrics()
-    captionHeight = fontMetrics.boundingRect(QRect(0, 0, 640, 480),  # text should fit easily within this QRect
-                                             Qt.AlignHCenter,
-                                             'M\nM\nM').height() + 10  # allows for 4-line families caption + 10 px
+    painter.setFont(context.fonts['smallCaptionFont'])
+    captionHeight = TextLayout.boundedTextRect(painter.font(),
+                                               QRect(0, 0, 640, 480),  # text should fit easily within this QRect
+                                               Qt.AlignHCenter,
+                                               'M\nM\nM', painter.device()).height() + 10  # 4-line caption + 10 px
     indicatorHeight = height - captionHeight
     radius = indicatorHeight / 10
     bulb_center = QPointF(startX + width / 2, startY + indicatorHeight - radius)
@@ -79,58 +85,52 @@ def drawVerticalIndicator(main, painter, style, color, caption, percent, startX,
     tube_top = startY + radius / 2  # tube is one radius in width
     tube_bottom = tube_top + indicatorHeight - 1.5 * radius - radius * 1.732 / 2  # allow for top cap too
     tube_length = tube_bottom - tube_top
-    bulbRectF = QRectF(tube_left - radius / 2, startY + indicatorHeight - 2 * radius, 2 * radius, 2 * radius)
-    if percent > 100:
-        percent = 100
+    bulb, cap, outline = Geometry.thermometer(tube_left, tube_top, tube_bottom, radius,
+                                              startY + indicatorHeight - 2 * radius)
     mercury_length = percent * (tube_length) / 100
     tubeRectF = QRectF(tube_left, tube_top + tube_length - mercury_length, radius, mercury_length)
-    capRectF = QRectF(tube_left, tube_top - radius / 2, radius, radius)
 
     if style == '2D':
         if color == 'red':
-            bulbBrush = main.fills['darkRed_brush']
-            mercuryBrush = main.fills['red_brush']
+            bulbBrush = context.fills['darkRed_brush']
+            mercuryBrush = context.fills['red_brush']
         elif color == 'green':
-            bulbBrush = main.fills['darkGreen_brush']
-            mercuryBrush = main.fills['green_brush']
+            bulbBrush = context.fills['darkGreen_brush']
+            mercuryBrush = context.fills['green_brush']
         elif color == 'blue':
-            bulbBrush = main.fills['darkBlue_brush']
-            mercuryBrush = main.fills['blue_brush']
+            bulbBrush = context.fills['darkBlue_brush']
+            mercuryBrush = context.fills['blue_brush']
         else:
-            bulbBrush = main.fills['darkGray_brush']
-            mercuryBrush = main.fills['gray_brush']
+            bulbBrush = context.fills['darkGray_brush']
+            mercuryBrush = context.fills['gray_brush']
+        capBrush = mercuryBrush
     elif style == '3D':
         if color == 'red':
-            bulbGradient = main.fills['red_radial_gradient']
-            mercuryGradient = main.fills['red_linear_gradient']
+            bulbGradient = 'red_radial_gradient'
+            mercuryGradient = 'red_linear_gradient'
         elif color == 'green':
-            bulbGradient = main.fills['green_radial_gradient']
-            mercuryGradient = main.fills['green_linear_gradient']
+            bulbGradient = 'green_radial_gradient'
+            mercuryGradient = 'green_linear_gradient'
         elif color == 'blue':
-            bulbGradient = main.fills['blue_radial_gradient']
-            mercuryGradient = main.fills['blue_linear_gradient']
+            bulbGradient = 'blue_radial_gradient'
+            mercuryGradient = 'blue_linear_gradient'
         else:
-            bulbGradient = main.fills['gray_radial_gradient']
-            mercuryGradient = main.fills['gray_linear_gradient']
-
-        # set 3D brushes to gradients
-        bulbBrush = bulbGradient
-        bulbBrush.setCenter(bulb_center.x(), bulb_center.y())
-        bulbBrush.setRadius(radius)
-        bulbBrush.setFocalPoint(bulb_center.x() - radius / 2, bulb_center.y() - radius / 2)
-        capBrush = QRadialGradient(bulbGradient)
-        capBrush.setCenter(startX + width / 2, tube_top)
-        capBrush.setFocalPoint(startX + width / 2 - 0.17 * radius, tube_top)
-        mercuryBrush = mercuryGradient
-        mercuryBrush.setStart(tube_left, tube_top)
-        mercuryBrush.setFinalStop(tube_right, tube_top)
+            bulbGradient = 'gray_radial_gradient'
+            mercuryGradient = 'gray_linear_gradient'
+
+        # set 3D brushes to gradients placed for this indicator
+        bulbBrush = context.theme.radialGradient(bulbGradient, bulb_center.x(), bulb_center.y(), radius,
+                                                 bulb_center.x() - radius / 2, bulb_center.y() - radius / 2)
+        capBrush = context.theme.radialGradient(bulbGradient, startX + width / 2, tube_top, radius,
+                                                startX + width / 2 - 0.17 * radius, tube_top)
+        mercuryBrush = context.theme.linearGradient(mercuryGradient, tube_left, tube_top, tube_right, tube_top)
 
     # draw the indicator
 
     # first draw the bulb
-    painter.setPen(main.pens['no_pen'])
+    painter.setPen(context.pens['no_pen'])
     painter.setBrush(bulbBrush)
-    painter.drawChord(bulbRectF, 60 * 16, -300 * 16)
+    painter.drawPath(bulb)
 
     # now draw the tube
     painter.setBrush(mercuryBrush)
@@ -139,18 +139,13 @@ def drawVerticalIndicator(main, painter, style, color, caption, percent, startX,
     # finally draw the cap if percent is 100 or more
     if percent >= 100:
         painter.setBrush(capBrush)
-        painter.drawChord(capRectF, 0, 180 * 16)
+        painter.drawPath(cap)
 
     # draw the outline
-    painter.setPen(main.pens['outline_pen'])
-    painter.drawArc(bulbRectF, 60 * 16, -300 * 16)
-    painter.drawLine(tube_left, tube_top, tube_left, tube_bottom)
-    painter.drawLine(tube_right, tube_top, tube_right, tube_bottom)
-    painter.drawArc(capRectF, 0, 180 * 16)
+    painter.strokePath(outline, context.pens['outline_pen'])
 
     # draw the caption
     captionTop = startY + indicatorHeight
-    painter.setPen(main.pens['border_pen'])
+    painter.setPen(context.pens['border_pen'])
     captionRect = QRectF(startX, captionTop, width, captionHeight)
-    drawRect = painter.boundingRect(captionRect, Qt.AlignCenter, caption)
-    painter.drawText(drawRect, Qt.AlignCenter, caption)
+    TextLayout.drawText(painter, captionRect, Qt.AlignCenter, caption)
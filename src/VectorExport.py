@@ -0,0 +1,134 @@
+"""
+Writes the progress graphic as an SVG or PDF file. The same drawing routines that paint the on-screen image are run
+on a vector paint device, so the shapes, gradients and text stay resolution independent: a print shop can scale the
+file to any size without the program having to allocate a huge bitmap. Text is measured at the same resolution as
+the raster image, so the layout matches the graphic shown in the window exactly.
+
+Usage:  python VectorExport.py config.cfg output.svg|output.pdf [--page-width-mm W]
+"""
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtSvg import QSvgGenerator
+
+import ConfigStore
+import DrawingControl
+import Renderer
+import helperFunctions
+
+import argparse
+import os
+import sys
+
+
+class VectorExportError(Exception): pass
+
+
+vectorFormats = ['svg', 'pdf']
+
+
+def layoutResolution():
+    """
+    :return: the resolution in dots per inch at which the raster graphic is laid out, and so the one vector output
+             must measure its text at to match it
+    """
+    return QImage(1, 1, QImage.Format_RGB32).logicalDpiX()
+
+
+def svgData(config, title="Bishop's Annual Appeal Progress"):
+    """
+    Draws the graphic described by config as an SVG document
+    :raise DrawingControl.StyleError: if the style cannot be drawn
+    :return: the SVG file's contents as bytes
+    """
+    Renderer.ensureApplication()
+    context = Renderer.RenderContext(config, QImage())
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    generator = QSvgGenerator()
+    generator.setOutputDevice(buffer)
+    generator.setSize(QSize(context.width(), context.height()))
+    generator.setViewBox(QRect(0, 0, context.width(), context.height()))
+    generator.setResolution(layoutResolution())
+    generator.setTitle(title)
+    generator.setDescription(config['heading_prefix'] + ' ' + config['heading'])
+    painter = QPainter(generator)
+    try:
+        DrawingControl.paintGraphic(context, painter)
+    finally:
+        painter.end()
+    buffer.close()
+    return bytes(data)
+
+
+def pdfData(config, pageWidthMM=None, title="Bishop's Annual Appeal Progress"):
+    """
+    Draws the graphic described by config as a single page PDF document whose page is the shape of the graphic
+    :param pageWidthMM: the width of the page in millimeters, or None for the graphic's size at the layout resolution
+    :raise DrawingControl.StyleError: if the style cannot be drawn
+    :return: the PDF file's contents as bytes
+    """
+    Renderer.ensureApplication()
+    context = Renderer.RenderContext(config, QImage())
+    resolution = layoutResolution()
+    if pageWidthMM is None:
+        pageWidthMM = context.width() / resolution * 25.4
+    pageHeightMM = pageWidthMM * context.height() / context.width()
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    writer = QPdfWriter(buffer)
+    writer.setTitle(title)
+    writer.setCreator('BAA Progress')
+    writer.setResolution(resolution)
+    writer.setPageSize(QPageSize(QSizeF(pageWidthMM, pageHeightMM), QPageSize.Millimeter, '',
+                                 QPageSize.ExactMatch))
+    writer.setPageMargins(QMarginsF(0, 0, 0, 0), QPageLayout.Millimeter)
+    painter = QPainter(writer)
+    try:
+        # the text is measured at the layout resolution and the whole drawing is then scaled to fill the page
+        painter.scale(writer.width() / context.width(), writer.height() / context.height())
+        DrawingControl.paintGraphic(context, painter)
+    finally:
+        painter.end()
+    buffer.close()
+    return bytes(data)
+
+
+def exportVector(config, filename, vectorFormat=None, pageWidthMM=None):
+    """
+    Writes the graphic described by config to filename as SVG or PDF, replacing the file atomically
+    :param vectorFormat: 'svg' or 'pdf', taken from filename's extension if None
+    :param pageWidthMM: for PDF, the width of the page in millimeters
+    :raise VectorExportError: if the format is not a vector format
+    :return: the number of bytes written
+    """
+    if vectorFormat is None:
+        vectorFormat = os.path.splitext(filename)[1].lower().lstrip('.')
+    if vectorFormat == 'svg':
+        data = svgData(config)
+    elif vectorFormat == 'pdf':
+        data = pdfData(config, pageWidthMM)
+    else:
+        raise VectorExportError("'{0}' is not one of the vector formats: {1}".format(vectorFormat,
+                                                                                     ', '.join(vectorFormats)))
+    helperFunctions.writeAtomically(filename, data)
+    return len(data)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Write the progress graphic as an SVG or PDF file.')
+    parser.add_argument('config', help='the config.cfg file to draw the graphic from')
+    parser.add_argument('output', help='the file to write, ending in .svg or .pdf')
+    parser.add_argument('--page-width-mm', type=float, default=None, help='the width of a PDF page in millimeters')
+    options = parser.parse_args(arguments)
+
+    config = ConfigStore.load(options.config)
+    size = exportVector(config, options.output, pageWidthMM=options.page_width_mm)
+    print('{0}: {1:,} bytes'.format(options.output, size))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
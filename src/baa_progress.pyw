@@ -3,9 +3,12 @@ This program is designed to produce bulletin graphics indicating the current pro
 Bishop's Annual Appeal (BAA). Once the target information is entered for a particular year's campaign all that needs
 be done is to enter the current statistics:  pledge amount, amount collected and number of families who have made a
 pledge so far; and the program generates a graphic indicating the percent to goal for the pledges, collected amount
-and number of families involved. This can be saved as a .bmp, .png, or .jpg file to be printed in the parish bulletin.
+and number of families involved. This can be saved as a .bmp, .png, or .jpg file to be printed in the parish bulletin,
+or as an .svg or .pdf file that prints sharply at any size.
 """
 
+import StartupProfiler     # first, so the import time of everything else is measured
+
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
@@ -15,14 +18,20 @@ from ui_targets_dlg import EditTargetsDlg
 from ui_current_dlg import EditCurrentValuesDlg
 from ui_settings import Settings
 
-import HIndicators
+import ConfigStore
 import DrawingControl
+import ImageSaver
+import RenderScheduler
+import Renderer
+import Resources
+import StyleRegistry
 import helperFunctions
 
-import pickle
+import copy
 import os
 import time, datetime
 
+StartupProfiler.mark('import')
 
 class MainWindow(QMainWindow, BAA_Setup):
 
@@ -32,31 +41,12 @@ class MainWindow(QMainWindow, BAA_Setup):
     def __init__(self, parent=None):
         super(MainWindow, self).__init__(parent)
 
-# ----------------------------------------------------------------------------------------------------------------------
-        """
-        The following section is for development purposes. By editing the configuration of baa_progress.pyw in 
-        PyCharm to include a "Script Parameter" of 'config' (without the quotes) one can change the structure of
-        the config file as it is written in config.cfg
-        """
-        if len(sys.argv) > 1:
-            configFile = open('config.cfg', 'rb')
-            temp_config = self.readConfig(configFile)
-            configFile.close()
-            temp_config_two = self.setDefaults()
-            temp_config_two['targets'] = temp_config['targets']
-            temp_config_two['current'] = temp_config['current']
-            self.writeConfig(temp_config_two)
-            self.config_changed = False
-# ----------------------------------------------------------------------------------------------------------------------
-
-
         class TargetsNotSetError(Exception): pass
 
-        configFile = None
         limitAccess = False
         try:
-            configFile = open('config.cfg', 'rb')
-            self.config = self.readConfig(configFile)
+            with StartupProfiler.timed('config load'):
+                self.config = self.readConfig()
             self.getSettings(self.config)
             try:
                 if not self.config["targets"]["set"]:
@@ -70,15 +60,52 @@ class MainWindow(QMainWindow, BAA_Setup):
             self.getSettings(self.config)
             limitAccess = True
 
+        except ConfigStore.ConfigError as err:
+            QMessageBox.warning(None, "Configuration", "The settings in {0} could not be read ({1}) so the "
+                                "defaults will be used.".format(ConfigStore.defaultFilename, err))
+            self.config = self.setDefaults()
+            self.getSettings(self.config)
+            limitAccess = True
+
         finally:
-            if configFile is not None:
-                configFile.close()
-            self.setupUI(self)
+            with StartupProfiler.timed('UI setup'):
+                self.setupUI(self)
+            self.previewShown = False
             if limitAccess:
                 self.limitAccess()
                 DrawingControl.drawWelcome(self)
             else:
-                DrawingControl.drawGraphic(self)
+                with StartupProfiler.timed('first frame (preview)'):
+                    self.previewShown = DrawingControl.drawPreview(self)
+                if not self.previewShown:
+                    with StartupProfiler.timed('theme compilation'):
+                        self.context.theme
+                    with StartupProfiler.timed('first render'):
+                        DrawingControl.drawGraphic(self)
+            QTimer.singleShot(0, self.warmUp)
+
+    def warmUp(self):
+        """
+        Runs once the window is showing. Compiles the theme and imports the indicator module for the current style
+        if the first frame did not need them, replaces a preview with a freshly drawn graphic, starts loading the
+        other styles in the background and then reports the startup timings if they were asked for.
+        :return: None
+        """
+        if self.previewShown or not self.config['targets']['set']:
+            with StartupProfiler.timed('theme compilation (deferred)'):
+                self.context.theme
+            with StartupProfiler.timed('indicator module import'):
+                try:
+                    DrawingControl.indicatorStyle(self.context)
+                except DrawingControl.StyleError:
+                    pass        # reported when the graphic is drawn
+        if self.previewShown:
+            with StartupProfiler.timed('background render'):
+                self.renderScheduler.schedule()
+                self.renderScheduler.flush()
+            self.previewShown = False
+        StyleRegistry.prewarm()
+        StartupProfiler.report()
 
     def setDefaults(self):
         """
@@ -87,194 +114,34 @@ class MainWindow(QMainWindow, BAA_Setup):
         restore the defaults through the settings dialog.
         :return: a dictionary of configuration values
         """
-        config = {}
-        config['imageSize'] = (640, 480)
-        config['imageBackground'] = QColor(Qt.white)
-        config['imageStorage'] = {'path': '.', 'basename': 'baa_progress', 'format': 'jpg', 'useDate': True}
-        config['targets'] = {'set':False, 'year':time.strftime('%Y'), 'goal': 0, 'families': 0}
-        config['current'] = {'pledged':0, 'collected':0, 'families':0}
-        config['type'] = ".png"
-        config['style'] = "3DVertical"
-        config['displayColor'] = True
-        config['border'] = 'single'     # could be none, single or double
-        config['heading_prefix'] = "Our Parish Response to the"
-        config['heading'] = "Bishop's Annual Appeal"
-        config['penDefinitions'] = self.definePens()
-        config['brushDefinitions'] = self.defineFills()
-        config['fontDefinitions'] = self.defineFonts()
+        config = Renderer.defaultConfig()
         self.config_changed = True
         return config
 
     def getSettings(self, config):
         """
-        Uses the configuration dictionary, config, to create pens, brushes, fonts and other often needed objects
+        Uses the configuration dictionary, config, to create the render context holding the pens, brushes, fonts and
+        other often needed objects. The image itself is only allocated when the graphic is first saved.
         :param config: dictionary
         :return: None
         """
-        self.image = QImage(config['imageSize'][0], config['imageSize'][1], QImage.Format_RGB32)
-        self.pens = self.createPens(config['penDefinitions'])
-        self.fills = self.createFills(config['brushDefinitions'])
-        self.fonts = self.createFonts(config['fontDefinitions'])
-
-    def definePens(self):
-        """
-        Defines a dictionary of pens used in the program and to be saved in the config.cfg file. These pens can have
-        their attributes set by the user through the settings panel. They need to be actualized into a QPen after they
-        have been defined.
-        :return: a dictionary with keys for the definitions of the different pens used in the program
-        """
-        penDefinitions = {}
-        penDefinitions['no_pen'] = {'color':QColor(Qt.black), 'width':1, 'style':Qt.NoPen,
-                                    'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
-        penDefinitions['border_pen'] = {'color':QColor(Qt.black), 'width':2, 'style':Qt.SolidLine,
-                                        'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
-        penDefinitions['outline_pen'] = {'color':QColor(Qt.black), 'width':1, 'style':Qt.SolidLine,
-                                         'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
-        penDefinitions['red_pen'] = {'color':QColor(Qt.red), 'width':2, 'style':Qt.SolidLine,
-                                     'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
-        penDefinitions['green_pen'] = {'color':QColor(Qt.green), 'width':2, 'style':Qt.SolidLine,
-                                     'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
-        penDefinitions['blue_pen'] = {'color':QColor(Qt.blue), 'width':2, 'style':Qt.SolidLine,
-                                     'cap':Qt.RoundCap, 'join':Qt.RoundJoin}
-        return penDefinitions
-
-    def createPens(self, defs):
-        """
-        Creates a dictionary of the QPens used in the program from the given definitions (defs).
-        These pens can have their characteristics set by the user through the settings panel.
-        :return: a dictionary with keys for each of the different QPens used in the program
-        """
-        pens = {}
-        for penkey in defs.keys():
-            pendef = defs[penkey]
-            new_pen = QPen()
-            new_pen.setColor(pendef['color'])
-            new_pen.setWidth(pendef['width'])
-            new_pen.setStyle(pendef['style'])
-            new_pen.setCapStyle(pendef['cap'])
-            new_pen.setJoinStyle(pendef['join'])
-            pens[penkey] = new_pen
-
-        return pens
-
-    def defineFills(self):
-        """
-        Defines a dictionary of brushes used in the program and to be saved in the config.cfg file. These brushes can
-        have their attributes set by the user through the settings panel. They need to be actualized into QBrushes after
-        they have been defined.
-        :return: a dictionary with keys for the definitions of the different brushes used in the program
-        """
-        fillDefinitions = {}
-        fillDefinitions['no_brush'] = {'style': Qt.NoBrush, 'color': QColor(Qt.black)}
-        fillDefinitions['white_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.white)}
-        fillDefinitions['black_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.black)}
-        fillDefinitions['gray_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.gray)}
-        fillDefinitions['darkGray_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkGray)}
-        fillDefinitions['red_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.red)}
-        fillDefinitions['darkRed_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkRed)}
-        fillDefinitions['green_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.green)}
-        fillDefinitions['darkGreen_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkGreen)}
-        fillDefinitions['blue_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.blue)}
-        fillDefinitions['darkBlue_brush'] = {'style': Qt.SolidPattern, 'color': QColor(Qt.darkBlue)}
-        fillDefinitions['gray_linear_gradient'] = {'style': Qt.LinearGradientPattern,
-                                                'colors': [[0.0, QColor(Qt.gray)],
-                                                           [0.3, QColor(Qt.white)],
-                                                           [1.0, QColor(Qt.black)]]}
-        fillDefinitions['gray_radial_gradient'] = {'style': Qt.RadialGradientPattern,
-                                               'colors': [[0.0, QColor(Qt.white)],
-                                                          [0.3, QColor(Qt.gray)],
-                                                          [1.0, QColor(Qt.black)]]}
-        fillDefinitions['red_linear_gradient'] = {'style': Qt.LinearGradientPattern,
-                                                  'colors': [[0.12, QColor(Qt.red)],
-                                                             [0.35, QColor(Qt.white)],
-                                                             [0.55, QColor(Qt.red)],
-                                                             [1.0, QColor(Qt.darkRed)]]}
-        fillDefinitions['red_radial_gradient'] = {'style': Qt.RadialGradientPattern,
-                                                  'colors': [[0.0, QColor(Qt.white)],
-                                                             [0.3, QColor(Qt.red)],
-                                                             [1.0, QColor(Qt.darkRed)]]}
-        fillDefinitions['green_linear_gradient'] = {'style': Qt.LinearGradientPattern,
-                                                  'colors': [[0.12, QColor(Qt.green)],
-                                                             [0.35, QColor(Qt.white)],
-                                                             [0.55, QColor(Qt.green)],
-                                                             [1.0, QColor(Qt.darkGreen)]]}
-        fillDefinitions['green_radial_gradient'] = {'style': Qt.RadialGradientPattern,
-                                                  'colors': [[0.0, QColor(Qt.white)],
-                                                             [0.3, QColor(Qt.green)],
-                                                             [1.0, QColor(Qt.darkGreen)]]}
-        fillDefinitions['blue_linear_gradient'] = {'style': Qt.LinearGradientPattern,
-                                                  'colors': [[0.12, QColor(Qt.blue)],
-                                                             [0.35, QColor(Qt.white)],
-                                                             [0.55, QColor(Qt.blue)],
-                                                             [1.0, QColor(Qt.darkBlue)]]}
-        fillDefinitions['blue_radial_gradient'] = {'style': Qt.RadialGradientPattern,
-                                                  'colors': [[0.0, QColor(Qt.white)],
-                                                             [0.3, QColor(Qt.blue)],
-                                                             [1.0, QColor(Qt.darkBlue)]]}
-        return fillDefinitions
-
-    def createFills(self, defs):
-        """
-        Creates a dictionary of the fill colors and styles used in the program from the given definitions (defs).
-        These can either be QBrushes or QGradients depending on their style and can have their characteristics set by
-        the user through the settings panel.
-        :return: a dictionary with keys for each of the different QBrushes and QGradients used in the program
-        """
-        fills = {}
-        for fillKey in defs.keys():
-            fillDef = defs[fillKey]
-            if fillDef['style'] == Qt.SolidPattern:
-                new_fill = QBrush()
-                new_fill.setStyle(Qt.SolidPattern)
-                new_fill.setColor(fillDef['color'])
-
-            elif fillDef['style'] == Qt.LinearGradientPattern:
-                gradient = QLinearGradient()
-                gradient.setStops(fillDef['colors'])
-                new_fill = gradient
-                #new_brush.setStyle(Qt.LinearGradientPattern)
-
-            elif fillDef['style'] == Qt.RadialGradientPattern:
-                gradient = QRadialGradient()
-                gradient.setStops(fillDef['colors'])
-                new_fill = gradient
-
-            else:
-                new_fill = QBrush()
-                new_fill.setStyle(Qt.NoBrush)
-                new_fill.setColor(Qt.black)
-
-            fills[fillKey] = new_fill
-
-        return fills
-
-    def defineFonts(self):
+        self.context = Renderer.RenderContext(config, QImage())
+        self.savedImage = None      # (filename, fingerprint) of the last image written by saveImage()
+        if getattr(self, 'imageSaver', None) is None:
+            self.imageSaver = ImageSaver.ImageSaver(parent=self)
+            self.imageSaver.saved.connect(self.imageSaved)
+            self.imageSaver.failed.connect(self.imageSaveFailed)
+            self.exporter = None            # made by exportImages() the first time it is needed
+            self.ledgerImporter = None      # made by importLedger() the first time it is needed
+            self.renderScheduler = RenderScheduler.RenderScheduler(lambda: DrawingControl.drawGraphic(self),
+                                                                   parent=self)
+
+    @property
+    def image(self):
         """
-        Defines a dictionary of QFonts used in the program and to be saved in the config.cfg file. These fonts can have
-        their attributes set by the user through the settings panel. They need to be actualized into a QFont after they
-        have been defined.
-        :return: a dictionary with keys for the definitions of the different fonts used in the program
+        The graphic as a QImage for saving; the window itself paints without one
         """
-        fontDefinitions = {}
-        fontDefinitions['headingFont'] = {'fontName': 'Arial', 'size': 24, 'weight':QFont.Bold, 'italic':False}
-        fontDefinitions['captionFont'] = {'fontName': 'Arial', 'size': 16, 'weight':QFont.Normal, 'italic':False}
-        fontDefinitions['smallCaptionFont'] = {'fontName': 'Arial', 'size': 12, 'weight':QFont.Normal, 'italic':False}
-        fontDefinitions['prefixFont'] = {'fontName':'Arial', 'size':18, 'weight':QFont.Normal, 'italic':False}
-        fontDefinitions['infoFont'] = {'fontName':'Arial', 'size':12, 'weight':QFont.Normal, 'italic':False}
-
-        return fontDefinitions
-
-    def createFonts(self, defs):
-        """
-        Creates a dictionary of the fonts used in the program from the definitions (defs). These fonts can have their
-        characteristics set by the user through the settings panel.
-        :return: a dictionary with keys for each of the different fonts used in the program
-        """
-        fonts = {}
-        for fontKey in defs:
-            fontDef = defs[fontKey]
-            fonts[fontKey] = QFont(fontDef['fontName'], fontDef['size'], fontDef['weight'], fontDef['italic'])
-        return fonts
+        return DrawingControl.exportImage(self.context)
 
     def limitAccess(self):
         """
@@ -284,7 +151,9 @@ class MainWindow(QMainWindow, BAA_Setup):
         """
         self.saveAction.setEnabled(False)
         self.saveAsAction.setEnabled(False)
+        self.exportAction.setEnabled(False)
         self.enterData.setEnabled(False)
+        self.importLedgerAction.setEnabled(False)
 
     def grantAccess(self):
         """
@@ -293,61 +162,223 @@ class MainWindow(QMainWindow, BAA_Setup):
         """
         self.saveAction.setEnabled(True)
         self.saveAsAction.setEnabled(True)
+        self.exportAction.setEnabled(True)
         self.enterData.setEnabled(True)
+        self.importLedgerAction.setEnabled(True)
 
 
-    def readConfig(self, config_file):
+    def readConfig(self):
         """
-        Reads the configuration information from configFile
+        Reads the configuration information from config.cfg, migrating it if it was written by an earlier version.
+        A section found to be unusable when it is first used is replaced by its default, see configSectionError().
         :return: a dictionary of configuration values
         """
-        config = pickle.load(config_file)
+        config = ConfigStore.load(ConfigStore.defaultFilename)
+        config.fallback = self.configSectionError
         self.config_changed = False
 
         return config
 
+    def configSectionError(self, section, err):
+        """
+        Called when a section of config.cfg cannot be used, which is only found out the first time the section is
+        needed. The section's default has taken its place; as when the whole file cannot be read, the user is told and
+        the defaults are saved on exit.
+        :return: None
+        """
+        self.config_changed = True
+        # the section may be first needed in the middle of drawing, so the message waits for the event loop
+        QTimer.singleShot(0, lambda: QMessageBox.warning(
+            self, "Configuration", "The '{0}' settings in {1} could not be read ({2}) so their defaults will be "
+                                   "used.".format(section, ConfigStore.defaultFilename, err)))
+
     def writeConfig(self, config):
         """
-        Writes the configuration information from config to config.cfg in the same directory as the program.
+        Writes the configuration information from config to config.cfg, replacing the file only once the new one has
+        been written in full.
         :return: True if successful, otherwise, False
         """
-        f = None
-        f = open('config.cfg', 'wb')
         try:
-            pickle.dump(config, f, pickle.HIGHEST_PROTOCOL)
-        except (EnvironmentError, pickle.PicklingError) as err:
-            print("{0}: saveProgramInfo error: {1}".format(
-                os.path.basename(sys.argv[0]), err))
-        finally:
-            if f is not None:
-                f.close()
-
-    def meterIndicators(self, painter, verticalPosition):
-        print('Got to meterIndicators')
-
-    def guageIndicators(self, painter, verticalPosition):
-        print('Got to guage indicators.')
+            ConfigStore.save(config, ConfigStore.defaultFilename)
+        except EnvironmentError as err:
+            print("{0}: saveProgramInfo error: {1}".format(os.path.basename(sys.argv[0]), err))
+            return False
+        return True
 
     def setTargets(self):
         dlg = EditTargetsDlg(self.config["targets"])
         if dlg.exec():
             self.config_changed = True
             self.grantAccess()
-            DrawingControl.drawGraphic(self)
+            self.renderScheduler.schedule()
 
     def setCurrent(self):
-        dlg = EditCurrentValuesDlg(self.config['current'])
+        dlg = EditCurrentValuesDlg(self.config['current'], self, preview=self.previewCurrent,
+                                   record=self.recordHistory)
         if dlg.exec():
             if dlg.config_changed:
                 self.config_changed = True
-                DrawingControl.drawGraphic(self)
+        self.renderScheduler.schedule()
+
+    def recordHistory(self, current):
+        """
+        Adds the current values just entered to the campaign's history in the database named by config['history']
+        :param current: the dictionary of current values
+        :return: None
+        """
+        import HistoryStore         # only loaded once values are first entered, to keep sqlite3 out of startup
+        try:
+            history = self.config['history']
+            if getattr(self, 'history', None) is not None and self.history.filename != history['filename']:
+                self.history.close()
+                self.history = None
+            if getattr(self, 'history', None) is None:
+                self.history = HistoryStore.HistoryStore(history['filename'])
+            self.history.append(self.config['targets']['year'], current['pledged'], current['collected'],
+                                current['families'], history['parish'])
+        except HistoryStore.HistoryError as e:
+            self.statusBar().showMessage("Could not add the values to the history", 5000)
+            QMessageBox.warning(self, "History Error", str(e))
+
+    def importLedger(self):
+        """
+        Asks for the parish's donor ledger and totals the rows added to it since it was last imported, in the
+        background; ledgerImported() then puts the totals into the current values
+        :return: None
+        """
+        filename, selectedFilter = QFileDialog.getOpenFileName(self, "Import Ledger", "",
+                                                               "Ledgers (*.csv *.tsv *.txt *.xlsx);;All files (*)")
+        if not filename:
+            return
+        import LedgerImport         # only loaded once a ledger is first imported, to keep it out of startup
+        if self.ledgerImporter is None:
+            self.ledgerImporter = LedgerImport.LedgerImporter(parent=self)
+            self.ledgerImporter.finished.connect(self.ledgerImported)
+            self.ledgerImporter.failed.connect(self.ledgerImportFailed)
+        if self.ledgerImporter.start(filename):
+            self.statusBar().showMessage("Importing {0}...".format(filename))
+
+    def ledgerImported(self, result):
+        import LedgerImport
+        parish = None
+        if len(result.totals) > 1:
+            parish, chosen = QInputDialog.getItem(self, "Import Ledger", "The ledger holds several parishes. "
+                                                  "Use the totals of:", sorted(result.totals), 0, False)
+            if not chosen:
+                self.statusBar().clearMessage()
+                return
+        previous = dict(self.config['current'])
+        try:
+            LedgerImport.applyTotals(self.config, result.totals, parish)
+        except LedgerImport.LedgerError as e:
+            self.statusBar().showMessage("Nothing imported", 5000)
+            QMessageBox.warning(self, "Import Error", str(e))
+            return
+        if self.config['current'] != previous:     # a ledger with no new rows adds nothing to the history
+            self.config_changed = True
+            self.recordHistory(self.config['current'])
+        self.renderScheduler.schedule()
+        self.statusBar().showMessage(LedgerImport.summary(result).split('\n')[0], 5000)
+        if result.skipped:
+            QMessageBox.warning(self, "Import", LedgerImport.summary(result))
+
+    def ledgerImportFailed(self, message):
+        self.statusBar().showMessage("Import failed", 5000)
+        QMessageBox.warning(self, "Import Error", "The ledger could not be imported:\n" + message)
+
+    def previewCurrent(self):
+        """
+        Redraws the graphic shortly after the values being typed into the current values dialog change
+        :return: None
+        """
+        self.renderScheduler.schedule(RenderScheduler.typingDelay)
 
     def saveImage(self):
+        """
+        Saves the image in the standard location unless an identical image has already been saved there. The image
+        is encoded and written in the background; imageSaved() or imageSaveFailed() reports the outcome.
+        :return: None
+        """
         fileDesignation = self.getFileDesignation()
-        self.image.save(fileDesignation)
+        imageFormat = self.config['imageStorage']['format']
+        key = DrawingControl.graphicFingerprint(self.config, extra=(imageFormat, self.config['targets']['set']))
+        if self.savedImage == (fileDesignation, key) and os.path.exists(fileDesignation):
+            return
+        try:
+            image = self.image
+        except DrawingControl.StyleError:
+            return      # already reported when the graphic was drawn
+        self.savedImage = (fileDesignation, key)
+        self.imageSaver.save(image, fileDesignation, imageFormat)
+
+    def imageSaved(self, filename, written, seconds):
+        if written:
+            self.statusBar().showMessage("Saved {0} in {1:.2f}s".format(filename, seconds), 5000)
+        else:
+            self.statusBar().showMessage("{0} is already up to date".format(filename), 5000)
+
+    def imageSaveFailed(self, filename, message):
+        if self.savedImage is not None and self.savedImage[0] == filename:
+            self.savedImage = None
+        self.statusBar().showMessage("Could not save {0}".format(filename), 5000)
+        QMessageBox.warning(self, "Save Error", "The graphic could not be saved to {0}:\n{1}".format(filename, message))
+
+    def exportImages(self):
+        """
+        Saves the graphic at every size and format in config['exportProfiles'], next to the standard image. The work
+        is done in the background and imagesExported() reports the result.
+        :return: None
+        """
+        import ExportProfiles       # only loaded once the images are first exported, to keep it out of startup
+        if self.exporter is None:
+            self.exporter = ExportProfiles.Exporter(parent=self)
+            self.exporter.finished.connect(self.imagesExported)
+            self.exporter.failed.connect(self.imageExportFailed)
+        baseFilename = os.path.splitext(self.getFileDesignation())[0]
+        if self.exporter.start(copy.deepcopy(self.config), baseFilename):
+            self.statusBar().showMessage("Exporting...")
+
+    def imagesExported(self, results, seconds):
+        self.statusBar().showMessage("Exported {0} images in {1:.2f}s".format(len(results), seconds), 5000)
+        import ExportProfiles
+        QMessageBox.information(self, "Export", ExportProfiles.summary(results, seconds))
+
+    def imageExportFailed(self, message):
+        self.statusBar().showMessage("Export failed", 5000)
+        QMessageBox.warning(self, "Export Error", "The graphic could not be exported:\n" + message)
 
     def saveImageAs(self):
-        print("Got to saveImageAs")
+        """
+        Asks for a filename and saves the graphic there. Bitmap formats are saved in the background like saveImage();
+        SVG and PDF files are drawn again as vector graphics, so they can be printed at any size without blurring.
+        :return: None
+        """
+        filters = ["PNG image (*.png)", "JPEG image (*.jpg *.jpeg)", "Bitmap image (*.bmp)",
+                   "SVG vector graphic (*.svg)", "PDF document (*.pdf)"]
+        extensions = ['png', 'jpg', 'bmp', 'svg', 'pdf']
+        current = extensions.index(self.config['imageStorage']['format'])
+        filename, selectedFilter = QFileDialog.getSaveFileName(self, "Save Graphic As",
+                                                               os.path.splitext(self.getFileDesignation())[0],
+                                                               ';;'.join(filters), filters[current])
+        if not filename:
+            return
+        imageFormat = ImageSaver.formatFromFilename(filename)
+        if imageFormat not in extensions:
+            imageFormat = extensions[filters.index(selectedFilter)]
+            filename += '.' + imageFormat
+        import VectorExport         # loads QtSvg, so it is only imported once a file is being saved
+        if imageFormat not in VectorExport.vectorFormats:
+            self.imageSaver.save(self.image, filename, imageFormat)
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            size = VectorExport.exportVector(self.config, filename, imageFormat)
+        except (OSError, DrawingControl.StyleError) as err:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(self, "Save Error", "The graphic could not be saved to {0}:\n{1}".format(filename, err))
+            return
+        QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage("Saved {0} ({1:,} bytes)".format(filename, size), 5000)
 
     def checkForSave(self):
         """
@@ -366,7 +397,13 @@ class MainWindow(QMainWindow, BAA_Setup):
         return box.exec()
 
     def closeEvent(self, event):
-        self.saveImage()
+        if self.config['targets']['set']:
+            self.saveImage()
+            try:
+                self.imageSaver.save(DrawingControl.previewImage(self.context), DrawingControl.previewFilename,
+                                     'png', quiet=True)
+            except DrawingControl.StyleError:
+                pass
         if self.config_changed:
             result = self.checkForSave()
             if result == QMessageBox.Yes:
@@ -376,6 +413,12 @@ class MainWindow(QMainWindow, BAA_Setup):
                 self.close()
             else:
                 event.ignore()
+                return
+        if self.exporter is not None:
+            self.exporter.wait()
+        if self.ledgerImporter is not None:
+            self.ledgerImporter.wait()
+        self.imageSaver.wait()      # let the images being saved in the background finish before the program exits
 
     def getFileDesignation(self):
         """
@@ -394,7 +437,7 @@ class MainWindow(QMainWindow, BAA_Setup):
         dlg = Settings(self)
         dlg.exec()
         if dlg.image_changed:
-            DrawingControl.drawGraphic(self)
+            self.renderScheduler.schedule()     # usually already drawn while the dialog was open
 
 
     def help(self):
@@ -406,7 +449,7 @@ class MainWindow(QMainWindow, BAA_Setup):
     def displayHelp(self):
         program = "assistant"
         arguments = ["-collectionFile",
-                     "./qthelp/BAAProgress.qhc",
+                     Resources.resourcePath("qthelp/BAAProgress.qhc"),
                      "-enableRemoteControl", ]
         helpProcess = QProcess(self)
         helpProcess.start(program, arguments)
@@ -426,7 +469,7 @@ if __name__ == "__main__":
     import sys
     app = QApplication(sys.argv)
     app.setApplicationName("BAA Progress")
-    app.setWindowIcon(QIcon("images/icons/Mitre.png"))
+    app.setWindowIcon(Resources.icon("images/icons/Mitre.png"))
     form = MainWindow()
     form.show()
     app.exec()
\ No newline at end of file
@@ -1,101 +1,106 @@
 from PyQt5.QtCore import *
 
+from collections import namedtuple
 import math
+import os
+import tempfile
 
-def decimalFormat(n, mode=None):
-    ns = '{0:.2f}'.format(round(n*1.0, 2)) # ns = string rounded to 2 decimals
-    dPart = ns[-3:]     # save the decimal part
-    count=0
-    fs = ''
-    for char in ns[ns.find('.')-1::-1]:
-        fs = char + fs
-        count += 1
-        if count==3:
-            fs = ',' + fs
-            count = 0
-    if fs[0:1] == ',':
-        fs = fs[1:]
-    if mode == 'dollars':
-        fs = '$' + fs + dPart
-    elif mode == 'percent':
-        fs = fs + dPart + '%'
-    return fs
 
-def cleanNumber(inString):
-    outString = ""
-    for char in inString:
-        if char.isnumeric() or char == ".":
-            outString += char
-    return outString
+# one indicator as laid out by an indicator module's indicatorLayout(): what it shows, the region of the image it may
+# paint in and the module-specific geometry passed on to its draw function
+Indicator = namedtuple('Indicator', ['color', 'caption', 'percent', 'region', 'geometry'])
 
-def String2Num(s):
-    numchar = '0123456789.'
-    s2 = ''
-    for char in s:
-        if char in numchar:
-            s2 += char
-    return(float(s2))
+# the umask can only be read by setting it, which would change the mode of files other threads create meanwhile, so
+# it is read once here, when the module is first imported on the main thread before any worker thread starts
+processUmask = os.umask(0)
+os.umask(processUmask)
 
-def testForNumbers(nString, numType):
-    # tries to convert nString to the indicated numeric type
-    # and returns whether it was successful or not
-    clean = cleanNumber(nString)
-    validNumber = True
+def getPointPolar(center, length, angle):
+    """
+    Uses trigonometry to calculate a point given a center point and polar coordinates to the desired point
+    :param center: QPoint
+    :param length: integer or float
+    :param angle: integer or float in degrees
+    :return: a QPointF with the desired x and y coordinates
+    """
+    return QPointF(center.x() + length * math.cos(math.radians(angle)),
+                  center.y() - length * math.sin(math.radians(angle)))
+
+def fileMode(path):
+    """
+    :return: the permissions of the file at path, or those a newly created file would get if there is none
+    """
     try:
-        if numType == 'float':
-            float(clean)
-        if numType == 'int':
-            int(clean)
-    except ValueError:
-        validNumber = False
-    return validNumber
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o666 & ~processUmask
 
-def getIndicatorInfo(main):
+class AtomicFile():
     """
-    Computes several values that are used in all of the images defined above
-    :return: A tuple of tuples, the first containing value strings, possibly converted to monetary format
-            the second containing percent values rounded off to one decimal place,
-            the third the modifier strings that may be needed if the amounts are near or over 100%
+    A file written under a temporary name next to path and renamed over path when it is committed, so that path
+    always holds either the old or the new contents in full. Used as a context manager it is committed when the block
+    ends normally and thrown away if an exception is raised or discard() was called.
     """
-    goal = float(main.config['targets']['goal'])
-    pledged = float(main.config['current']['pledged'])
-    pledgedString = decimalFormat(pledged, 'dollars')
-    collected = float(main.config['current']['collected'])
-    collectedString = decimalFormat(collected, 'dollars')
-    totalFamilies = main.config['targets']['families']
-    participatingFamilies = main.config['current']['families']
-    familiesString = str(participatingFamilies) + ' of ' + str(totalFamilies)
-    pledgePercent = int(pledged * 1000/goal + 0.5)/10
-    collectedPercent = int(collected * 1000/goal + 0.5)/10
-    familiesPercent = int(participatingFamilies * 1000/totalFamilies + 0.5)/10
 
-    pledgeModifier = ''
-    if pledgePercent == 100.0:
-        if pledged < goal: pledgeModifier = 'almost '
-        if pledged > goal: pledgeModifier = 'over '
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, self.tempPath = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp',
+                                                     dir=directory)
+        self.file = os.fdopen(descriptor, 'wb')
+        self.discarded = False
 
-    collectedModifier = ''
-    if collectedPercent == 100.0:
-        if collected < goal: collectedModifier = 'almost '
-        if collected > goal: collectedModifier = 'over '
+    def write(self, data):
+        return self.file.write(data)
 
-    familiesModifier = ''
-    if familiesPercent == 100.0:
-        if participatingFamilies < totalFamilies: familiesModifier = 'almost '
-        if participatingFamilies > totalFamilies: familiesModifier =  'over '
+    def commit(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            os.chmod(self.tempPath, fileMode(self.path))    # mkstemp() makes the file readable by its owner only
+            os.replace(self.tempPath, self.path)
+        except BaseException:
+            self.discard()
+            raise
 
-    return ( (pledgedString, collectedString, familiesString), # value strings
-             (pledgePercent, collectedPercent, familiesPercent), # percents
-             (pledgeModifier, collectedModifier, familiesModifier) # modifiers
-           )
+    def discard(self):
+        self.discarded = True
+        self.file.close()
+        if os.path.exists(self.tempPath):
+            os.remove(self.tempPath)
 
-def getPointPolar(center, length, angle):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None and not self.discarded:
+            self.commit()
+        elif not self.discarded:
+            self.discard()
+        return False
+
+def writeAtomically(path, data):
     """
-    Uses trigonometry to calculate a point given a center point and polar coordinates to the desired point
-    :param center: QPoint
-    :param length: integer or float
-    :param angle: integer or float in degrees
-    :return: a Qpoint with the desired x and y coordinates
+    Writes data to a temporary file next to path and then renames it over path, so that path always holds either
+    the old or the new contents in full
+    :param path: the filename
+    :param data: the bytes to write
+    :return: None
     """
-    return QPoint(center.x() + length * math.cos(math.radians(angle)),
-                  center.y() - length * math.sin(math.radians(angle)))
+    with AtomicFile(path) as f:
+        f.write(data)
+
+def markError(edit, error):
+    """
+    Puts the cursor back in a line edit with the character at fault selected, or all of the text if the error does not
+    say which
+    :param edit: the QLineEdit holding the entry that was rejected
+    :param error: an exception whose second argument, if any, is the position of the character at fault
+    :return: None
+    """
+    edit.setFocus()
+    if len(error.args) > 1:
+        edit.setSelection(error.args[1], 1)
+    else:
+        edit.selectAll()
@@ -2,17 +2,35 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import NumberFormat
 import helperFunctions
 
 
+class PledgeError(Exception):pass
+
+class CollectedError(Exception):pass
+
+class FamiliesError(Exception):pass
+
+
 class EditCurrentValuesDlg(QDialog):
 
-    def __init__(self, current, parent=None):
+    def __init__(self, current, parent=None, preview=None, record=None):
+        """
+        :param current: the dictionary of current values, which is updated when the dialog is accepted
+        :param preview: if given, the values are put into current as they are typed and preview() is called to show
+                        them; cancelling puts the old values back
+        :param record: if given, record(current) is called with the accepted values when they differ from the ones the
+                       dialog was opened with, e.g. to add them to the history
+        """
         super(EditCurrentValuesDlg, self).__init__(parent)
         self.current = current
+        self.preview = preview
+        self.record = record
         self.oldPledged = self.current['pledged']
         self.oldCollected = self.current['collected']
         self.oldFamilies = self.current['families']
+        self.config_changed = False
         self.image_changed = False
         self.setup()
 
@@ -21,7 +39,7 @@ class EditCurrentValuesDlg(QDialog):
 
         pledgeLabel = QLabel("Current Pledge:")
         self.pledgeEdit = QLineEdit()
-        self.pledgeEdit.setText(helperFunctions.decimalFormat(self.oldPledged, 'dollars'))
+        self.pledgeEdit.setText(NumberFormat.formatMoney(self.oldPledged))
         self.pledgeEdit.setToolTip('Enter the current pledge.')
         self.pledgeEdit.setWhatsThis('This is where the current pledge is entered. It is used to create the \'Pledged\' +'
                                    'part of the graphic.')
@@ -32,7 +50,7 @@ class EditCurrentValuesDlg(QDialog):
 
         collectedLabel = QLabel("Amount Collected:")
         self.collectedEdit = QLineEdit()
-        self.collectedEdit.setText(helperFunctions.decimalFormat(self.oldCollected, 'dollars'))
+        self.collectedEdit.setText(NumberFormat.formatMoney(self.oldCollected))
         self.collectedEdit.setToolTip("Enter the amount currently collected for BAA.")
         self.collectedEdit.setWhatsThis('This is where the current amount collected is entered. It is used to create ' +
                                         'the \'Amount Collected\' part of the graphic. You may enter it formatted ' +
@@ -44,7 +62,7 @@ class EditCurrentValuesDlg(QDialog):
 
         familiesLabel = QLabel("Total Family Count:")
         self.familiesEdit = QLineEdit()
-        self.familiesEdit.setText(str(self.oldFamilies))
+        self.familiesEdit.setText(NumberFormat.formatCount(self.oldFamilies))
         self.familiesEdit.setToolTip('Enter the number of families who have contributed so far.')
         self.familiesEdit.setWhatsThis('This is where the number of families currently participating is entered ' +
                                        'This is used to display the percentage of families participating in this ' +
@@ -68,71 +86,105 @@ class EditCurrentValuesDlg(QDialog):
         layout.addStretch()
         layout.addLayout(buttonLayout)
 
+        if self.preview is not None:
+            self.pledgeEdit.textEdited.connect(self.previewValues)
+            self.collectedEdit.textEdited.connect(self.previewValues)
+            self.familiesEdit.textEdited.connect(self.previewValues)
+
         self.pledgeEdit.setFocus()
         self.pledgeEdit.selectAll()
 
+    def previewValues(self):
+        """
+        Puts the values typed so far into current and shows them, once all of them pass the checks accept() makes
+        :return: None
+        """
+        try:
+            pledgedValue, collectedValue, familiesValue = self.checkValues()
+        except (PledgeError, CollectedError, FamiliesError):
+            return                              # keep showing the last valid values until the entry is fixed
+        self.current['pledged'] = pledgedValue
+        self.current['collected'] = collectedValue
+        self.current['families'] = familiesValue
+        self.preview()
+
+    def reject(self):
+        if self.preview is not None:
+            self.current['pledged'] = self.oldPledged
+            self.current['collected'] = self.oldCollected
+            self.current['families'] = self.oldFamilies
+            self.preview()
+        QDialog.reject(self)
+
     def getCurrent(self):
         return self.targets
 
-    def accept(self):
-
-        class PledgeError(Exception):pass
-
-        class CollectedError(Exception):pass
-
-        class FamiliesError(Exception):pass
-
+    def checkValues(self):
+        """
+        Parses the entries and checks that each one is filled in and not negative
+        :return: (pledged, collected, families)
+        :raise PledgeError, CollectedError, FamiliesError: naming the entry at fault, with the position of the
+               offending character as the second argument when there is one
+        """
         pledged = self.pledgeEdit.text()
         collected = self.collectedEdit.text()
         families = self.familiesEdit.text()
+        if len(pledged) == 0:
+            raise PledgeError("Please enter a value for the current pledge.")
+        try:
+            pledgedValue = NumberFormat.parseMoney(pledged)
+        except NumberFormat.NumberError as e:
+            raise PledgeError('The current pledge must be a numeric value.\n' + e.message + '.', e.position)
+        if pledgedValue < 0.0:
+            raise PledgeError('The current pledge must be greater than or equal to zero.')
+
+        if len(collected) == 0:
+            raise CollectedError('Please enter an amount collected so far.')
+        try:
+            collectedValue = NumberFormat.parseMoney(collected)
+        except NumberFormat.NumberError as e:
+            raise CollectedError('The amount collected must be a numeric value.\n' + e.message + '.', e.position)
+        if collectedValue < 0.0:
+            raise CollectedError('The amount collected must be greater than or equal to zero.')
+
+        if len(families) == 0:
+            raise FamiliesError('You must enter the number of families\n' +
+                                'currently participating.')
+        try:
+            familiesValue = NumberFormat.parseCount(families)
+        except NumberFormat.NumberError as e:
+            raise FamiliesError('The number of families must be\n' +
+                                'an integer.  Example: 1403\n' + e.message + '.', e.position)
+        if familiesValue < 0:
+            raise FamiliesError('The number of participating families must be zero or more.')
+        return pledgedValue, collectedValue, familiesValue
+
+    def accept(self):
         try:
-            if len(pledged) == 0:
-                raise PledgeError("Please enter a value for the current pledge.")
-
-            if len(collected) == 0:
-                raise CollectedError('Please enter an amount collected so far.')
-            if helperFunctions.String2Num(collected) < 0.0:
-                raise CollectedError('The amount collected must be greater than or equal to zero.')
-            try:
-                helperFunctions.testForNumbers(collected, 'float')
-            except ValueError:
-                raise CollectedError('The amount collected must be a numeric value.')
-
-            if len(families) == 0:
-                raise FamiliesError('You must enter the number of families\n' +
-                                    'currently participating.')
-            if int(helperFunctions.String2Num(families)) < 0:
-                raise FamiliesError('The number of participating families must be zero or more.')
-
-            try:
-                helperFunctions.testForNumbers(families, 'int')
-            except ValueError:
-                raise FamiliesError('The number of families must be\n' +
-                                    'an integer.  Example: 1403')
+            pledgedValue, collectedValue, familiesValue = self.checkValues()
         except PledgeError as e:
-            response = QMessageBox.warning(self, "Pledge Error", str(e))
-            self.pledgeEdit.selectAll()
-            self.pledgeEdit.setFocus()
+            response = QMessageBox.warning(self, "Pledge Error", e.args[0])
+            helperFunctions.markError(self.pledgeEdit, e)
             return
         except CollectedError as e:
-            QMessageBox.warning(self, "Collected Error", str(e))
-            self.collectedEdit.selectAll()
-            self.collectedEdit.setFocus()
+            QMessageBox.warning(self, "Collected Error", e.args[0])
+            helperFunctions.markError(self.collectedEdit, e)
             return
         except FamiliesError as e:
-            QMessageBox.warning(self, "Families Error", str(e))
-            self.familiesEdit.selectAll()
-            self.familiesEdit.setFocus()
+            QMessageBox.warning(self, "Families Error", e.args[0])
+            helperFunctions.markError(self.familiesEdit, e)
             return
 
-        self.current['pledged'] = float(helperFunctions.cleanNumber(pledged))
-        self.current['collected'] = float(helperFunctions.cleanNumber(collected))
-        self.current['families'] = int(helperFunctions.cleanNumber(families))
+        self.current['pledged'] = pledgedValue
+        self.current['collected'] = collectedValue
+        self.current['families'] = familiesValue
         if (self.current['pledged'] != self.oldPledged)\
                 or (self.current['collected'] != self.oldCollected)\
                 or (self.current['families'] != self.oldFamilies):
             self.config_changed = True
             self.image_changed = True
+            if self.record is not None:
+                self.record(self.current)       # the history only gets an entry when the values changed
 
         QDialog.accept(self)
 
@@ -2,6 +2,8 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import RenderScheduler
+
 import os, os.path, sys, re
 
 class Settings(QDialog):
@@ -152,6 +154,7 @@ class Settings(QDialog):
         self.headingPrefixEdit.setAlignment(Qt.AlignLeft)
         self.headingPrefixEdit.setText(config['heading_prefix'])
         self.headingPrefixEdit.editingFinished.connect(self.prefixEdit)
+        self.headingPrefixEdit.textEdited.connect(self.prefixEdit)      # the graphic follows the typing
         prefixLayout = QHBoxLayout()
         prefixLayout.addWidget(headingPrefixLabel, 1)
         prefixLayout.addWidget(self.headingPrefixEdit, 4)
@@ -165,6 +168,7 @@ class Settings(QDialog):
         self.mainHeadingEdit.setAlignment(Qt.AlignLeft)
         self.mainHeadingEdit.setText(config['heading'])
         self.mainHeadingEdit.editingFinished.connect(self.headingEdit)
+        self.mainHeadingEdit.textEdited.connect(self.headingEdit)
         headingLayout = QHBoxLayout()
         headingLayout.addWidget(mainHeadingLabel, 1)
         headingLayout.addWidget(self.mainHeadingEdit, 4)
@@ -234,16 +238,17 @@ class Settings(QDialog):
         meterButton.clicked.connect(self.setType)
         guageButton = QRadioButton('Guages')
         guageButton.clicked.connect(self.setType)
-        guageButton.setEnabled(False)
         pieButton = QRadioButton('Pies')
         pieButton.clicked.connect(self.setType)
-        pieButton.setEnabled(False)
+        trendButton = QRadioButton('Trends')
+        trendButton.clicked.connect(self.setType)
         typeGroupLayout = QVBoxLayout()
         typeGroupLayout.addWidget(horizontalButton)
         typeGroupLayout.addWidget(verticalButton)
         typeGroupLayout.addWidget((meterButton))
         typeGroupLayout.addWidget(guageButton)
         typeGroupLayout.addWidget(pieButton)
+        typeGroupLayout.addWidget(trendButton)
         typeGroup.setLayout(typeGroupLayout)
         type = self.main.config['style'][2:]
         if type == 'Horizontal':
@@ -258,12 +263,13 @@ class Settings(QDialog):
             self.solidButton.setEnabled(False)
         elif type == 'Guages':
             guageButton.setChecked(True)
-            self.flatButton.setChecked(True)         # no 3D guages for now
-            self.solidButton.setEnabled(False)
+            self.solidButton.setEnabled(True)
+        elif type == 'Trends':
+            trendButton.setChecked(True)
+            self.solidButton.setEnabled(True)
         else:
             pieButton.setChecked(True)
-            self.flatButton.setChecked(True)         # no 3D pies for now
-            self.solidButton.setEnabled(False)
+            self.solidButton.setEnabled(True)
         typeLayout = QHBoxLayout()
         typeLayout.addWidget(typeLabel, 1)
         typeLayout.addWidget(typeGroup, 4)
@@ -344,18 +350,21 @@ class Settings(QDialog):
             self.main.config['border'] = 'double'
         self.main.config_changed = True
         self.image_changed = True
+        self.main.renderScheduler.schedule()
 
     def prefixEdit(self):
         heading_prefix = self.headingPrefixEdit.text()
         self.main.config['heading_prefix'] = heading_prefix
         self.main.config_changed = True
         self.image_changed = True
+        self.main.renderScheduler.schedule(RenderScheduler.typingDelay)
 
     def headingEdit(self):
         heading = self.mainHeadingEdit.text()
         self.main.config['heading'] = heading
         self.main.config_changed = True
         self.image_changed = True
+        self.main.renderScheduler.schedule(RenderScheduler.typingDelay)
 
     @pyqtSlot()
     def setColor(self):
@@ -365,6 +374,7 @@ class Settings(QDialog):
             self.main.config['displayColor'] = False
         self.main.config_changed = True
         self.image_changed = True
+        self.main.renderScheduler.schedule()
 
     @pyqtSlot()
     def setStyle(self):
@@ -376,12 +386,13 @@ class Settings(QDialog):
         self.main.config['style'] = style + type
         self.main.config_changed = True
         self.image_changed = True
+        self.main.renderScheduler.schedule()
 
     @pyqtSlot()
     def setType(self):
         style = self.main.config['style'][0:2]
         type = self.sender().text()
-        if type == 'Horizontal' or type == 'Vertical':
+        if type in ['Horizontal', 'Vertical', 'Guages', 'Pies', 'Trends']:
             self.solidButton.setEnabled(True)
         else:
             self.flatButton.setChecked(True)
@@ -389,4 +400,5 @@ class Settings(QDialog):
             self.solidButton.setEnabled(False)
         self.main.config['style'] = style + type
         self.main.config_changed = True
-        self.image_changed = True
\ No newline at end of file
+        self.image_changed = True
+        self.main.renderScheduler.schedule()
\ No newline at end of file
@@ -2,7 +2,10 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+from Canvas import Canvas
+
 import helperFunctions
+import Resources
 
 import time
 
@@ -14,13 +17,7 @@ class BAA_Setup():
 
         wholeLayout = QVBoxLayout(panel)
         wholeLayout.setContentsMargins(10, 10, 10, 10)
-        self.drawingBoard = QLabel(panel)
-        self.drawingBoard.setFrameShape(QFrame.Panel)
-        self.drawingBoard.setFrameShadow(QFrame.Sunken)
-        frameWidth = self.drawingBoard.frameWidth()
-        self.drawingBoard.setMinimumSize(self.image.width()+2*frameWidth, self.image.height()+2*frameWidth)
-        self.drawingBoard.setMaximumSize(self.image.width()+2*frameWidth, self.image.height()+2*frameWidth)
-        self.drawingBoard.setStyleSheet("QLabel { background-color : white; }")
+        self.drawingBoard = Canvas(self.context, panel)
         wholeLayout.addWidget(self.drawingBoard)
 
         menubar = self.menuBar()
@@ -39,7 +36,7 @@ class BAA_Setup():
             fileMenu.setToolTipsVisible(True)
             menubar.addMenu(fileMenu)
 
-            self.saveAction = QAction(QIcon("images/icons/Save.png"), "&Save Graphic", self)
+            self.saveAction = QAction(Resources.icon("images/icons/Save.png"), "&Save Graphic", self)
             self.saveAction.setShortcuts(QKeySequence.Save)
             self.saveAction.setToolTip("Save Graphic: Saves the current image in the standard location")
             self.saveAction.triggered.connect(self.saveImage)
@@ -53,6 +50,12 @@ class BAA_Setup():
             self.saveAsAction.triggered.connect(self.saveImageAs)
             fileMenu.addAction(self.saveAsAction)
 
+            self.exportAction = QAction("&Export All Sizes", self)
+            self.exportAction.setToolTip("Export All Sizes: Saves the image at every size and format in the export "
+                                         "profiles")
+            self.exportAction.triggered.connect(self.exportImages)
+            fileMenu.addAction(self.exportAction)
+
             fileMenu.addSeparator()
 
             quitAction = QAction(QIcon(""), "E&xit", self)
@@ -68,18 +71,24 @@ class BAA_Setup():
             editMenu.setToolTipsVisible(True)
             menubar.addMenu(editMenu)
 
-            targetAction = QAction(QIcon("images/icons/Target.png"), "Set &Targets", self)
+            targetAction = QAction(Resources.icon("images/icons/Target.png"), "Set &Targets", self)
             targetAction.setToolTip("Set Targets: Enter target goal and number of families.")
             targetAction.triggered.connect(self.setTargets)
             editMenu.addAction(targetAction)
 
-            self.enterData = QAction(QIcon('images/icons/enterData.png'), 'Enter &Current Data', self)
+            self.enterData = QAction(Resources.icon("images/icons/enterData.png"), 'Enter &Current Data', self)
             self.enterData.setToolTip("Enter current data: amount pledged, amount collected and number of families"
                                      " participating.")
             self.enterData.triggered.connect(self.setCurrent)
             editMenu.addAction(self.enterData)
 
-            settingsAction = QAction(QIcon("images/icons/Settings.png"), "&Image Options...", self)
+            self.importLedgerAction = QAction('Import &Ledger...', self)
+            self.importLedgerAction.setToolTip("Import Ledger: Total the pledges and payments in the parish's donor "
+                                               "ledger and use them as the current data.")
+            self.importLedgerAction.triggered.connect(self.importLedger)
+            editMenu.addAction(self.importLedgerAction)
+
+            settingsAction = QAction(Resources.icon("images/icons/Settings.png"), "&Image Options...", self)
             settingsAction.setToolTip("Settings: Manage how the program displays and saves its data.")
             settingsAction.triggered.connect(self.settings)
             editMenu.addAction(settingsAction)
@@ -97,7 +106,7 @@ class BAA_Setup():
             helpMenu.setToolTipsVisible(True)
             menubar.addMenu(helpMenu)
 
-            helpAction = QAction(QIcon("images/icons/Help.png"), "&Help", self)
+            helpAction = QAction(Resources.icon("images/icons/Help.png"), "&Help", self)
             helpAction.setToolTip("Help: Get help about the program.")
             helpAction.triggered.connect(self.help)
             helpMenu.addAction(helpAction)
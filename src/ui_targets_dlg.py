@@ -2,6 +2,7 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import NumberFormat
 import helperFunctions
 
 
@@ -31,7 +32,7 @@ class EditTargetsDlg(QDialog):
 
         goalLabel = QLabel("Campaign Goal:")
         self.goalEdit = QLineEdit()
-        self.goalEdit.setText(helperFunctions.decimalFormat(self.targets["goal"], 'dollars'))
+        self.goalEdit.setText(NumberFormat.formatMoney(self.targets["goal"]))
         self.goalEdit.setToolTip("Enter the parish goal for the Bishop's Annual Appeal.")
         self.goalEdit.setWhatsThis("Set the goal for this year's Bishop's Annual Appeal. You may enter it formatted " +
                                    "as dollars and cents ($12,345.67) or simply enter the digits (12345.67).")
@@ -42,7 +43,7 @@ class EditTargetsDlg(QDialog):
 
         familyLabel = QLabel("Total Family Count:")
         self.familyEdit = QLineEdit()
-        self.familyEdit.setText(str(self.targets["families"]))
+        self.familyEdit.setText(NumberFormat.formatCount(self.targets["families"]))
         self.familyEdit.setToolTip('Enter the number of families in the parish.')
         self.familyEdit.setWhatsThis('Enter the number of families in the parish. This is used to display the ' +
                                      "percentage of families participating in this year's Bishop's Annual Appeal.")
@@ -88,25 +89,24 @@ class EditTargetsDlg(QDialog):
 
             if len(goal) == 0:
                 raise GoalError('You must enter the target goal for this year.')
-            if helperFunctions.String2Num(goal) <= 0.0:
-                raise GoalError('The goal must be greater than zero.')
             try:
-                helperFunctions.testForNumbers(goal, 'float')
-            except ValueError:
-                raise GoalError('The goal must be a numeric value.')
+                goalValue = NumberFormat.parseMoney(goal)
+            except NumberFormat.NumberError as e:
+                raise GoalError('The goal must be a numeric value.\n' + e.message + '.', e.position)
+            if goalValue <= 0.0:
+                raise GoalError('The goal must be greater than zero.')
 
             if len(families) == 0:
                 raise FamilyError('You must enter the number of families\n' +
                                     'in the parish.')
-            if int(helperFunctions.String2Num(families)) <= 0:
-                raise FamilyError('You must enter the number of families\n' +
-                                    'in the parish.')
-
             try:
-                helperFunctions.testForNumbers(families, 'int')
-            except ValueError:
+                familiesValue = NumberFormat.parseCount(families)
+            except NumberFormat.NumberError as e:
                 raise FamilyError('The number of families must be\n' +
-                                    'an integer.  Example: 1403')
+                                  'an integer.  Example: 1403\n' + e.message + '.', e.position)
+            if familiesValue <= 0:
+                raise FamilyError('You must enter the number of families\n' +
+                                    'in the parish.')
         except YearError as e:
             response = QMessageBox.question(self, "Year Error?", str(e))
             if response == QMessageBox.Yes:
@@ -116,19 +116,17 @@ class EditTargetsDlg(QDialog):
                 self.yearEdit.setFocus()
                 return
         except GoalError as e:
-            QMessageBox.warning(self, "Goal Error", str(e))
-            self.goalEdit.selectAll()
-            self.goalEdit.setFocus()
+            QMessageBox.warning(self, "Goal Error", e.args[0])
+            helperFunctions.markError(self.goalEdit, e)
             return
         except FamilyError as e:
-            QMessageBox.warning(self, "Families Error", str(e))
-            self.familyEdit.selectAll()
-            self.familyEdit.setFocus()
+            QMessageBox.warning(self, "Families Error", e.args[0])
+            helperFunctions.markError(self.familyEdit, e)
             return
 
         self.targets['year'] = year
-        self.targets['goal'] = float(helperFunctions.cleanNumber(goal))
-        self.targets['families'] = int(helperFunctions.cleanNumber(families))
+        self.targets['goal'] = goalValue
+        self.targets['families'] = familiesValue
         self.targets['set'] = True
         self.config_changed = True
 